@@ -1,12 +1,12 @@
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_ollama.llms import OllamaLLM
-import re, hashlib, json, textwrap, dotenv
-from typing import Optional, Tuple, Dict, Any, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os, re, math, time, hashlib, json, textwrap, threading, difflib, queue, dotenv
+from typing import Optional, Tuple, Dict, Any, List, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 import f_multi_main_tool
 import kakaoapi
+import review_filter
+import ollama_pool
 
 try:
     import sqlite3  # 표준
@@ -26,15 +26,50 @@ PER_SOURCE_LIMIT = None
 CRAWL_MAX_REVIEWS = 10
 CRAWL_HEADLESS = True
 CRAWL_MAX_WORKERS = 5
-
-PROMPT = """너는 리뷰 요약 및 평가 전문가야.
+# 증분 요약: 새 리뷰만 기존 요약에 접어 넣고, 아래 조건이면 전체 재요약
+SUMMARY_INCREMENTAL = True
+FULL_RESUMMARY_EVERY = 5           # 증분 갱신 N번마다
+FULL_RESUMMARY_DAYS = 30           # 마지막 전체 요약 후 N일
+INCREMENTAL_MAX_NEW_RATIO = 0.5    # 새 리뷰가 입력 묶음의 이 비율을 넘으면
+SUMMARY_DRIFT_RATING = 0.7         # 증분 결과 별점이 이만큼 움직이면(드리프트) 바로 전체 재요약
+SUMMARY_SEEN_MAX = 1000
+# 요약 입력 토큰 예산(매장당, 프롬프트 제외)
+SUMMARY_TOKEN_BUDGET = 2500
+SUMMARY_REVIEW_MAX_TOKENS = 300    # 긴 리뷰 하나가 예산을 독차지하지 않게 자름
+KO_TOKENS_PER_CHAR = 1.1           # llama3 계열 토크나이저 기준 한글 1글자 ≈ 1.1 토큰
+SUMMARY_NEAR_DUP = 0.9             # 유사도(SequenceMatcher) 이상이면 거의 같은 리뷰로 보고 제외
+SUMMARY_PIPELINE_WORKERS = 5       # iter_keyword_flow 에서 동시에 요약하는 매장 수
+# 크기 기반 모델 라우팅(기본 꺼짐): 리뷰가 적고 짧고 평이 한쪽으로 모이면 작은 모델, 아니면 model_name(큰 모델)
+# 켜도 작은 모델을 가진 엔드포인트가 없으면 전부 model_name 으로 보낸다
+SUMMARY_MODEL_ROUTING = os.getenv("SUMMARY_MODEL_ROUTING", "0") == "1"
+SUMMARY_SMALL_MODEL = os.getenv("SUMMARY_SMALL_MODEL", "llama3.2:3b")
+ROUTE_SMALL_MAX_REVIEWS = int(os.getenv("ROUTE_SMALL_MAX_REVIEWS", "15"))
+ROUTE_SMALL_MAX_TOKENS = int(os.getenv("ROUTE_SMALL_MAX_TOKENS", "800"))
+ROUTE_CONTENTIOUS_RATIO = float(os.getenv("ROUTE_CONTENTIOUS_RATIO", "0.25"))   # 긍정/부정이 둘 다 이 비율 이상이면 논쟁적
+ALIAS_FUZZY_MIN = 0.85      # 매장명 유사도(SequenceMatcher) 하한
+ALIAS_MAX_DIST_M = 150      # 이름으로 찾은 매장을 같은 장소로 볼 좌표 거리 상한
+
+# 크롤링 결과 상태별 재크롤링 주기(네거티브 캐시). ok 는 소스별 TTL 을 따른다.
+OUTCOME_TTL_DAYS = {"empty": 7, "not_found": 3}
+ERROR_BACKOFF_BASE_MIN = 30             # error: 30분, 60분, 120분 ... 지수 백오프
+ERROR_BACKOFF_MAX_MIN = 24 * 60
+SOURCES = ("kakao", "google", "naver")
+# 소스별 신선도 TTL(일). run_keyword_flow(stale_days=...) 를 주면 전 소스에 그 값을 쓴다.
+SOURCE_TTL_DAYS = {"kakao": STALE_DAYS, "google": STALE_DAYS, "naver": STALE_DAYS}
+
+# PROMPT 를 고치면 올릴 것: summaries 캐시 키에 들어가서 예전 요약이 재사용되지 않는다
+PROMPT_VERSION = 3
+# 고정 지시문을 맨 앞에 두고 매장별 내용은 뒤에 붙인다: 전체/증분 프롬프트가 이 앞부분을 그대로 공유해서
+# Ollama 서버의 프롬프트(KV) 캐시가 매장이 바뀌어도 재사용된다. 이 블록 안에는 매장별 값을 넣지 말 것.
+SUMMARY_INSTRUCTIONS = """너는 리뷰 요약 및 평가 전문가야.
 아래 매장 리뷰들(여러 출처, 최신/과거 혼재)을 읽고, 반드시 아래 JSON만 출력해.
 
 출력 스키마(이 키/형식 그대로):
 {{
   "one_liner": "30~40자 핵심 한 줄 평",
   "rating": 4.3,
-  "complain": ["불만사항1", "불만사항2"]
+  "complain": ["불만사항1", "불만사항2"],
+  "digest": "리뷰 전반의 장점/단점/분위기 메모 200자 이내"
 }}
 
 작성 규칙:
@@ -45,14 +80,61 @@ PROMPT = """너는 리뷰 요약 및 평가 전문가야.
 - 상반된 평이 있으면 **빈도/최근성**을 가볍게 반영해 평균적 체감 품질로 판단.
 - 중복/동의어는 합치고, 각 항목은 **25자 내외**로 짧게.
 - 매장명/출처/별점 숫자 등 메타는 본문에 넣지 말 것(오직 JSON 키만).
+- "digest"는 다음 갱신 때 참고할 메모. 자주 언급된 장단점과 대략의 비율을 **200자 이내**로.
+- [기존 평가]/[메모]가 함께 오면 갱신: 새 리뷰가 기존 평가와 비슷하면 값을 거의 그대로 유지하고,
+  rating 은 새 리뷰 수에 비례해 **조금만** 움직이며, complain/digest 는 기존 것과 새 리뷰를 합쳐서 작성.
 
-[매장명]
+"""
+PROMPT = SUMMARY_INSTRUCTIONS + """[매장명]
 {store}
 
 [리뷰들]
 {reviews}
 """
 
+# Ollama 구조화 출력: format 에 JSON 스키마를 줘서 디코딩 단계에서 형식을 강제하고,
+# num_predict 로 스키마 크기(한 줄 평 ~50 + 불만 2개 ~60 + 메모 ~230 + 구조 ~40 토큰)만큼만 생성
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "one_liner": {"type": "string", "maxLength": 60},
+        "rating": {"type": "number", "minimum": 1.0, "maximum": 5.0},
+        "complain": {"type": "array", "items": {"type": "string", "maxLength": 40}, "maxItems": 2},
+        "digest": {"type": "string", "maxLength": 200},
+    },
+    "required": ["one_liner", "rating", "complain", "digest"],
+}
+# 출력 토큰 상한은 스키마 최대 길이에서 계산: 잘리면 파싱 실패 + 재시도로 호출만 두 번 버린다.
+# Llama3 바이트 BPE 는 출력 한글 한 글자에 2토큰 가까이 쓰기도 해서 입력 추정치(KO_TOKENS_PER_CHAR)보다 넉넉히.
+SUMMARY_OUTPUT_TOKENS_PER_CHAR = 2.0
+SUMMARY_JSON_OVERHEAD_TOKENS = 60      # 키/따옴표/괄호/rating
+_SUMMARY_MAX_CHARS = sum(
+    p.get("maxLength", 0) if p["type"] == "string" else p.get("maxItems", 0) * p["items"].get("maxLength", 0)
+    for p in SUMMARY_SCHEMA["properties"].values() if p["type"] in ("string", "array"))
+SUMMARY_NUM_PREDICT = int(_SUMMARY_MAX_CHARS * SUMMARY_OUTPUT_TOKENS_PER_CHAR) + SUMMARY_JSON_OVERHEAD_TOKENS
+SUMMARY_PARSE_RETRIES = 1       # 파싱 실패 매장만 한 번 더
+RETRY_SUFFIX = """
+
+[직전 출력 — JSON 파싱 실패]
+{bad}
+
+위 출력은 형식이 틀렸어. 설명 없이 스키마의 네 키(one_liner, rating, complain, digest)를 가진 JSON 한 덩어리만 다시 출력해.
+"""
+
+# 증분 갱신용: 기존 요약/메모 + 새 리뷰만 보냄 (지시문은 PROMPT 와 공유)
+UPDATE_PROMPT = SUMMARY_INSTRUCTIONS + """[매장명]
+{store}
+
+[기존 평가]
+{previous}
+
+[메모]
+{digest}
+
+[새 리뷰들]
+{reviews}
+"""
+
 # DB & 스키마 (+마이그레이션)
 
 DDL = """
@@ -67,8 +149,13 @@ CREATE TABLE IF NOT EXISTS stores (
   img2        TEXT,
   img3        TEXT,
   store_key   TEXT UNIQUE,
+  kakao_id    TEXT,
   created_at  TEXT DEFAULT (datetime('now')),
-  updated_at  TEXT DEFAULT (datetime('now'))
+  updated_at  TEXT DEFAULT (datetime('now')),
+  last_crawled_at   TEXT,
+  kakao_crawled_at  TEXT,
+  google_crawled_at TEXT,
+  naver_crawled_at  TEXT
 );
 CREATE TABLE IF NOT EXISTS reviews (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -84,28 +171,213 @@ CREATE INDEX IF NOT EXISTS idx_stores_name ON stores(store_name);
 CREATE INDEX IF NOT EXISTS idx_reviews_store ON reviews(store_id);
 CREATE INDEX IF NOT EXISTS idx_reviews_source ON reviews(source);
 CREATE INDEX IF NOT EXISTS idx_reviews_lastseen ON reviews(last_seen);
+CREATE INDEX IF NOT EXISTS idx_reviews_store_lastseen ON reviews(store_id, last_seen);
+
+-- (매장, 소스)별 마지막 크롤링 결과: ok / empty / not_found / error
+CREATE TABLE IF NOT EXISTS crawl_outcomes (
+  store_id    INTEGER NOT NULL,
+  source      TEXT NOT NULL,
+  status      TEXT NOT NULL,
+  error_count INTEGER DEFAULT 0,
+  crawled_at  TEXT DEFAULT (datetime('now')),
+  PRIMARY KEY (store_id, source),
+  FOREIGN KEY (store_id) REFERENCES stores(id) ON DELETE CASCADE
+);
+
+-- (매장, 소스)별로 찾아 둔 상세/리뷰 페이지 URL: 다음 크롤링은 검색 없이 바로 이동
+CREATE TABLE IF NOT EXISTS place_urls (
+  store_id    INTEGER NOT NULL,
+  source      TEXT NOT NULL,
+  url         TEXT NOT NULL,
+  resolved_at TEXT DEFAULT (datetime('now')),
+  PRIMARY KEY (store_id, source),
+  FOREIGN KEY (store_id) REFERENCES stores(id) ON DELETE CASCADE
+);
+
+-- LLM 요약 캐시: (매장명, 입력 리뷰, 모델, temperature, 프롬프트 버전) 해시 → 요약
+CREATE TABLE IF NOT EXISTS summaries (
+  input_hash     TEXT PRIMARY KEY,
+  store_id       INTEGER,
+  model          TEXT,
+  temperature    REAL,
+  prompt_version INTEGER,
+  one_liner      TEXT,
+  rating         REAL,
+  complain       TEXT,
+  raw_text_len   INTEGER,
+  created_at     TEXT DEFAULT (datetime('now')),
+  FOREIGN KEY (store_id) REFERENCES stores(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_store ON summaries(store_id, created_at);
+
+-- 증분 요약 상태: 매장별 마지막 요약 + 메모(digest) + 반영한 리뷰 해시
+CREATE TABLE IF NOT EXISTS summary_state (
+  store_ref          TEXT PRIMARY KEY,   -- 카카오 place id, 없으면 'name:<매장명>'
+  model              TEXT,
+  prompt_version     INTEGER,
+  one_liner          TEXT,
+  rating             REAL,
+  complain           TEXT,
+  digest             TEXT,
+  seen               TEXT,               -- 반영한 리뷰 해시 JSON 배열
+  updates_since_full INTEGER DEFAULT 0,
+  full_at            TEXT,
+  updated_at         TEXT DEFAULT (datetime('now'))
+);
+
+-- 매장명/별칭 해석 인덱스: 정규화된 이름(또는 'kakao:<id>') → stores.id
+CREATE TABLE IF NOT EXISTS store_aliases (
+  alias_norm  TEXT PRIMARY KEY,
+  store_id    INTEGER NOT NULL,
+  alias       TEXT,
+  kind        TEXT,
+  is_base     INTEGER DEFAULT 0,
+  hits        INTEGER DEFAULT 0,
+  created_at  TEXT DEFAULT (datetime('now')),
+  FOREIGN KEY (store_id) REFERENCES stores(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_store_aliases_store ON store_aliases(store_id);
+
+-- 지도 뷰포트 조회용 R*Tree (stores.lat/lng 와 트리거로 동기화)
+CREATE VIRTUAL TABLE IF NOT EXISTS stores_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng);
+CREATE TRIGGER IF NOT EXISTS trg_stores_rtree_ins AFTER INSERT ON stores
+WHEN new.lat IS NOT NULL AND new.lng IS NOT NULL
+BEGIN
+  INSERT OR REPLACE INTO stores_rtree VALUES (new.id, new.lat, new.lat, new.lng, new.lng);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_stores_rtree_upd AFTER UPDATE OF lat, lng ON stores
+BEGIN
+  DELETE FROM stores_rtree WHERE id = old.id;
+  INSERT INTO stores_rtree
+  SELECT new.id, new.lat, new.lat, new.lng, new.lng
+  WHERE new.lat IS NOT NULL AND new.lng IS NOT NULL;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_stores_rtree_del AFTER DELETE ON stores
+BEGIN
+  DELETE FROM stores_rtree WHERE id = old.id;
+END;
+-- 트리거 이전에 들어간 행 백필
+INSERT INTO stores_rtree
+SELECT id, lat, lat, lng, lng FROM stores
+WHERE lat IS NOT NULL AND lng IS NOT NULL
+  AND id NOT IN (SELECT id FROM stores_rtree);
 """
 
-def checkpoint(db_path=DB_PATH, mode="TRUNCATE"):
-    with sqlite3.connect(db_path) as con:
-        con.execute(f"PRAGMA wal_checkpoint({mode});")
+# 연결 관리: 스레드별 연결 재사용 + 스키마/WAL 1회 초기화
+DB_BUSY_TIMEOUT_MS = 5000
+DB_MMAP_SIZE = 256 * 1024 * 1024   # bytes
+DB_CACHE_SIZE_KB = 64 * 1024       # PRAGMA cache_size (음수 = KiB)
+DB_STMT_CACHE = 256                # sqlite3 prepared statement 캐시 크기
 
-def _connect(db_path: str = DB_PATH):
-    con = sqlite3.connect(db_path)
+_tls = threading.local()
+_init_lock = threading.Lock()
+_initialized_paths = set()
+
+def _open(db_path: str, readonly: bool = False):
+    if readonly:
+        con = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True,
+                              timeout=DB_BUSY_TIMEOUT_MS / 1000, cached_statements=DB_STMT_CACHE)
+    else:
+        con = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, cached_statements=DB_STMT_CACHE)
     con.row_factory = sqlite3.Row
-    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS};")
     con.execute("PRAGMA synchronous=NORMAL;")
+    con.execute("PRAGMA foreign_keys=ON;")
+    con.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE};")
+    con.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB};")
     return con
 
-def _ensure_column(table: str, col: str, col_def: str):
-    with _connect() as con:
-        cols = [r["name"] for r in con.execute(f"PRAGMA table_info({table})").fetchall()]
-        if col not in cols:
-            con.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_def};")
+def _connect(db_path: str = DB_PATH, readonly: bool = False):
+    """
+    현재 스레드의 연결을 재사용해서 반환(없으면 생성). 닫지 말고 `with con:` 으로 트랜잭션만 묶을 것.
+    readonly=True 는 UI 조회용(mode=ro) 연결.
+    """
+    _init_db(db_path)
+    conns = getattr(_tls, "conns", None)
+    if conns is None:
+        conns = _tls.conns = {}
+    key = (os.path.abspath(db_path), readonly)
+    con = conns.get(key)
+    if con is None:
+        con = conns[key] = _open(db_path, readonly)
+    return con
 
-def _init_db():
-    with _connect() as con:
-        con.executescript(DDL)
+def read_connection(db_path: str = DB_PATH):
+    return _connect(db_path, readonly=True)
+
+def close_connections():
+    """현재 스레드가 들고 있는 연결 정리"""
+    for con in (getattr(_tls, "conns", None) or {}).values():
+        try:
+            con.close()
+        except Exception:
+            pass
+    _tls.conns = {}
+
+def checkpoint(db_path=DB_PATH, mode="TRUNCATE"):
+    _connect(db_path).execute(f"PRAGMA wal_checkpoint({mode});")
+
+def _ensure_column(con, table: str, col: str, col_def: str):
+    cols = [r["name"] for r in con.execute(f"PRAGMA table_info({table})").fetchall()]
+    if col not in cols:
+        con.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_def};")
+
+def _migrate(con):
+    # 카카오 place id: 매장 식별의 기준 키
+    _ensure_column(con, "stores", "kakao_id", "TEXT")
+    con.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_stores_kakao_id ON stores(kakao_id);")
+
+    # 크롤링 시각(비정규화) 컬럼: 예전 DB는 리뷰 last_seen 으로 백필
+    _ensure_column(con, "stores", "last_crawled_at", "TEXT")
+    for src in SOURCES:
+        _ensure_column(con, "stores", f"{src}_crawled_at", "TEXT")
+    con.execute("""
+        UPDATE stores
+        SET last_crawled_at = (SELECT MAX(r.last_seen) FROM reviews r WHERE r.store_id = stores.id)
+        WHERE last_crawled_at IS NULL
+    """)
+    # 별칭 인덱스가 생기기 전 매장들의 이름 등록
+    for r in con.execute("""
+        SELECT id, store_name FROM stores
+        WHERE id NOT IN (SELECT store_id FROM store_aliases)
+    """).fetchall():
+        _register_aliases(con, r["id"], [(r["store_name"], "api")])
+    for src in SOURCES:
+        con.execute(f"""
+            UPDATE stores
+            SET {src}_crawled_at = (SELECT MAX(r.last_seen) FROM reviews r
+                                    WHERE r.store_id = stores.id AND r.source = '{src}')
+            WHERE {src}_crawled_at IS NULL
+        """)
+
+    # 스팸/광고 필터: 점수 컬럼 + 매장 간 복붙 리뷰 비교용 정규화 해시
+    _ensure_column(con, "reviews", "norm_hash", "TEXT")
+    _ensure_column(con, "reviews", "spam_score", "REAL")
+    _ensure_column(con, "reviews", "spam_reasons", "TEXT")
+    _ensure_column(con, "reviews", "filter_version", "INTEGER")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_reviews_norm_hash ON reviews(norm_hash);")
+    rows = con.execute("SELECT id, review FROM reviews WHERE norm_hash IS NULL").fetchall()
+    if rows:
+        con.executemany("UPDATE reviews SET norm_hash = ? WHERE id = ?",
+                        [(review_filter.norm_hash(r["review"]), r["id"]) for r in rows])
+
+def _init_db(db_path: str = DB_PATH):
+    """프로세스당 DB 파일별 1회만 WAL 설정 + DDL + 마이그레이션"""
+    key = os.path.abspath(db_path)
+    if key in _initialized_paths:
+        return
+    with _init_lock:
+        if key in _initialized_paths:
+            return
+        con = _open(db_path)
+        try:
+            con.execute("PRAGMA journal_mode=WAL;")
+            con.executescript(DDL)
+            with con:
+                _migrate(con)
+        finally:
+            con.close()
+        _initialized_paths.add(key)
 
 def _as_float_or_none(x):
     try:
@@ -151,7 +423,9 @@ def _parse_lat_lng_from_address(addr: Optional[str]) -> Tuple[Optional[float], O
     try: return float(m.group(1)), float(m.group(2))
     except Exception: return None, None
 
-def _make_store_key(name: str, address: Optional[str]) -> str:
+def _make_store_key(name: str, address: Optional[str], kakao_id: Optional[str] = None) -> str:
+    if kakao_id:
+        return f"kakao:{kakao_id}"
     base = f"{_norm_text(name)}|{_norm_text(address)}"
     return hashlib.sha256(base.encode("utf-8")).hexdigest()
 
@@ -159,10 +433,10 @@ def _make_review_hash(store_id: int, source: Optional[str], review: Optional[str
     base = f"{store_id}|{_norm_text(source)}|{_norm_text(review)}"
     return hashlib.sha256(base.encode("utf-8")).hexdigest()
 
-def get_top5_store_pairs(keyword: str, lat: float, lon: float, query: str) -> List[Tuple[str, Optional[str], Optional[Tuple[Optional[float], Optional[float]]]]]:
+def get_top5_store_pairs(keyword: str, lat: float, lon: float, query: str) -> List[Tuple[str, Optional[str], Optional[Tuple[Optional[float], Optional[float]]], Optional[str]]]:
     """
-    반환: [(store_name, address, (lat,lng)), ...] 최대 5개
-    f_multi_kakao_tool.run_multi() → {"매장명": (주소, (lat,lng))}
+    반환: [(store_name, address, (lat,lng), kakao_id), ...] 최대 5개
+    kakaoapi.kakao_keyword_nearby() → {"매장명": (주소, (lat,lng), place_id)}
     """
     # ✅ 분기: '근처 ' 접두어 → GPS 반경 검색 / 아니면 키워드만 검색
     kw = (keyword or "").strip()
@@ -181,126 +455,524 @@ def get_top5_store_pairs(keyword: str, lat: float, lon: float, query: str) -> Li
         ret, distance = kakaoapi.kakao_keyword_nearby(lat=lat, lon=lon,
             query=kw, TOP_N_STORES=TOP_N_STORES
         )
-    pairs: List[Tuple[str, Optional[str], Optional[Tuple[Optional[float], Optional[float]]]]] = []
+    pairs: List[Tuple[str, Optional[str], Optional[Tuple[Optional[float], Optional[float]]], Optional[str]]] = []
     if isinstance(ret, dict):
         for name, val in list(ret.items())[:TOP_N_STORES]:
-            addr, latlng = None, None
+            addr, latlng, kid = None, None, None
             if isinstance(val, tuple):
                 if len(val) >= 1: addr = val[0]
                 if len(val) >= 2 and isinstance(val[1], tuple): latlng = val[1]
+                if len(val) >= 3 and val[2]: kid = str(val[2])
             elif isinstance(val, str):
                 addr = val
-            pairs.append((str(name).strip(), addr, latlng))
+            pairs.append((str(name).strip(), addr, latlng, kid))
     return pairs[:TOP_N_STORES], distance
 
 
-def latest_age_days(store_name: str) -> Optional[float]:
+# 매장명/별칭 해석
+_BRACKET_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_BRANCH_RE = re.compile(r"\s+\S*점$")        # "미방 정자점" → "미방"
+_ALIAS_STATS = {"lookups": 0, "exact": 0, "fuzzy": 0, "miss": 0}
+_alias_lock = threading.Lock()
+
+def _norm_store_name(name: Optional[str]) -> str:
+    s = _BRACKET_RE.sub("", str(name or "")).lower()
+    return re.sub(r"[\s\W_]+", "", s)
+
+def _name_variants(name: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(정규화 이름, 지점 접미사를 뗀 이름 또는 None)"""
+    raw = _BRACKET_RE.sub("", str(name or "")).strip()
+    full = _norm_store_name(raw)
+    base = _norm_store_name(_BRANCH_RE.sub("", raw))
+    return full, (base if base and base != full else None)
+
+def _branch_suffix(name: Optional[str]) -> Optional[str]:
+    """정규화한 지점 접미사("스타벅스 정자역점" → "정자역점") 또는 None"""
+    m = _BRANCH_RE.search(_BRACKET_RE.sub("", str(name or "")).strip())
+    return _norm_store_name(m.group(0)) if m else None
+
+def _branches_differ(a: Optional[str], b: Optional[str]) -> bool:
+    sa, sb = _branch_suffix(a), _branch_suffix(b)
+    return bool(sa and sb and sa != sb)
+
+def _names_match(a: Optional[str], b: Optional[str]) -> bool:
+    """
+    같은 매장 이름인지: 정규화 일치, 한쪽만 지점명이 붙은 경우(미방 ↔ 미방 정자점), 퍼지 유사도.
+    양쪽 다 지점명이 있는데 서로 다르면(정자역점 ↔ 정자점, 정자1호점 ↔ 정자2호점) 유사도와 무관하게 다른 매장.
+    """
+    fa, ba = _name_variants(a)
+    fb, bb = _name_variants(b)
+    if not fa or not fb or _branches_differ(a, b):
+        return False
+    if fa == fb or (ba and not bb and ba == fb) or (bb and not ba and bb == fa):
+        return True
+    return difflib.SequenceMatcher(None, fa, fb).ratio() >= ALIAS_FUZZY_MIN
+
+def _bump_alias_stat(key: str):
+    with _alias_lock:
+        _ALIAS_STATS["lookups"] += 1
+        _ALIAS_STATS[key] += 1
+
+def alias_hit_rate() -> Dict[str, Any]:
+    with _alias_lock:
+        st = dict(_ALIAS_STATS)
+    st["hit_rate"] = (st["exact"] + st["fuzzy"]) / st["lookups"] if st["lookups"] else None
+    return st
+
+def _register_aliases(con, store_id: int, aliases: List[Tuple[str, str]]):
+    """aliases: [(이름 또는 'kakao:<id>', kind)] — 이미 다른 매장에 묶인 별칭은 건드리지 않음"""
+    rows = []
+    for alias, kind in aliases:
+        if not alias:
+            continue
+        if kind == "kakao":
+            rows.append((alias, store_id, alias, kind, 0))
+            continue
+        full, base = _name_variants(alias)
+        if full:
+            rows.append((full, store_id, alias, kind, 0))
+        if base:
+            rows.append((base, store_id, alias, kind, 1))
+    if rows:
+        con.executemany("""
+            INSERT INTO store_aliases (alias_norm, store_id, alias, kind, is_base) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(alias_norm) DO NOTHING
+        """, rows)
+
+def _norm_address(addr: Optional[str]) -> str:
+    return re.sub(r"\s+", "", str(addr or "")).lower()
+
+def _same_place(con, store_id: int, address: Optional[str], latlng) -> bool:
+    """이름으로 찾은 매장이 실제 같은 장소인지: 좌표가 ALIAS_MAX_DIST_M 이내거나 주소가 같을 때만 True"""
+    r = con.execute("SELECT address, lat, lng FROM stores WHERE id = ?", (store_id,)).fetchone()
+    if r is None:
+        return False
+    lat, lng = (tuple(latlng or ()) + (None, None))[:2]
+    if None not in (lat, lng, r["lat"], r["lng"]):
+        try:
+            return kakaoapi.haversine_m(float(lat), float(lng), float(r["lat"]), float(r["lng"])) <= ALIAS_MAX_DIST_M
+        except (TypeError, ValueError):
+            pass
+    a, b = _norm_address(address), _norm_address(r["address"])
+    return bool(a and b and a == b)
+
+def _resolve_name(con, name: str, address: Optional[str] = None, latlng=None) -> Optional[int]:
+    """
+    별칭 인덱스에서 매장명 → store_id.
+    1) 정규화 이름이 별칭(지점명 뗀 별칭 포함)과 일치 2) 지점명 뗀 이름이 지점명 없는 별칭과 일치
+    3) 같은 접두어 후보 중 퍼지 매칭 (지점명이 서로 다른 후보는 제외)
+    찾은 매장의 주소/좌표가 address/latlng 와 맞지 않으면 다른 지점으로 보고 None.
+    """
+    full, base = _name_variants(name)
+    if not full:
+        return None
+    row = con.execute("SELECT alias_norm, alias, store_id FROM store_aliases WHERE alias_norm = ?",
+                      (full,)).fetchone()
+    if row is None and base:
+        row = con.execute("SELECT alias_norm, alias, store_id FROM store_aliases WHERE alias_norm = ? AND is_base = 0",
+                          (base,)).fetchone()
+    kind = "exact"
+    if row is not None and _branches_differ(name, row["alias"]):
+        row = None
+    if row is None:
+        kind, best_ratio = "fuzzy", ALIAS_FUZZY_MIN
+        prefix = full[:2]
+        cands = con.execute("""
+            SELECT alias_norm, alias, store_id FROM store_aliases
+            WHERE alias_norm >= ? AND alias_norm < ? AND kind != 'kakao' AND is_base = 0
+            LIMIT 500
+        """, (prefix, prefix + "\U0010ffff")).fetchall()
+        for c in cands:
+            if _branches_differ(name, c["alias"]):
+                continue
+            ratio = difflib.SequenceMatcher(None, full, c["alias_norm"]).ratio()
+            if ratio >= best_ratio:
+                row, best_ratio = c, ratio
+    if row is None or not _same_place(con, int(row["store_id"]), address, latlng):
+        _bump_alias_stat("miss")
+        return None
+    con.execute("UPDATE store_aliases SET hits = hits + 1 WHERE alias_norm = ?", (row["alias_norm"],))
+    _bump_alias_stat(kind)
+    return int(row["store_id"])
+
+def _lookup_store_ids(con, kakao_ids: List[str]) -> Dict[str, int]:
+    """kakao place id → store_id (stores.kakao_id 우선, 없으면 'kakao:<id>' 별칭)"""
+    kakao_ids = [k for k in kakao_ids if k]
+    if not kakao_ids: return {}
+    ph = ",".join(["?"] * len(kakao_ids))
+    out = {r["kakao_id"]: int(r["id"]) for r in
+           con.execute(f"SELECT id, kakao_id FROM stores WHERE kakao_id IN ({ph})", kakao_ids).fetchall()}
+    missing = [f"kakao:{k}" for k in kakao_ids if k not in out]
+    if missing:
+        ph = ",".join(["?"] * len(missing))
+        for r in con.execute(f"SELECT alias_norm, store_id FROM store_aliases WHERE alias_norm IN ({ph})",
+                             missing).fetchall():
+            out[r["alias_norm"][len("kakao:"):]] = int(r["store_id"])
+    return out
+
+def resolve_store_ids(pairs) -> Dict[str, int]:
+    """
+    top-N (name, address, latlng, kakao_id) → {kakao_id: store_id}.
+    id 로 못 찾은 매장은 이름 별칭(정규화/지점명/퍼지)으로 찾되 주소나 좌표까지 맞을 때만 받아들이고,
+    찾으면 'kakao:<id>' 별칭을 남겨 다음엔 바로 맞춘다.
+    """
+    con = _connect()
+    with con:
+        out = _lookup_store_ids(con, [kid for (_n, _a, _ll, kid) in pairs])
+        for name, addr, ll, kid in pairs:
+            if not kid or kid in out:
+                continue
+            sid = _resolve_name(con, name, addr, ll)
+            if sid is not None:
+                out[kid] = sid
+                _register_aliases(con, sid, [(f"kakao:{kid}", "kakao"), (name, "api")])
+    return out
+
+def store_ages_days(kakao_ids: List[str]) -> Dict[str, Optional[float]]:
+    """
+    카카오 place id별 마지막 크롤링 이후 경과일을 쿼리 한 번으로 계산. 기록이 없으면 None.
+    """
+    out: Dict[str, Optional[float]] = {k: None for k in kakao_ids}
+    con = _connect()
+    sid_map = _lookup_store_ids(con, kakao_ids)
+    if not sid_map: return out
+    placeholders = ",".join(["?"] * len(sid_map))
+    q = f"""
+    SELECT id, julianday('now') - julianday(last_crawled_at) AS age_days
+    FROM stores
+    WHERE id IN ({placeholders})
+    """
+    ages = {r["id"]: r["age_days"] for r in con.execute(q, list(sid_map.values())).fetchall()}
+    for kid, sid in sid_map.items():
+        try: out[kid] = float(ages[sid]) if ages.get(sid) is not None else None
+        except Exception: pass
+    return out
+
+def latest_age_days(kakao_id: str) -> Optional[float]:
+    return store_ages_days([kakao_id]).get(kakao_id)
+
+def _source_ttl_days(source: str, stale_days: Optional[float] = None) -> float:
+    return stale_days if stale_days is not None else SOURCE_TTL_DAYS.get(source, STALE_DAYS)
+
+def _outcome_ttl_days(status: str, error_count: int, ok_ttl_days: float) -> float:
+    if status == "ok":
+        return ok_ttl_days
+    if status == "error":
+        minutes = ERROR_BACKOFF_BASE_MIN * (2 ** max(int(error_count or 1) - 1, 0))
+        return min(minutes, ERROR_BACKOFF_MAX_MIN) / (24 * 60)
+    return OUTCOME_TTL_DAYS.get(status, 0)
+
+def source_freshness(kakao_ids: List[str], stale_days: Optional[float] = None) -> Dict[str, Dict[str, bool]]:
+    """
+    {kakao_id: {source: 신선 여부}} 를 쿼리 한 번으로 계산.
+    소스별 마지막 결과(ok/empty/not_found/error)의 TTL 안이면 신선(ok 는 SOURCE_TTL_DAYS).
+    결과 기록이 없는 예전 매장은 stores.<source>_crawled_at 기준으로 판단한다.
+    """
+    out = {k: {src: False for src in SOURCES} for k in kakao_ids}
+    con = _connect()
+    sid_map = _lookup_store_ids(con, kakao_ids)
+    if not sid_map: return out
+    placeholders = ",".join(["?"] * len(sid_map))
+    q = f"""
+    SELECT s.id AS store_id,
+           julianday('now') - julianday(s.kakao_crawled_at)  AS kakao_age,
+           julianday('now') - julianday(s.google_crawled_at) AS google_age,
+           julianday('now') - julianday(s.naver_crawled_at)  AS naver_age,
+           o.source, o.status, o.error_count,
+           julianday('now') - julianday(o.crawled_at) AS age
+    FROM stores s
+    LEFT JOIN crawl_outcomes o ON o.store_id = s.id
+    WHERE s.id IN ({placeholders})
+    """
+    by_sid: Dict[int, Dict[str, bool]] = {}
+    for r in con.execute(q, list(set(sid_map.values()))).fetchall():
+        fresh = by_sid.setdefault(r["store_id"], {})
+        if r["source"] is None:
+            for src in SOURCES:
+                age = r[f"{src}_age"]
+                fresh[src] = age is not None and age <= _source_ttl_days(src, stale_days)
+        elif r["age"] is not None:
+            ttl = _outcome_ttl_days(r["status"], r["error_count"], _source_ttl_days(r["source"], stale_days))
+            fresh[r["source"]] = r["age"] <= ttl
+    for kid, sid in sid_map.items():
+        out[kid].update(by_sid.get(sid, {}))
+    return out
+
+def place_urls_for(kakao_ids: List[str]) -> Dict[str, Dict[str, str]]:
+    """{kakao_id: {source: 캐시된 상세 URL}}"""
+    con = read_connection()
+    sids = _lookup_store_ids(con, kakao_ids)
+    if not sids:
+        return {}
+    by_sid = {sid: kid for kid, sid in sids.items()}
+    q = f"SELECT store_id, source, url FROM place_urls WHERE store_id IN ({','.join('?' * len(by_sid))})"
+    out: Dict[str, Dict[str, str]] = {}
+    for r in con.execute(q, list(by_sid)):
+        out.setdefault(by_sid[r["store_id"]], {})[r["source"]] = r["url"]
+    return out
+
+# 공간 조회 (R*Tree)
+_METERS_PER_DEG_LAT = 111320.0
+
+def stores_in_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                   limit: Optional[int] = 200) -> List[Dict[str, Any]]:
+    """
+    bbox 안의 매장을 bbox 중심에 가까운 순으로 최대 limit개 반환.
+    R*Tree는 float32 라 경계가 살짝 넓게 잡히므로 stores.lat/lng 로 한 번 더 거른다.
+    """
+    c_lat = (min_lat + max_lat) / 2.0
+    c_lng = (min_lng + max_lng) / 2.0
     q = """
-    SELECT julianday('now') - julianday(MAX(r.last_seen)) AS age_days
-    FROM reviews r
-    JOIN stores s ON r.store_id = s.id
-    WHERE s.store_name = ?
+    SELECT s.id, s.store_name, s.address, s.lat, s.lng, s.img1
+    FROM stores_rtree t
+    JOIN stores s ON s.id = t.id
+    WHERE t.max_lat >= ? AND t.min_lat <= ?
+      AND t.max_lng >= ? AND t.min_lng <= ?
+      AND s.lat BETWEEN ? AND ?
+      AND s.lng BETWEEN ? AND ?
+    ORDER BY (s.lat - ?) * (s.lat - ?) + (s.lng - ?) * (s.lng - ?)
+    LIMIT ?
+    """
+    params = (min_lat, max_lat, min_lng, max_lng,
+              min_lat, max_lat, min_lng, max_lng,
+              c_lat, c_lat, c_lng, c_lng,
+              limit if limit and limit > 0 else -1)
+    rows = read_connection().execute(q, params).fetchall()
+    return [dict(r) for r in rows]
+
+def stores_within_radius(lat: float, lng: float, radius_m: float,
+                         limit: Optional[int] = 50) -> List[Dict[str, Any]]:
+    """
+    (lat, lng) 반경 radius_m 안의 매장을 가까운 순으로 최대 limit개 반환(distance_m 포함).
     """
-    with _connect() as con:
-        row = con.execute(q, (store_name,)).fetchone()
-    if not row or row["age_days"] is None: return None
-    try: return float(row["age_days"])
-    except Exception: return None
+    dlat = radius_m / _METERS_PER_DEG_LAT
+    dlng = radius_m / (_METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    cands = stores_in_bbox(lat - dlat, lng - dlng, lat + dlat, lng + dlng, limit=None)
+
+    out = []
+    for r in cands:
+        d = kakaoapi.haversine_m(lat, lng, r["lat"], r["lng"])
+        if d <= radius_m:
+            r["distance_m"] = int(d)
+            out.append(r)
+    out.sort(key=lambda r: r["distance_m"])
+    return out[:limit] if limit and limit > 0 else out
 
 # 업서트(메모리 → DB)
 UPSERT_STORE_SQL = """
-INSERT INTO stores (store_name, address, lat, lng, img1, img2, img3, store_key)
-VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+INSERT INTO stores (store_name, address, lat, lng, img1, img2, img3, store_key, kakao_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
 ON CONFLICT(store_key) DO UPDATE SET
   store_name  = excluded.store_name,
+  kakao_id    = COALESCE(excluded.kakao_id, stores.kakao_id),
   address     = excluded.address,
   lat         = COALESCE(excluded.lat, stores.lat),
   lng         = COALESCE(excluded.lng, stores.lng),
   img1        = COALESCE(excluded.img1, stores.img1),
   img2        = COALESCE(excluded.img2, stores.img2),
   img3        = COALESCE(excluded.img3, stores.img3),
-  updated_at  = datetime('now');
+  updated_at  = datetime('now')
+RETURNING id;
 """
 UPSERT_REVIEW_SQL = """
-INSERT INTO reviews (store_id, source, review, review_hash)
-VALUES (?, ?, ?, ?)
+INSERT INTO reviews (store_id, source, review, review_hash, norm_hash)
+VALUES (?, ?, ?, ?, ?)
 ON CONFLICT(review_hash) DO UPDATE SET
   source    = excluded.source,
   review    = excluded.review,
+  norm_hash = excluded.norm_hash,
   last_seen = datetime('now');
 """
 
-def _upsert_one_store(con, name, address, lat, lng, store_images):
+UPSERT_OUTCOME_SQL = """
+INSERT INTO crawl_outcomes (store_id, source, status, error_count, crawled_at)
+VALUES (?, ?, ?, CASE WHEN ? = 'error' THEN 1 ELSE 0 END, datetime('now'))
+ON CONFLICT(store_id, source) DO UPDATE SET
+  status      = excluded.status,
+  error_count = CASE WHEN excluded.status = 'error' THEN crawl_outcomes.error_count + 1 ELSE 0 END,
+  crawled_at  = excluded.crawled_at;
+"""
+UPSERT_PLACE_URL_SQL = """
+INSERT INTO place_urls (store_id, source, url) VALUES (?, ?, ?)
+ON CONFLICT(store_id, source) DO UPDATE SET
+  url         = excluded.url,
+  resolved_at = CASE WHEN excluded.url = place_urls.url THEN place_urls.resolved_at ELSE datetime('now') END;
+"""
+DELETE_PLACE_URL_SQL = "DELETE FROM place_urls WHERE store_id = ? AND source = ?;"
+MARK_CRAWLED_SQL = """
+UPDATE stores SET
+  last_crawled_at   = datetime('now'),
+  kakao_crawled_at  = CASE WHEN ? THEN datetime('now') ELSE kakao_crawled_at END,
+  google_crawled_at = CASE WHEN ? THEN datetime('now') ELSE google_crawled_at END,
+  naver_crawled_at  = CASE WHEN ? THEN datetime('now') ELSE naver_crawled_at END
+WHERE id = ?;
+"""
+
+# place id 가 없던 시절(이름|주소 해시 키)의 행을 id 키로 승격
+ADOPT_LEGACY_STORE_SQL = """
+UPDATE stores SET store_key = ?, kakao_id = ?
+WHERE store_key = ? AND kakao_id IS NULL
+  AND NOT EXISTS (SELECT 1 FROM stores WHERE store_key = ? OR kakao_id = ?);
+"""
+
+def _upsert_one_store(con, name, address, lat, lng, store_images, kakao_id=None):
     img1 = img2 = img3 = None
     if isinstance(store_images, list):
         if len(store_images) > 0: img1 = store_images[0]
         if len(store_images) > 1: img2 = store_images[1]
         if len(store_images) > 2: img3 = store_images[2]
 
-    store_key = _make_store_key(name, address)
-    con.execute(UPSERT_STORE_SQL, (name, address, lat, lng, img1, img2, img3, store_key))
-    sid = con.execute("SELECT id FROM stores WHERE store_key=?", (store_key,)).fetchone()[0]
-    return int(sid)
+    store_key = _make_store_key(name, address, kakao_id)
+    if kakao_id:
+        con.execute(ADOPT_LEGACY_STORE_SQL,
+                    (store_key, kakao_id, _make_store_key(name, address), store_key, kakao_id))
+    rows = con.execute(UPSERT_STORE_SQL,
+                       (name, address, lat, lng, img1, img2, img3, store_key, kakao_id)).fetchall()
+    return int(rows[0][0])
+
+def _normalize_result_store(obj: dict) -> Tuple[Optional[str], Optional[float], Optional[float]]:
+    address_raw = (obj or {}).get("address")      # <-- 튜플일 수 있음
+
+    # 주소 문자열 안의 "(lat,lng)" 패턴 파싱이 따로 있다면 먼저 적용 (옵션)
+    lat0, lng0 = _parse_lat_lng_from_address(address_raw if isinstance(address_raw, str) else None)
+
+    # ⭐ 최종적으로 주소/좌표를 정규화(문자열, float)
+    return _split_address_latlng(address_raw, lat0, lng0)
+
+def _collect_review_texts(obj: dict) -> List[Tuple[str, str]]:
+    out = []
+    for source in SOURCES:
+        reviews = ((obj or {}).get(source) or {}).get("reviews") or []
+        for rv in reviews:
+            rv_text = str(rv or "").strip()
+            if rv_text:
+                out.append((source, rv_text))
+    return out
+
+def upsert_from_results(results: dict, db_path: str = DB_PATH) -> dict:
+    """
+    크롤링 배치 전체를 한 트랜잭션으로 저장.
+    매장은 INSERT ... RETURNING 으로 id를 바로 받고, 리뷰는 해시를 미리 만들어 executemany 한 번으로 쓴다.
+    """
+    # 트랜잭션 밖에서 정규화
+    prepared = []
+    for name, obj in results.items():
+        address, lat, lng = _normalize_result_store(obj)
+        kakao_id = (obj or {}).get("kakao_id")
+        aliases = [(name, "api"), ((obj or {}).get("crawled_name"), "crawled")] + list((obj or {}).get("aliases") or [])
+        prepared.append((name, address, lat, lng, (obj or {}).get("store_image"),
+                         str(kakao_id) if kakao_id else None, aliases, _collect_review_texts(obj)))
 
-def upsert_from_results(results: dict) -> dict:
     store_ids = {}
-    with _connect() as con:
-        with con:
-            for name, obj in results.items():
-                address_raw = (obj or {}).get("address")      # <-- 지금은 튜플일 수 있음
-                store_image = (obj or {}).get("store_image")
-
-                # 주소 문자열 안의 "(lat,lng)" 패턴 파싱이 따로 있다면 먼저 적용 (옵션)
-                lat0, lng0 = _parse_lat_lng_from_address(address_raw if isinstance(address_raw, str) else None)
-
-                # ⭐ 최종적으로 주소/좌표를 정규화(문자열, float)
-                address, lat, lng = _split_address_latlng(address_raw, lat0, lng0)
-
-                # 이제부터 address는 str, lat/lng는 float/None 보장
-                sid = _upsert_one_store(con, name, address, lat, lng, store_image)
-                store_ids[name] = sid
-
-                for source in ("kakao", "google", "naver"):
-                    reviews = ((obj or {}).get(source) or {}).get("reviews") or []
-                    for rv in reviews:
-                        rv_text = str(rv or "").strip()
-                        if not rv_text:
-                            continue
-                        rh = _make_review_hash(sid, source, rv_text)
-                        con.execute(UPSERT_REVIEW_SQL, (sid, source, rv_text, rh))
+    con = _connect(db_path)
+    with con:
+        review_rows, crawl_rows, outcome_rows, url_rows, url_drops = [], [], [], [], []
+        for name, address, lat, lng, store_image, kakao_id, aliases, texts in prepared:
+            sid = _upsert_one_store(con, name, address, lat, lng, store_image, kakao_id)
+            store_ids[name] = sid
+            _register_aliases(con, sid, aliases)
+            review_rows.extend((sid, src, txt, _make_review_hash(sid, src, txt), review_filter.norm_hash(txt))
+                               for src, txt in texts)
+            if texts:
+                got = {src for src, _ in texts}
+                crawl_rows.append(tuple(int(src in got) for src in SOURCES) + (sid,))
+            for src in SOURCES:
+                src_obj = (results[name] or {}).get(src) or {}
+                status = src_obj.get("status")
+                if status:
+                    outcome_rows.append((sid, src, status, status))
+                # 도구가 URL 을 돌려주면 저장, 검색으로도 매장을 못 찾았으면 캐시 URL 폐기
+                if src_obj.get("place_url"):
+                    url_rows.append((sid, src, src_obj["place_url"]))
+                elif "place_url" in src_obj and status == "not_found":
+                    url_drops.append((sid, src))
+        if review_rows:
+            con.executemany(UPSERT_REVIEW_SQL, review_rows)
+        if crawl_rows:
+            con.executemany(MARK_CRAWLED_SQL, crawl_rows)
+        if outcome_rows:
+            con.executemany(UPSERT_OUTCOME_SQL, outcome_rows)
+        if url_rows:
+            con.executemany(UPSERT_PLACE_URL_SQL, url_rows)
+        if url_drops:
+            con.executemany(DELETE_PLACE_URL_SQL, url_drops)
     return store_ids
 
-def crawl_one_store(store_name: str) -> Dict[str, Any]:
+def crawl_one_store(store_name: str, sources=SOURCES, place_urls=None) -> Dict[str, Any]:
     return f_multi_main_tool.collect_all_reviews_parallel(
-        keyword=store_name, top_n=1, max_reviews=CRAWL_MAX_REVIEWS, headless=CRAWL_HEADLESS
+        keyword=store_name, top_n=1, max_reviews=CRAWL_MAX_REVIEWS, headless=CRAWL_HEADLESS,
+        sources=tuple(sources), place_urls=place_urls
     )
 
-def fetch_reviews_for_store_list(store_names: List[str],
-                                 per_source_limit: Optional[int] = PER_SOURCE_LIMIT) -> List[Dict[str, Any]]:
-    if not store_names: return []
-    placeholders = ",".join(["?"] * len(store_names))
+def filter_reviews_for_stores(kakao_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    LLM 앞단 스팸/광고 필터. 매장들의 리뷰에 review_filter 점수를 매겨 reviews.spam_score 에 저장한다.
+    매장 간 복붙 여부는 다른 매장 리뷰가 늘면 바뀌므로 매번 다시 보고, 점수가 바뀐 행만 쓴다.
+    반환: {kakao_id: {"total", "filtered", "reasons": {사유: 건수}}}
+    """
+    if not kakao_ids: return {}
+    con = _connect()
+    sid_map = _lookup_store_ids(con, kakao_ids)
+    if not sid_map: return {}
+    kid_of = {sid: kid for kid, sid in sid_map.items()}
+    rows = con.execute(f"""
+        SELECT r.id, r.store_id, r.review, r.norm_hash, r.spam_score, r.spam_reasons, r.filter_version,
+               (SELECT COUNT(DISTINCT o.store_id) FROM reviews o WHERE o.norm_hash = r.norm_hash) AS store_count
+        FROM reviews r WHERE r.store_id IN ({",".join("?" * len(kid_of))})
+    """, list(kid_of)).fetchall()
+
+    stats = {kid: {"total": 0, "filtered": 0, "reasons": {}} for kid in kid_of.values()}
+    updates = []
+    for r in rows:
+        score, reasons = review_filter.score_review(r["review"])
+        score, reasons = review_filter.with_cross_store(score, reasons, r["store_count"] or 0, r["review"])
+        reasons_json = json.dumps(reasons)
+        if (r["spam_score"], r["spam_reasons"], r["filter_version"]) != (score, reasons_json, review_filter.FILTER_VERSION):
+            updates.append((score, reasons_json, review_filter.FILTER_VERSION, r["id"]))
+        st = stats[kid_of[r["store_id"]]]
+        st["total"] += 1
+        if score >= review_filter.SPAM_THRESHOLD:
+            st["filtered"] += 1
+            for reason in reasons:
+                st["reasons"][reason] = st["reasons"].get(reason, 0) + 1
+    if updates:
+        with con:
+            con.executemany("UPDATE reviews SET spam_score = ?, spam_reasons = ?, filter_version = ? WHERE id = ?", updates)
+    return stats
+
+def fetch_reviews_for_store_list(kakao_ids: List[str],
+                                 per_source_limit: Optional[int] = PER_SOURCE_LIMIT,
+                                 max_spam_score: Optional[float] = review_filter.SPAM_THRESHOLD) -> List[Dict[str, Any]]:
+    """max_spam_score 이상으로 점수가 매겨진 리뷰는 제외 (None 이면 전부)"""
+    if not kakao_ids: return []
+    con = _connect()
+    sid_map = _lookup_store_ids(con, kakao_ids)
+    if not sid_map: return []
+    kid_of = {sid: kid for kid, sid in sid_map.items()}
+    placeholders = ",".join(["?"] * len(kid_of))
     sql = f"""
-    SELECT s.store_name, s.address, s.lat, s.lng,
+    SELECT s.id AS store_id, s.store_name, s.address, s.lat, s.lng,
        s.img1, s.img2, s.img3,
        r.source, r.review, r.last_seen
     FROM reviews r
     JOIN stores s ON r.store_id = s.id
-    WHERE s.store_name IN ({placeholders})
-    ORDER BY s.store_name, r.source, r.last_seen DESC
+    WHERE s.id IN ({placeholders})
+      AND (? IS NULL OR r.spam_score IS NULL OR r.spam_score < ?)
+    ORDER BY s.id, r.source, r.last_seen DESC
     """
-    with _connect() as con:
-        rows = con.execute(sql, store_names).fetchall()
+    rows = con.execute(sql, list(kid_of) + [max_spam_score, max_spam_score]).fetchall()
 
     if per_source_limit and per_source_limit > 0:
         grouped = {}
         for row in rows:
-            key = (row["store_name"], row["source"] or "UNKNOWN")
+            key = (row["store_id"], row["source"] or "UNKNOWN")
             grouped.setdefault(key, []).append(row)
         rows = [r for (_k, lst) in grouped.items() for r in lst[:per_source_limit]]
 
     out = []
     for r in rows:
         out.append({
+            "kakao_id": kid_of[r["store_id"]],
             "store_name": r["store_name"],
             "address": r["address"],
             "lat": r["lat"],
@@ -320,82 +992,109 @@ def _second_token_or_first(q: str) -> Optional[str]:
         return None
     return toks[1] if len(toks) >= 2 else toks[0]
 
+def _attribute_crawl_result(res: Dict[str, Any], target_kid: str, pair_map: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    크롤링 결과를 top-N 매장에 귀속.
+    place id 가 같거나, 재작성 키워드로 다른 id 가 잡혔어도 이름이 같은 매장으로 해석되면 대상 매장으로 보고
+    크롤링 이름/다른 id 를 별칭으로 남긴다. 귀속된 결과는 이름/주소를 API 기준으로 맞춘다.
+    """
+    out: Dict[str, Any] = {}
+    t_name = pair_map[target_kid][0]
+    for n, obj in res.items():
+        kid = str(obj.get("kakao_id") or "")
+        if kid not in pair_map and (_names_match(n, t_name) or _names_match(obj.get("crawled_name"), t_name)):
+            obj["aliases"] = [(n, "crawled")] + ([(f"kakao:{kid}", "kakao")] if kid else [])
+            obj["kakao_id"] = kid = target_kid
+        if kid in pair_map:
+            n, a, ll = pair_map[kid]
+            obj["address"] = (a, ll)
+        out[n] = obj
+    return out
+
 # 메인
-def run_keyword_flow(keyword: str, lat: float, lon:float, query:str,
-                     stale_days: int = STALE_DAYS,
-                     per_source_limit: Optional[int] = PER_SOURCE_LIMIT) -> Dict[str, Any]:
-    def _extract_dong(text: str) -> Optional[str]:
-        if not text:
-            return None
-        m = re.search(r'([가-힣0-9]+동)\b', text)
-        return m.group(1) if m else None
-    _init_db()
+def _extract_dong(text: str) -> Optional[str]:
+    if not text:
+        return None
+    m = re.search(r'([가-힣0-9]+동)\b', text)
+    return m.group(1) if m else None
 
+def _plan_keyword_flow(keyword: str, lat: float, lon: float, query: str, stale_days: Optional[int],
+                       timings: Dict[str, float]):
+    """top-N 매장 조회 + 신선도 판단. 반환: (top5_pairs, distance, pair_map, top5_ids, need_crawl, to_crawl)"""
+    t0 = time.perf_counter()
     top5_pairs, distance = get_top5_store_pairs(keyword, lat, lon, query)
-    top5_names = [n for (n, _a, _ll) in top5_pairs]
+    top5_names = [n for (n, _a, _ll, _kid) in top5_pairs]
+    top5_ids = [kid for (_n, _a, _ll, kid) in top5_pairs if kid]
+    pair_map = {kid: (n, a, ll) for (n, a, ll, kid) in top5_pairs if kid}
+    timings["top5"] = time.perf_counter() - t0
     print(f"[INFO] Top-{len(top5_names)} stores:", ", ".join(top5_names))
 
-    need_crawl: List[str] = []
-    for name, addr, latlng in top5_pairs:
-        age = latest_age_days(name)
-        if age is None or age > stale_days:
-            need_crawl.append(name)
-
-    if need_crawl:
-        all_results: Dict[str, Any] = {}
-
-        pair_map = {n: (a, ll) for (n, a, ll) in top5_pairs}
-
-        to_crawl: List[Tuple[str, str]] = []
-        for name in need_crawl:
-            try:
-                addr, _latlng = pair_map.get(name, (None, None))
-
-                dong = _extract_dong(addr) or _extract_dong(keyword)
-
-                base_token = (name.split()[0] if name else "").strip()
-                if dong:
-                    n_keyword = f"{dong} {base_token}".strip()
-                else:
-                    n_keyword = base_token or name  # 둘 다 없으면 name 전체
-
-                to_crawl.append((name, n_keyword))
-            except Exception as e:
-                print(f"[PREP_ERROR] {name}: {e}")
-
-        with ThreadPoolExecutor(max_workers=CRAWL_MAX_WORKERS, thread_name_prefix="crawl") as ex:
-            future_map = {ex.submit(crawl_one_store, nkw): name for (name, nkw) in to_crawl}
-
-            for fut in as_completed(future_map):
-                name = future_map[fut]
-                try:
-                    res = fut.result()
-                    if isinstance(res, dict) and res:
-                        all_results.update(res)
-                except Exception as e:
-                    print(f"[CRAWL_ERROR] {name}: {e}")
-
-        if all_results:
-            for n, obj in all_results.items():
-                if n in pair_map:
-                    a, ll = pair_map[n]
-                    obj["address"] = (a, ll)
-
-            upsert_from_results(all_results)
-            checkpoint(db_path=DB_PATH)
-
-    rows = fetch_reviews_for_store_list(top5_names, per_source_limit=per_source_limit)
+    # 신선도 판단: top-N 전체를 쿼리 한 번으로
+    t0 = time.perf_counter()
+    resolve_store_ids(top5_pairs)
+    fresh = source_freshness(top5_ids, stale_days)
+    # 매장별로 오래됐거나 없는 소스만 크롤링
+    need_crawl: Dict[str, List[str]] = {k: [src for src in SOURCES if not fresh[k][src]] for k in top5_ids}
+    need_crawl = {k: v for k, v in need_crawl.items() if v}
+    timings["freshness"] = time.perf_counter() - t0
+
+    to_crawl: List[Tuple[str, str, List[str]]] = []
+    for kid, sources in need_crawl.items():
+        name, addr, _latlng = pair_map[kid]
+        try:
+            dong = _extract_dong(addr) or _extract_dong(keyword)
+
+            base_token = (name.split()[0] if name else "").strip()
+            if dong:
+                n_keyword = f"{dong} {base_token}".strip()
+            else:
+                n_keyword = base_token or name  # 둘 다 없으면 name 전체
+
+            to_crawl.append((kid, n_keyword, sources))
+        except Exception as e:
+            print(f"[PREP_ERROR] {name}: {e}")
+    return top5_pairs, distance, pair_map, top5_ids, need_crawl, to_crawl
+
+def _crawl_placeholder(kid: str, srcs: List[str], status: str, pair_map: Dict[str, Any]) -> Dict[str, Any]:
+    # 크롤링이 대상 매장을 못 만든 경우도 결과를 남겨 다음 검색에서 바로 재시도하지 않게 함
+    name, a, ll = pair_map[kid]
+    return {name: {"address": (a, ll), "kakao_id": kid, "store_image": None,
+                   **{src: {"reviews": [], "status": status if src in srcs else None} for src in SOURCES}}}
+
+def _reviews_for_stores(kakao_ids: List[str], pair_map: Dict[str, Any], per_source_limit: Optional[int],
+                        timings: Dict[str, float]) -> Dict[str, Any]:
+    """스팸 필터 → DB 리뷰 조회 → {API 매장명: 결과} (리뷰 없는 매장은 빠짐)"""
+    # 광고/협찬/일회성 악플은 점수만 남기고 요약 입력에서 뺀다
+    t0 = time.perf_counter()
+    spam = filter_reviews_for_stores(kakao_ids)
+    timings["filter"] = timings.get("filter", 0.0) + time.perf_counter() - t0
+    n_total = sum(v["total"] for v in spam.values())
+    n_filtered = sum(v["filtered"] for v in spam.values())
+    if n_filtered:
+        reasons: Dict[str, int] = {}
+        for v in spam.values():
+            for k, c in v["reasons"].items():
+                reasons[k] = reasons.get(k, 0) + c
+        print(f"[FILTER] 리뷰 {n_total}개 중 {n_filtered}개 제외 ("
+              + ", ".join(f"{k} {c}" for k, c in sorted(reasons.items(), key=lambda x: -x[1])) + ")")
+
+    t0 = time.perf_counter()
+    rows = fetch_reviews_for_store_list(kakao_ids, per_source_limit=per_source_limit)
+    timings["fetch"] = timings.get("fetch", 0.0) + time.perf_counter() - t0
 
     results: Dict[str, Any] = {}
     for r in rows:
-        store = r["store_name"]
+        # 결과 키는 API 매장명(거리 dict 와 같은 키)
+        store = pair_map[r["kakao_id"]][0]
         if store not in results:
             images = [x for x in (r["img1"], r["img2"], r["img3"]) if x]
             results[store] = {
+                "kakao_id": r["kakao_id"],
                 "address": r["address"],
                 "lat": r["lat"],
                 "lng": r["lng"],
                 "store_image": images,
+                "filtered": spam.get(r["kakao_id"], {}).get("filtered", 0),
                 "kakao": {"reviews": []},
                 "google": {"reviews": []},
                 "naver": {"reviews": []}
@@ -403,9 +1102,147 @@ def run_keyword_flow(keyword: str, lat: float, lon:float, query:str,
         src = (r["source"] or "").lower()
         if src in results[store]:
             results[store][src]["reviews"].append(r["review"])
+    return results
+
+def _print_flow_stats(timings: Dict[str, float], n_stale: int, n_total: int):
+    print("[TIME] " + ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in timings.items())
+          + f" (stale {n_stale}/{n_total})")
+    st = alias_hit_rate()
+    if st["lookups"]:
+        print(f"[ALIAS] hit rate {st['hit_rate'] * 100:.0f}% (exact {st['exact']}, fuzzy {st['fuzzy']}, miss {st['miss']})")
+
+def run_keyword_flow(keyword: str, lat: float, lon:float, query:str,
+                     stale_days: Optional[int] = None,
+                     per_source_limit: Optional[int] = PER_SOURCE_LIMIT) -> Dict[str, Any]:
+    timings: Dict[str, float] = {}
+    top5_pairs, distance, pair_map, top5_ids, need_crawl, to_crawl = \
+        _plan_keyword_flow(keyword, lat, lon, query, stale_days, timings)
+
+    if need_crawl:
+        all_results: Dict[str, Any] = {}
+        cached_urls = place_urls_for(list(need_crawl))
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=CRAWL_MAX_WORKERS, thread_name_prefix="crawl") as ex:
+            future_map = {ex.submit(crawl_one_store, nkw, srcs, {kid: cached_urls.get(kid, {})}): kid
+                          for (kid, nkw, srcs) in to_crawl}
+
+            failed: Dict[str, str] = {}
+            for fut in as_completed(future_map):
+                kid = future_map[fut]
+                try:
+                    res = fut.result()
+                    if isinstance(res, dict) and res:
+                        all_results.update(_attribute_crawl_result(res, kid, pair_map))
+                except Exception as e:
+                    print(f"[CRAWL_ERROR] {pair_map[kid][0]}: {e}")
+                    failed[kid] = "error"
+        timings["crawl"] = time.perf_counter() - t0
 
+        got_ids = {str(obj.get("kakao_id") or "") for obj in all_results.values()}
+        for kid, _nkw, srcs in to_crawl:
+            if kid not in got_ids:
+                all_results.update(_crawl_placeholder(kid, srcs, failed.get(kid, "not_found"), pair_map))
+
+        if all_results:
+            t0 = time.perf_counter()
+            upsert_from_results(all_results)
+            checkpoint(db_path=DB_PATH)
+            timings["upsert"] = time.perf_counter() - t0
+
+    results = _reviews_for_stores(top5_ids, pair_map, per_source_limit, timings)
+    _print_flow_stats(timings, len(need_crawl), len(top5_ids))
     return results, distance
 
+def iter_keyword_flow(keyword: str, lat: float, lon: float, query: str,
+                      stale_days: Optional[int] = None,
+                      per_source_limit: Optional[int] = PER_SOURCE_LIMIT,
+                      summary_workers: int = SUMMARY_PIPELINE_WORKERS,
+                      stream_one_liner: bool = False,
+                      **summary_kwargs):
+    """
+    크롤링 → 요약 파이프라인. 신선한 매장은 바로, 크롤링할 매장은 리뷰가 커밋되는 즉시 요약 큐에 넣고
+    끝나는 순서대로 내보낸다(전체 지연 ≈ max(크롤링, 요약)).
+    yield ("top", {"stores": [매장명...], "distance": {...}}) 한 번 →
+          ("store", {"store", "data", "summary"}) 매장마다 (리뷰가 없으면 data/summary 는 None)
+    stream_one_liner 면 LLM 이 한 줄 평을 쓰는 동안 ("partial", {"store", "one_liner"}) 도 섞어 보낸다.
+    summary_kwargs 는 summarize_store_with_rating 로 그대로 전달.
+    """
+    timings: Dict[str, float] = {}
+    t_start = time.perf_counter()
+    top5_pairs, distance, pair_map, top5_ids, need_crawl, to_crawl = \
+        _plan_keyword_flow(keyword, lat, lon, query, stale_days, timings)
+    yield "top", {"stores": [pair_map[k][0] for k in top5_ids], "distance": distance}
+
+    partials: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+    if stream_one_liner:
+        summary_kwargs["on_partial"] = lambda store, text: partials.put((store, text))
+
+    def _summarize(kid):
+        res = _reviews_for_stores([kid], pair_map, per_source_limit, {})   # 작업 스레드별 시간은 합산하지 않음
+        name = pair_map[kid][0]
+        if name not in res:
+            return name, None, None
+        return name, res[name], summarize_store_with_rating({name: res[name]}, **summary_kwargs)[name]
+
+    cached_urls = place_urls_for(list(need_crawl)) if need_crawl else {}
+    t_crawl = time.perf_counter()
+    crawl_ex = ThreadPoolExecutor(max_workers=CRAWL_MAX_WORKERS, thread_name_prefix="crawl")
+    sum_ex = ThreadPoolExecutor(max_workers=summary_workers, thread_name_prefix="summarize")
+    try:
+        crawl_futs = {crawl_ex.submit(crawl_one_store, nkw, srcs, {kid: cached_urls.get(kid, {})}): (kid, srcs)
+                      for (kid, nkw, srcs) in to_crawl}
+        # 신선한 매장은 크롤링을 기다리지 않고 바로 요약
+        sum_futs = {sum_ex.submit(_summarize, kid) for kid in top5_ids if kid not in need_crawl}
+        queued = set(top5_ids) - set(need_crawl)
+
+        while crawl_futs or sum_futs:
+            done, _ = wait(set(crawl_futs) | sum_futs, timeout=0.1 if stream_one_liner else None,
+                           return_when=FIRST_COMPLETED)
+            while not partials.empty():
+                store, text = partials.get_nowait()
+                yield "partial", {"store": store, "one_liner": text}
+            for fut in done:
+                if fut in sum_futs:
+                    sum_futs.discard(fut)
+                    try:
+                        name, data, summary = fut.result()
+                    except Exception as e:
+                        print(f"[SUMMARY_ERROR] {e}")
+                        continue
+                    yield "store", {"store": name, "data": data, "summary": summary}
+                    continue
+
+                kid, srcs = crawl_futs.pop(fut)
+                try:
+                    res = fut.result()
+                    got = _attribute_crawl_result(res, kid, pair_map) if isinstance(res, dict) and res else {}
+                    status = "not_found"
+                except Exception as e:
+                    print(f"[CRAWL_ERROR] {pair_map[kid][0]}: {e}")
+                    got, status = {}, "error"
+                if kid not in {str(obj.get("kakao_id") or "") for obj in got.values()}:
+                    got.update(_crawl_placeholder(kid, srcs, status, pair_map))
+                t0 = time.perf_counter()
+                upsert_from_results(got)
+                timings["upsert"] = timings.get("upsert", 0.0) + time.perf_counter() - t0
+                # 이 크롤링 결과에 다른 top-N 매장이 딸려 왔어도 각 매장은 한 번만 요약
+                pending = {k for k, _srcs in crawl_futs.values()}
+                for other in {str(obj.get("kakao_id") or "") for obj in got.values()} | {kid}:
+                    if other in pair_map and other not in queued and other not in pending:
+                        queued.add(other)
+                        sum_futs.add(sum_ex.submit(_summarize, other))
+                if not crawl_futs:
+                    timings["crawl"] = time.perf_counter() - t_crawl
+    finally:
+        # 소비자가 중간에 멈추면(검색 취소) 남은 작업을 기다리지 않고 정리
+        crawl_ex.shutdown(wait=False, cancel_futures=True)
+        sum_ex.shutdown(wait=False, cancel_futures=True)
+    if need_crawl:
+        checkpoint(db_path=DB_PATH)
+    timings["total"] = time.perf_counter() - t_start
+    _print_flow_stats(timings, len(need_crawl), len(top5_ids))
+
 def _safe_parse_json(raw: str) -> Dict[str, Any]:
     try:
         return json.loads(raw)
@@ -438,30 +1275,228 @@ def _sanitize_payload(parsed: Dict[str, Any], raw_text: str) -> Dict[str, Any]:
         "raw_text_len": len(raw_text),
     }
 
-def _interleave_and_dedupe(buckets: List[List[str]], limit: int) -> List[str]:
+# 요약 입력 패킹: 리뷰 개수가 아니라 추정 토큰 수로 자른다
+HANGUL_RE = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]")
+EMOJI_RE = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]+")
+REPEAT_RE = re.compile(r"([^\w\s]|[ㄱ-ㅎㅏ-ㅣ])\1{2,}")     # ㅋㅋㅋㅋ / !!!! → 2글자로 (숫자/글자는 그대로: 15000원)
+# 네이버 리뷰 끝에 붙는 방문 정보/키워드 태그 꼬리(#태그, +3, 방문 목적 등). 끝까지 태그만 이어질 때만 떼어낸다
+NAVER_TAG_TAIL_RE = re.compile(
+    r"(?:\s*#\S+|\s*\+\d+|\s+(?:일상|연인|배우자|아이|가족|친구|혼밥|회식|모임|더보기|펼쳐보기))+\s*$")
+
+def _estimate_tokens(text: str) -> int:
+    """한글은 글자당 KO_TOKENS_PER_CHAR, 그 밖의 글자는 ~3자당 1토큰, 줄바꿈 1토큰으로 추정"""
+    ko = len(HANGUL_RE.findall(text))
+    rest = len(re.sub(r"\s", "", text)) - ko
+    return math.ceil(ko * KO_TOKENS_PER_CHAR + rest / 3) + text.count("\n") + 1
+
+def _clean_review(rv: str) -> str:
+    rv = EMOJI_RE.sub(" ", rv or "")
+    rv = REPEAT_RE.sub(r"\1\1", rv)
+    return re.sub(r"\s+", " ", rv).strip()
+
+def _truncate_tokens(rv: str, max_tokens: int) -> str:
+    t = _estimate_tokens(rv)
+    if t <= max_tokens:
+        return rv
+    return rv[:max(1, len(rv) * max_tokens // t - 1)].rstrip() + "…"
+
+def _is_near_dup(rv: str, kept: List[str]) -> bool:
+    for k in kept:
+        if abs(len(k) - len(rv)) > max(len(k), len(rv)) * (1 - SUMMARY_NEAR_DUP):
+            continue
+        sm = difflib.SequenceMatcher(None, k, rv)
+        if sm.quick_ratio() >= SUMMARY_NEAR_DUP and sm.ratio() >= SUMMARY_NEAR_DUP:
+            return True
+    return False
+
+def _pack_reviews(buckets: List[List[str]], limit: int, token_budget: int) -> Tuple[List[str], int]:
+    """
+    소스별 버킷을 번갈아(각 버킷은 최신순) 꺼내 정리/중복 제거 후 토큰 예산이 찰 때까지 담는다.
+    예산을 넘는 리뷰는 건너뛰고 더 짧은 다음 리뷰로 빈자리를 채운다. (리뷰 목록, 추정 토큰 수)
+    """
     idx = [0] * len(buckets)
-    out, seen = [], set()
-    while len(out) < limit and any(i < len(b) for i, b in zip(idx, buckets)):
+    out, seen, used = [], set(), 0
+    while len(out) < limit and token_budget - used > 0 and any(i < len(b) for i, b in zip(idx, buckets)):
         for k, b in enumerate(buckets):
             i = idx[k]
-            if i < len(b):
-                rv = (b[i] or "").strip()
-                idx[k] += 1
-                if not rv or rv in seen:
-                    continue
-                seen.add(rv)
-                out.append(rv)
-                if len(out) >= limit:
-                    break
-    return out
-
-def _gather_reviews_per_store(data: Dict[str, Any], limit: int) -> List[str]:
+            if i >= len(b):
+                continue
+            idx[k] += 1
+            rv = _truncate_tokens(_clean_review(b[i]), SUMMARY_REVIEW_MAX_TOKENS)
+            key = rv.replace(" ", "")
+            if len(key) < 2 or key in seen:
+                continue
+            seen.add(key)
+            t = _estimate_tokens(rv)
+            if used + t > token_budget or _is_near_dup(rv, out):
+                continue
+            out.append(rv)
+            used += t
+            if len(out) >= limit:
+                break
+    return out, used
+
+def _gather_reviews_per_store(data: Dict[str, Any], limit: int,
+                              token_budget: int = SUMMARY_TOKEN_BUDGET) -> Tuple[List[str], int]:
     kakao  = list((((data.get("kakao")  or {}).get("reviews")) or []))
     google = list((((data.get("google") or {}).get("reviews")) or []))
-    naver  = list((((data.get("naver")  or {}).get("reviews")) or []))
+    naver  = [NAVER_TAG_TAIL_RE.sub("", str(rv)) for rv in (((data.get("naver") or {}).get("reviews")) or [])]
     top    = list(((data.get("reviews")) or []))
     buckets = [kakao, google, naver, top] if top else [kakao, google, naver]
-    return _interleave_and_dedupe(buckets, limit)
+    return _pack_reviews(buckets, limit, token_budget)
+
+# -------------------- 요약 캐시 --------------------
+UPSERT_SUMMARY_SQL = """
+INSERT INTO summaries (input_hash, store_id, model, temperature, prompt_version,
+                       one_liner, rating, complain, raw_text_len)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(input_hash) DO UPDATE SET
+  store_id   = COALESCE(excluded.store_id, summaries.store_id),
+  created_at = datetime('now');
+"""
+
+def _summary_key(store: str, text: str, model_name: str, temperature: float) -> str:
+    payload = json.dumps([PROMPT_VERSION, model_name, round(float(temperature), 3), store, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _load_summaries(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not keys:
+        return {}
+    con = read_connection()
+    q = f"""
+    SELECT input_hash, model, one_liner, rating, complain, raw_text_len
+    FROM summaries WHERE input_hash IN ({",".join("?" * len(keys))})
+    """
+    return {r["input_hash"]: {"one_liner": r["one_liner"] or "", "rating": r["rating"],
+                              "complain": json.loads(r["complain"] or "[]"), "raw_text_len": r["raw_text_len"],
+                              "model": r["model"]}
+            for r in con.execute(q, keys)}
+
+def _save_summaries(rows: List[Tuple]):
+    if not rows:
+        return
+    con = _connect()
+    with con:
+        con.executemany(UPSERT_SUMMARY_SQL, rows)
+
+# -------------------- 증분 요약 상태 --------------------
+UPSERT_SUMMARY_STATE_SQL = """
+INSERT INTO summary_state (store_ref, model, prompt_version, one_liner, rating, complain, digest, seen,
+                           updates_since_full, full_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+ON CONFLICT(store_ref) DO UPDATE SET
+  model              = excluded.model,
+  prompt_version     = excluded.prompt_version,
+  one_liner          = excluded.one_liner,
+  rating             = excluded.rating,
+  complain           = excluded.complain,
+  digest             = excluded.digest,
+  seen               = excluded.seen,
+  updates_since_full = excluded.updates_since_full,
+  full_at            = COALESCE(excluded.full_at, summary_state.full_at),
+  updated_at         = excluded.updated_at;
+"""
+
+def _review_digest_hash(review: str) -> str:
+    return hashlib.sha1(re.sub(r"\s+", "", review).encode("utf-8")).hexdigest()[:16]
+
+def _store_ref(store: str, data: Dict[str, Any]) -> str:
+    kid = (data or {}).get("kakao_id")
+    return str(kid) if kid else f"name:{store}"
+
+def _load_summary_states(refs: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not refs:
+        return {}
+    con = read_connection()
+    q = f"""
+    SELECT store_ref, model, prompt_version, one_liner, rating, complain, digest, seen, updates_since_full,
+           julianday('now') - julianday(full_at) AS full_age_days
+    FROM summary_state WHERE store_ref IN ({",".join("?" * len(refs))})
+    """
+    out = {}
+    for r in con.execute(q, refs):
+        d = dict(r)
+        d["complain"] = json.loads(d["complain"] or "[]")
+        d["seen"] = json.loads(d["seen"] or "[]")
+        out[r["store_ref"]] = d
+    return out
+
+def _plan_summary(state: Optional[Dict[str, Any]], reviews: List[str], model_name: str):
+    """('full', None) / ('update', 새 리뷰) / ('reuse', None)"""
+    if not state or state["model"] != model_name or state["prompt_version"] != PROMPT_VERSION:
+        return "full", None
+    seen = set(state["seen"])
+    new = [rv for rv in reviews if _review_digest_hash(rv) not in seen]
+    if not new:
+        return "reuse", None
+    if (state["updates_since_full"] or 0) >= FULL_RESUMMARY_EVERY \
+            or (state["full_age_days"] or 0) >= FULL_RESUMMARY_DAYS \
+            or len(new) > len(reviews) * INCREMENTAL_MAX_NEW_RATIO:
+        return "full", None
+    return "update", new
+
+def _clean_digest(parsed: Dict[str, Any]) -> str:
+    d = parsed.get("digest") if isinstance(parsed, dict) else None
+    return d.strip()[:400] if isinstance(d, str) else ""
+
+def _previous_text(state: Dict[str, Any]) -> str:
+    return json.dumps({"one_liner": state["one_liner"], "rating": state["rating"], "complain": state["complain"]},
+                      ensure_ascii=False)
+
+# -------------------- 모델 라우팅 --------------------
+POSITIVE_RE = re.compile(r"맛있|맛집|친절|깔끔|추천|최고|좋아|좋았|훌륭|재방문|만족|존맛")
+NEGATIVE_RE = re.compile(r"별로|불친절|비싸|비쌈|짜요|짜다|싱겁|느끼|실망|최악|아쉬|더럽|비추|불만|늦게|오래 걸")
+
+def _is_contentious(reviews: List[str]) -> bool:
+    """긍정/부정 리뷰가 둘 다 ROUTE_CONTENTIOUS_RATIO 이상이면 평이 갈린 매장"""
+    if not reviews:
+        return False
+    pos = sum(1 for rv in reviews if POSITIVE_RE.search(rv))
+    neg = sum(1 for rv in reviews if NEGATIVE_RE.search(rv))
+    return min(pos, neg) / len(reviews) >= ROUTE_CONTENTIOUS_RATIO
+
+def route_summary_model(reviews: List[str], tokens: int, model_name: str) -> Tuple[str, str]:
+    """(모델, 경로). 리뷰 수/토큰이 작고 평이 갈리지 않으면 (SUMMARY_SMALL_MODEL, "small"), 아니면 (model_name, "large")"""
+    if not SUMMARY_SMALL_MODEL or SUMMARY_SMALL_MODEL == model_name:
+        return model_name, "large"
+    if len(reviews) > ROUTE_SMALL_MAX_REVIEWS or tokens > ROUTE_SMALL_MAX_TOKENS or _is_contentious(reviews):
+        return model_name, "large"
+    return SUMMARY_SMALL_MODEL, "small"
+
+# 요약 생성 지표(LLM 호출 단위, 재시도 포함): 파싱 실패와 그로 버려진 토큰(추정, 프롬프트+출력),
+# empty 는 전송 실패로 출력이 아예 없던 호출(파싱 실패로 세지 않고 재시도도 안 함)
+SUMMARY_METRICS = {"calls": 0, "parse_failures": 0, "empty": 0, "retried": 0, "recovered": 0, "wasted_tokens": 0}
+_summary_metrics_lock = threading.Lock()
+
+def _bump_summary_metric(key: str, n: int = 1):
+    with _summary_metrics_lock:
+        SUMMARY_METRICS[key] += n
+
+def summary_metrics() -> Dict[str, int]:
+    with _summary_metrics_lock:
+        return dict(SUMMARY_METRICS)
+
+def _valid_summary(parsed: Any) -> Dict[str, Any]:
+    """스키마 최소 조건(one_liner 문자열, rating 숫자)을 만족하면 그대로, 아니면 {}"""
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("one_liner"), str) or not parsed["one_liner"].strip():
+        return {}
+    try:
+        float(parsed.get("rating"))
+    except (TypeError, ValueError):
+        return {}
+    return parsed
+
+ONE_LINER_PARTIAL_RE = re.compile(r'"one_liner"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+def _partial_one_liner(buf: str) -> str:
+    """스트리밍 중인 JSON 에서 지금까지 나온 one_liner 값"""
+    m = ONE_LINER_PARTIAL_RE.search(buf)
+    if not m:
+        return ""
+    try:
+        return json.loads('"' + m.group(1).rstrip("\\") + '"')
+    except Exception:
+        return m.group(1)
 
 # -------------------- 메인 함수 --------------------
 def summarize_store_with_rating(
@@ -470,40 +1505,238 @@ def summarize_store_with_rating(
     max_reviews_per_store: int = 60,
     max_workers: int = 6,
     temperature: float = 0.0,
-    base_url: Optional[str] = None
+    base_url: Optional[str] = None,
+    incremental: bool = SUMMARY_INCREMENTAL,
+    token_budget: int = SUMMARY_TOKEN_BUDGET,
+    on_partial: Optional[Callable[[str, str], None]] = None,
+    route: bool = SUMMARY_MODEL_ROUTING
 ) -> Dict[str, Any]:
-
-    llm = OllamaLLM(
-        model=model_name,
-        temperature=temperature,
-        base_url=base_url
-    )
-    prompt = PromptTemplate.from_template(PROMPT)
-    chain = prompt | llm | StrOutputParser()
+    """
+    매장별 요약. 입력(선택된 리뷰 텍스트 + 모델 + temperature + PROMPT_VERSION)이 같으면 summaries 캐시를 쓰고,
+    바뀐 매장만 LLM 에 보낸다. 리뷰는 매장당 token_budget(추정 토큰) 안으로 패킹한다.
+    incremental 이면 이전 요약/메모에 새 리뷰만 접어 넣는 짧은 프롬프트를 쓰고,
+    주기(FULL_RESUMMARY_*)나 드리프트(SUMMARY_DRIFT_RATING) 때만 전체 재요약한다.
+    base_url: 엔드포인트 목록("url|N,url") — 없으면 ollama_pool.OLLAMA_ENDPOINTS.
+    on_partial(store, one_liner): 전체 요약을 토큰 스트리밍으로 받으며 한 줄 평이 자랄 때마다 호출.
+    route 면 매장마다 route_summary_model 로 작은/큰(model_name) 모델을 고르고, 결과의 "model" 에 남긴다.
+    """
+    # LLM 호출은 ollama_pool 이 엔드포인트별 부하/상태를 보고 나눠 보낸다
+    endpoints = ollama_pool.parse_endpoints(base_url) if base_url else None
+    if route and not ollama_pool.model_available(SUMMARY_SMALL_MODEL, endpoints):
+        print(f"[SUMMARY] 작은 모델 {SUMMARY_SMALL_MODEL} 을 가진 엔드포인트 없음 → 라우팅 끔")
+        route = False
 
     # 입력 준비
-    inputs, order = [], []
+    out: Dict[str, Any] = {}
+    order, tokens = [], {}
     for store, data in results.items():
-        reviews = _gather_reviews_per_store(data, max_reviews_per_store)
+        reviews, tokens[store] = _gather_reviews_per_store(data, max_reviews_per_store, token_budget)
         text = "\n".join(reviews)
-        inputs.append({"store": store, "reviews": text})
-        order.append((store, text))
-
-    if not inputs:
-        return {}
-
-    raw_outputs = chain.batch(inputs, config={"max_concurrency": max_workers})
-    out: Dict[str, Any] = {}
-    for (store, text), raw in zip(order, raw_outputs):
-        parsed = _safe_parse_json(raw)
         if not text.strip():
             out[store] = {"one_liner": "", "rating": 3.0, "complain": [], "raw_text_len": 0}
             continue
-        if not parsed or not isinstance(parsed, dict):
-            parsed = {"one_liner": "", "rating": 3.0, "complain": [], "raw_text_len": 0}
-        out[store] = _sanitize_payload(parsed, text)
-
-    return out
+        model, path = route_summary_model(reviews, tokens[store], model_name) if route else (model_name, "large")
+        order.append({"store": store, "reviews": reviews, "text": text, "ref": _store_ref(store, data),
+                      "model": model, "route": path,
+                      "key": _summary_key(store, text, model, temperature), "kid": (data or {}).get("kakao_id")})
+
+    print("[SUMMARY] tokens " + ", ".join(f"{k} {v}" for k, v in tokens.items())
+          + f" (sum {sum(tokens.values())}, budget {token_budget}/store)")
+    if route and order:
+        print("[SUMMARY] route " + ", ".join(f"{o['store']} {o['route']}({o['model']})" for o in order))
+    if not order:
+        return out
+
+    cached = _load_summaries([o["key"] for o in order])
+    misses = [o for o in order if o["key"] not in cached]
+    for o in order:
+        if o["key"] in cached:
+            out[o["store"]] = cached[o["key"]]
+
+    # 캐시 미스: 증분(update) / 전체(full) / 상태 재사용(reuse) 분류
+    states = _load_summary_states([o["ref"] for o in misses]) if incremental else {}
+    full_jobs, update_jobs, reused = [], [], []
+    for o in misses:
+        plan, new = _plan_summary(states.get(o["ref"]), o["reviews"], o["model"]) if incremental else ("full", None)
+        o["state"] = states.get(o["ref"])
+        if plan == "update":
+            o["new"] = new
+            update_jobs.append(o)
+        elif plan == "reuse":
+            reused.append(o)
+        else:
+            full_jobs.append(o)
+
+    llm_kwargs = {"format": SUMMARY_SCHEMA, "num_predict": SUMMARY_NUM_PREDICT}
+
+    def _stream_one(store, text, model):
+        buf, shown = "", ""
+        try:
+            for chunk in ollama_pool.stream(text, model, temperature, endpoints, **llm_kwargs):
+                buf += chunk
+                partial = _partial_one_liner(buf)
+                if partial and partial != shown:
+                    shown = partial
+                    on_partial(store, partial)
+        except Exception as e:
+            print(f"[SUMMARY] 스트리밍 실패 {store}: {e}")
+            return ""
+        return buf
+
+    def _call(texts, models):
+        """모델별로 묶어 ollama_pool.batch (모델 묶음끼리는 동시에). 입력 순서대로 원문 출력"""
+        raws = [""] * len(texts)
+        groups: Dict[str, List[int]] = {}
+        for i, m in enumerate(models):
+            groups.setdefault(m, []).append(i)
+
+        def _group(m, idx):
+            for i, raw in zip(idx, ollama_pool.batch([texts[i] for i in idx], m, temperature, endpoints, max_workers,
+                                                     **llm_kwargs)):
+                raws[i] = raw
+
+        with ThreadPoolExecutor(max_workers=max(1, len(groups))) as ex:
+            list(ex.map(_group, groups.keys(), groups.values()))
+        return raws
+
+    def _generate(texts, models, stores=None):
+        """
+        프롬프트들 → 파싱된 dict 목록(끝내 실패하면 {}). 출력은 왔는데 파싱이 안 된 것만 직전 출력을 붙여
+        SUMMARY_PARSE_RETRIES 번 재시도 (빈 출력 = 엔드포인트 실패는 재시도해도 같은 형식 교정이 아니므로 제외)
+        """
+        if stores is not None and on_partial is not None:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(texts)))) as ex:
+                raws = list(ex.map(_stream_one, stores, texts, models))
+        else:
+            raws = _call(texts, models)
+        parsed = [_valid_summary(_safe_parse_json(r)) for r in raws]
+        _bump_summary_metric("calls", len(texts))
+        called = range(len(texts))      # 이번 시도에서 LLM 을 부른 항목
+        for attempt in range(SUMMARY_PARSE_RETRIES + 1):
+            failed = [i for i in called if not parsed[i]]
+            bad = [i for i in failed if (raws[i] or "").strip()]
+            _bump_summary_metric("empty", len(failed) - len(bad))
+            _bump_summary_metric("parse_failures", len(bad))
+            _bump_summary_metric("wasted_tokens", sum(_estimate_tokens(texts[i]) + _estimate_tokens(raws[i])
+                                                      for i in bad))
+            if not bad or attempt == SUMMARY_PARSE_RETRIES:
+                break
+            retry_texts = [texts[i] + RETRY_SUFFIX.format(bad=raws[i][:300]) for i in bad]
+            _bump_summary_metric("calls", len(bad))
+            _bump_summary_metric("retried", len(bad))
+            called = bad
+            for i, raw in zip(bad, _call(retry_texts, [models[i] for i in bad])):
+                raws[i], parsed[i] = raw, _valid_summary(_safe_parse_json(raw))
+                if parsed[i]:
+                    _bump_summary_metric("recovered")
+        return parsed
+
+    def _run_full(jobs):
+        prompt = PromptTemplate.from_template(PROMPT)
+        return _generate([prompt.format(store=o["store"], reviews=o["text"]) for o in jobs], [o["model"] for o in jobs],
+                         [o["store"] for o in jobs])
+
+    def _run_update(jobs):
+        prompt = PromptTemplate.from_template(UPDATE_PROMPT)
+        return _generate([prompt.format(store=o["store"], previous=_previous_text(o["state"]),
+                                        digest=o["state"]["digest"] or "", reviews="\n".join(o["new"]))
+                          for o in jobs], [o["model"] for o in jobs])
+
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_full = ex.submit(_run_full, full_jobs) if full_jobs else None
+        f_upd = ex.submit(_run_update, update_jobs) if update_jobs else None
+        full_parsed = f_full.result() if f_full else []
+        upd_parsed = f_upd.result() if f_upd else []
+
+    # 증분 결과 별점이 크게 움직이면 드리프트 → 전체 재요약
+    done = []   # (job, parsed, mode)
+    drifted = []
+    for o, parsed in zip(update_jobs, upd_parsed):
+        if not parsed:
+            drifted.append(o)
+            continue
+        new_rating = _sanitize_payload(parsed, o["text"])["rating"]
+        if abs(new_rating - float(o["state"]["rating"] or 3.0)) >= SUMMARY_DRIFT_RATING:
+            drifted.append(o)
+        else:
+            done.append((o, parsed, "update"))
+    if drifted:
+        done.extend((o, parsed, "full") for o, parsed in zip(drifted, _run_full(drifted)))
+    done.extend((o, parsed, "full") for o, parsed in zip(full_jobs, full_parsed))
+
+    sids = _lookup_store_ids(read_connection(), [str(o["kid"]) for o in misses if o["kid"]])
+    rows, state_rows = [], []
+    for o in reused:
+        st = o["state"]
+        out[o["store"]] = {**_sanitize_payload({"one_liner": st["one_liner"], "rating": st["rating"],
+                                                "complain": st["complain"]}, o["text"]), "model": o["model"]}
+    for o, parsed, mode in done:
+        if not parsed:
+            # 재시도까지 파싱 실패면 캐시하지 않음(다음 요청에서 다시 시도)
+            out[o["store"]] = {**_sanitize_payload({"one_liner": "", "rating": 3.0, "complain": []}, o["text"]),
+                               "model": o["model"]}
+            continue
+        s = out[o["store"]] = {**_sanitize_payload(parsed, o["text"]), "model": o["model"]}
+        st = o["state"] or {}
+        if mode == "full":
+            seen = [_review_digest_hash(rv) for rv in o["reviews"]]
+            updates, full_at = 0, time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        else:
+            seen = st["seen"] + [_review_digest_hash(rv) for rv in o["new"]]
+            updates = (st["updates_since_full"] or 0) + 1
+            full_at = None
+        state_rows.append((o["ref"], o["model"], PROMPT_VERSION, s["one_liner"], s["rating"],
+                           json.dumps(s["complain"], ensure_ascii=False), _clean_digest(parsed) or st.get("digest") or "",
+                           json.dumps(seen[-SUMMARY_SEEN_MAX:]), updates, full_at))
+    for o in reused + [d[0] for d in done]:
+        s = out[o["store"]]
+        if s.get("one_liner"):
+            rows.append((o["key"], sids.get(str(o["kid"])) if o["kid"] else None, o["model"], float(temperature),
+                         PROMPT_VERSION, s["one_liner"], s["rating"], json.dumps(s["complain"], ensure_ascii=False),
+                         s["raw_text_len"]))
+    _save_summaries(rows)
+    if state_rows:
+        con = _connect()
+        with con:
+            con.executemany(UPSERT_SUMMARY_STATE_SQL, state_rows)   # 증분(full_at None)은 기존 full_at 유지
+
+    n_new = sum(len(o["new"]) for o in update_jobs)
+    print(f"[SUMMARY] cache hit {len(order) - len(misses)}/{len(order)}, full {len(full_jobs) + len(drifted)}"
+          f" (drift {len(drifted)}), update {len(update_jobs) - len(drifted)} (new reviews {n_new}), reuse {len(reused)}")
+    m = summary_metrics()
+    if m["parse_failures"] or m["empty"]:
+        print(f"[SUMMARY] parse failures {m['parse_failures']}/{m['calls']} calls (retried {m['retried']}, "
+              f"recovered {m['recovered']}, wasted ~{m['wasted_tokens']} tok), empty {m['empty']}")
+    return {store: out[store] for store in results if store in out}
+
+def warm_up_summarizer(model_name: str = "llama3.1", base_url: Optional[str] = None, schedule: bool = True):
+    """
+    요약 모델(라우팅 중이면 작은 모델도) 워밍업: 모델 로드 + 공유 지시문(SUMMARY_INSTRUCTIONS)을 서버 프롬프트 캐시에 올려 둔다.
+    schedule 이면 백그라운드에서 바로 한 번 하고 WARMUP_INTERVAL_SEC 마다 반복(앱 시작 시 호출).
+    """
+    endpoints = ollama_pool.parse_endpoints(base_url) if base_url else None
+    prefix = SUMMARY_INSTRUCTIONS.format()
+    models = [model_name] + ([SUMMARY_SMALL_MODEL] if SUMMARY_MODEL_ROUTING and SUMMARY_SMALL_MODEL != model_name
+                             and ollama_pool.model_available(SUMMARY_SMALL_MODEL, endpoints) else [])
+    if schedule:
+        for m in models:
+            ollama_pool.start_warmup(m, prefix, endpoints=endpoints)
+        return None
+    return {m: ollama_pool.warm_up(m, prefix, endpoints) for m in models}
+
+def iter_summaries(results: Dict[str, Any], max_stores: int = SUMMARY_PIPELINE_WORKERS, **summary_kwargs):
+    """summarize_store_with_rating 의 스트리밍 버전: 매장별 요약이 끝나는 대로 (매장명, 요약) 을 내보낸다"""
+    if not results:
+        return
+    with ThreadPoolExecutor(max_workers=max_stores, thread_name_prefix="summarize") as ex:
+        futs = {ex.submit(summarize_store_with_rating, {store: data}, **summary_kwargs): store
+                for store, data in results.items()}
+        for fut in as_completed(futs):
+            store = futs[fut]
+            try:
+                yield store, fut.result()[store]
+            except Exception as e:
+                print(f"[SUMMARY_ERROR] {store}: {e}")
 
 
 if __name__ == "__main__":
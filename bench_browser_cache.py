@@ -0,0 +1,73 @@
+# bench_browser_cache.py
+# 공유 디스크 캐시 벤치마크: 콜드(빈 캐시) vs 웜(같은 캐시 재사용) 첫 리뷰 요소까지 걸린 시간
+# 실행: python bench_browser_cache.py --kakao-url https://place.map.kakao.com/<id> \
+#         --naver-url https://map.naver.com/p/entry/place/<id> --google-url "https://www.google.com/maps/place/..."
+import argparse, statistics, tempfile, shutil, time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+
+import f_multi_driver_tool
+import f_multi_kakao_tool
+import f_multi_naver_tool
+import f_multi_google_tool
+
+TIMEOUT = 20
+
+def first_review_kakao(driver, url):
+    driver.get(url)
+    f_multi_kakao_tool.wwait(driver, TIMEOUT).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, f_multi_kakao_tool.CSS_REVIEW_BLOCKS)))
+
+def first_review_naver(driver, url):
+    driver.get(url)
+    f_multi_naver_tool.click_review_tab(driver, timeout=TIMEOUT)
+    f_multi_naver_tool.wwait(driver, TIMEOUT).until(
+        EC.presence_of_element_located((By.XPATH, "//*[@id='_review_list']/li")))
+
+def first_review_google(driver, url):
+    driver.get(url)
+    f_multi_google_tool.click_reviews(driver, timeout=TIMEOUT)
+    f_multi_google_tool.wwait(driver, TIMEOUT).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-review-id]")))
+
+def measure(fn, url, cache_dir):
+    """(브라우저 기동 s, 첫 리뷰 요소까지 s)"""
+    t0 = time.perf_counter()
+    driver = f_multi_driver_tool.make_driver(headless=True, disk_cache_dir=cache_dir)
+    t1 = time.perf_counter()
+    try:
+        fn(driver, url)
+        return t1 - t0, time.perf_counter() - t1
+    finally:
+        driver.quit()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kakao-url")
+    ap.add_argument("--naver-url")
+    ap.add_argument("--google-url")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    targets = [(n, fn, u) for n, fn, u in (("kakao", first_review_kakao, args.kakao_url),
+                                           ("naver", first_review_naver, args.naver_url),
+                                           ("google", first_review_google, args.google_url)) if u]
+    if not targets:
+        ap.error("--kakao-url / --naver-url / --google-url 중 하나 이상 필요")
+
+    for name, fn, url in targets:
+        cold, warm = [], []
+        for _ in range(args.runs):
+            cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+            try:
+                cold.append(measure(fn, url, cache_dir)[1])   # 빈 캐시
+                warm.append(measure(fn, url, cache_dir)[1])   # 방금 채운 캐시를 새 드라이버가 재사용
+            except Exception as e:
+                print(f"[BENCH][ERR] {name}: {e}")
+            finally:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        if cold and warm:
+            c, w = statistics.median(cold), statistics.median(warm)
+            print(f"[BENCH] {name:<6} 첫 리뷰까지  cold {c:6.2f}s  warm {w:6.2f}s  (x{c / w:.2f}, runs {len(warm)})")
+    print(f"[BENCH] browsers {f_multi_driver_tool.browser_stats()}")
@@ -0,0 +1,64 @@
+# bench_llm_warmup.py
+# 요약 첫 토큰까지 걸린 시간(TTFT): 콜드(모델 내림) vs 웜(모델만 로드) vs 웜+지시문 프롬프트 캐시
+# 실행: python bench_llm_warmup.py --endpoint http://localhost:11434 --model llama3.1 --runs 3
+import argparse, json, random, statistics, time
+
+import requests
+
+import DB_craw
+import ollama_pool
+
+WORDS = "국물 면발 친절 가격 양 주차 웨이팅 분위기 짜다 싱겁다 맛있다 별로 재방문 추천 깔끔 느끼 매콤 고기 반찬 서비스".split()
+
+def make_prompt(store: str, n_reviews: int) -> str:
+    reviews = "\n".join(" ".join(random.choices(WORDS, k=random.randint(5, 25))) for _ in range(n_reviews))
+    return DB_craw.PROMPT.format(store=store, reviews=reviews)
+
+def unload(endpoint: str, model: str, timeout: float = 60):
+    """keep_alive=0 으로 내리고 /api/ps 에서 사라질 때까지 대기"""
+    requests.post(f"{endpoint}/api/generate", json={"model": model, "keep_alive": 0}, timeout=30).raise_for_status()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        loaded = [m.get("name", "") for m in requests.get(f"{endpoint}/api/ps", timeout=5).json().get("models") or []]
+        if not any(n == model or n.startswith(model + ":") for n in loaded):
+            return
+        time.sleep(0.5)
+
+def ttft(endpoint: str, model: str, prompt: str) -> float:
+    """스트리밍으로 첫 응답 토큰까지(s). 프롬프트 처리 시간이 핵심이라 num_predict 는 작게"""
+    t0 = time.perf_counter()
+    with requests.post(f"{endpoint}/api/generate", stream=True, timeout=600,
+                       json={"model": model, "prompt": prompt, "stream": True,
+                             "keep_alive": ollama_pool.OLLAMA_KEEP_ALIVE, "options": {"num_predict": 8}}) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if line and json.loads(line).get("response"):
+                return time.perf_counter() - t0
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--endpoint", default=ollama_pool.OLLAMA_ENDPOINTS[0][0])
+    ap.add_argument("--model", default="llama3.1")
+    ap.add_argument("--reviews", type=int, default=40)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+    endpoint = args.endpoint.rstrip("/")
+    eps = [(endpoint, 1)]
+    prefix = DB_craw.SUMMARY_INSTRUCTIONS.format()
+
+    cold, warm, warm_prefix = [], [], []
+    for i in range(args.runs):
+        unload(endpoint, args.model)
+        cold.append(ttft(endpoint, args.model, make_prompt(f"콜드{i}", args.reviews)))
+
+        unload(endpoint, args.model)
+        ollama_pool.warm_up(args.model, "", eps)         # 모델만 올림
+        warm.append(ttft(endpoint, args.model, make_prompt(f"웜{i}", args.reviews)))
+
+        ollama_pool.warm_up(args.model, prefix, eps)     # 공유 지시문까지 캐시
+        warm_prefix.append(ttft(endpoint, args.model, make_prompt(f"프리픽스{i}", args.reviews)))
+
+    c, w, p = statistics.median(cold), statistics.median(warm), statistics.median(warm_prefix)
+    print(f"[BENCH] {args.model} @ {endpoint}  리뷰 {args.reviews}개, runs {args.runs}")
+    print(f"[BENCH] 첫 토큰까지  cold {c:6.2f}s  warm {w:6.2f}s (x{c / w:.1f})  warm+prefix {p:6.2f}s (x{c / p:.1f})")
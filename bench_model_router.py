@@ -0,0 +1,89 @@
+# bench_model_router.py
+# 모델 라우팅 오프라인 평가: DB 에 쌓인 매장들을 작은/큰 모델로 둘 다 요약해 경로(small/large)별 지연과 품질 차이를 비교
+# 품질은 큰 모델 출력을 기준으로 본 작은 모델의 별점 차이, 한 줄 평 유사도, 불만 겹침, 파싱 실패율
+# 실행(저장소 루트, reviews.db 필요): python bench_model_router.py --stores 30 --large llama3.1 --small llama3.2:3b
+import argparse, difflib, statistics, time
+
+import DB_craw
+import ollama_pool
+
+def sample_stores(n: int):
+    con = DB_craw.read_connection()
+    kids = [r["kakao_id"] for r in con.execute("""
+        SELECT s.kakao_id FROM stores s
+        WHERE s.kakao_id IS NOT NULL AND EXISTS (SELECT 1 FROM reviews r WHERE r.store_id = s.id)
+        ORDER BY RANDOM() LIMIT ?
+    """, (n,))]
+    results = {}
+    for r in DB_craw.fetch_reviews_for_store_list(kids, per_source_limit=None):
+        data = results.setdefault(r["store_name"], {"kakao_id": r["kakao_id"], "kakao": {"reviews": []},
+                                                    "google": {"reviews": []}, "naver": {"reviews": []}})
+        if r["source"] in data:
+            data[r["source"]]["reviews"].append(r["review"])
+    return results
+
+def summarize(prompt: str, model: str):
+    """(파싱된 요약 또는 {}, 걸린 s)"""
+    t0 = time.perf_counter()
+    try:
+        raw = ollama_pool.invoke(prompt, model, 0.0, format=DB_craw.SUMMARY_SCHEMA,
+                                 num_predict=DB_craw.SUMMARY_NUM_PREDICT)
+    except Exception as e:
+        print(f"[EVAL][ERR] {model}: {e}")
+        raw = ""
+    return DB_craw._valid_summary(DB_craw._safe_parse_json(raw)), time.perf_counter() - t0
+
+def complain_overlap(a, b) -> float:
+    """큰 모델 불만 중 작은 모델이 비슷하게(유사도 0.5 이상) 짚은 비율. 둘 다 없으면 1"""
+    a, b = [str(x) for x in a or []], [str(x) for x in b or []]
+    if not a and not b:
+        return 1.0
+    if not b:
+        return 0.0
+    return sum(1 for y in b if any(difflib.SequenceMatcher(None, x, y).ratio() >= 0.5 for x in a)) / len(b)
+
+def mean(xs):
+    return statistics.mean(xs) if xs else float("nan")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stores", type=int, default=30)
+    ap.add_argument("--large", default="llama3.1")
+    ap.add_argument("--small", default=DB_craw.SUMMARY_SMALL_MODEL)
+    args = ap.parse_args()
+
+    results = sample_stores(args.stores)
+    print(f"[EVAL] 매장 {len(results)}개, small={args.small}, large={args.large}")
+    DB_craw.SUMMARY_SMALL_MODEL = args.small
+
+    by_route = {"small": [], "large": []}
+    for store, data in results.items():
+        reviews, tokens = DB_craw._gather_reviews_per_store(data, 60)
+        if not reviews:
+            continue
+        _model, route = DB_craw.route_summary_model(reviews, tokens, args.large)
+        prompt = DB_craw.PROMPT.format(store=store, reviews="\n".join(reviews))
+        small, t_small = summarize(prompt, args.small)
+        large, t_large = summarize(prompt, args.large)
+        row = {"store": store, "reviews": len(reviews), "tokens": tokens, "t_small": t_small, "t_large": t_large,
+               "small_ok": bool(small), "large_ok": bool(large)}
+        if small and large:
+            row["d_rating"] = abs(float(small["rating"]) - float(large["rating"]))
+            row["one_liner_sim"] = difflib.SequenceMatcher(None, small["one_liner"], large["one_liner"]).ratio()
+            row["complain_hit"] = complain_overlap(small.get("complain"), large.get("complain"))
+        by_route[route].append(row)
+        print(f"[EVAL] {route:<5} {store[:16]:<16} 리뷰 {len(reviews):>2} ~{tokens:>4} tok  "
+              f"small {t_small:5.2f}s  large {t_large:5.2f}s  Δ별점 {row.get('d_rating', float('nan')):.1f}")
+
+    print("[EVAL] 경로     매장  small s  large s  속도비  Δ별점  한줄평유사  불만적중  파싱실패(s/l)")
+    for route, rows in by_route.items():
+        if not rows:
+            continue
+        ts, tl = mean([r["t_small"] for r in rows]), mean([r["t_large"] for r in rows])
+        scored = [r for r in rows if "d_rating" in r]
+        print(f"[EVAL] {route:<7} {len(rows):>4}  {ts:7.2f}  {tl:7.2f}  x{tl / ts:4.1f}  "
+              f"{mean([r['d_rating'] for r in scored]):5.2f}  {mean([r['one_liner_sim'] for r in scored]):9.2f}  "
+              f"{mean([r['complain_hit'] for r in scored]):7.2f}  "
+              f"{sum(not r['small_ok'] for r in rows)}/{sum(not r['large_ok'] for r in rows)}")
+    print(f"[EVAL] 임계값: 리뷰 ≤ {DB_craw.ROUTE_SMALL_MAX_REVIEWS}, 토큰 ≤ {DB_craw.ROUTE_SMALL_MAX_TOKENS}, "
+          f"논쟁 비율 < {DB_craw.ROUTE_CONTENTIOUS_RATIO} 이면 small")
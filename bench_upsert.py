@@ -0,0 +1,96 @@
+# bench_upsert.py
+# 리뷰 적재 벤치마크: 기존(리뷰 1건당 UPSERT + 매장 SELECT) vs 배치(RETURNING + executemany)
+# 실행: python bench_upsert.py --reviews 1000000
+import argparse, os, random, sqlite3, tempfile, time
+
+import DB_craw
+import review_filter
+
+SOURCES = ("kakao", "google", "naver")
+WORDS = ["맛있어요", "친절해요", "양이 많아요", "웨이팅이 길어요", "가성비 좋아요", "고기가 부드러워요",
+         "주차가 불편해요", "재방문 의사 있어요", "국물이 진해요", "조금 짜요", "분위기 좋아요", "청결해요"]
+
+def make_batches(n_reviews: int, reviews_per_store: int, stores_per_batch: int, seed: int = 7):
+    """크롤링 결과와 같은 모양의 합성 배치를 만든다: [{store: {address, store_image, kakao/google/naver}}]"""
+    rnd = random.Random(seed)
+    batches, batch, made, sid = [], {}, 0, 0
+    while made < n_reviews:
+        sid += 1
+        name = f"합성매장{sid}"
+        obj = {
+            "address": (f"성남시 분당구 정자동 {sid}", (37.36 + rnd.random() * 0.02, 127.10 + rnd.random() * 0.02)),
+            "store_image": [f"https://img.example/{sid}/{i}.jpg" for i in range(3)],
+            "kakao": {"reviews": []}, "google": {"reviews": []}, "naver": {"reviews": []},
+        }
+        for i in range(min(reviews_per_store, n_reviews - made)):
+            txt = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 6))) + f" #{sid}-{i}"
+            obj[SOURCES[i % 3]]["reviews"].append(txt)
+            made += 1
+        batch[name] = obj
+        if len(batch) >= stores_per_batch:
+            batches.append(batch)
+            batch = {}
+    if batch:
+        batches.append(batch)
+    return batches
+
+LEGACY_UPSERT_STORE_SQL = """
+INSERT INTO stores (store_name, address, lat, lng, img1, img2, img3, store_key)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(store_key) DO UPDATE SET
+  store_name  = excluded.store_name,
+  address     = excluded.address,
+  lat         = COALESCE(excluded.lat, stores.lat),
+  lng         = COALESCE(excluded.lng, stores.lng),
+  img1        = COALESCE(excluded.img1, stores.img1),
+  img2        = COALESCE(excluded.img2, stores.img2),
+  img3        = COALESCE(excluded.img3, stores.img3),
+  updated_at  = datetime('now');
+"""
+
+def legacy_upsert_from_results(results: dict, db_path: str):
+    """변경 전 경로 재현: 호출마다 새 연결, 매장 UPSERT 후 SELECT id, 리뷰 1건씩 execute"""
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute("PRAGMA synchronous=NORMAL;")
+    with con:
+        for name, obj in results.items():
+            address, lat, lng = DB_craw._normalize_result_store(obj)
+            imgs = (obj.get("store_image") or []) + [None, None, None]
+            key = DB_craw._make_store_key(name, address)
+            con.execute(LEGACY_UPSERT_STORE_SQL, (name, address, lat, lng, imgs[0], imgs[1], imgs[2], key))
+            sid = con.execute("SELECT id FROM stores WHERE store_key=?", (key,)).fetchone()[0]
+            for src in SOURCES:
+                for rv in obj[src]["reviews"]:
+                    txt = str(rv or "").strip()
+                    con.execute(DB_craw.UPSERT_REVIEW_SQL, (sid, src, txt, DB_craw._make_review_hash(sid, src, txt),
+                                                            review_filter.norm_hash(txt)))
+    con.close()
+
+def run(label, fn, batches, db_path, n_reviews):
+    t0 = time.perf_counter()
+    for b in batches:
+        fn(b, db_path)
+    dt = time.perf_counter() - t0
+    print(f"[BENCH] {label:<8} {n_reviews:,} rows  {dt:7.2f}s  {n_reviews / dt:,.0f} rows/s")
+    return dt
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reviews", type=int, default=1_000_000)
+    ap.add_argument("--reviews-per-store", type=int, default=30)
+    ap.add_argument("--stores-per-batch", type=int, default=5, help="run_keyword_flow 한 번의 크롤링 배치 크기")
+    args = ap.parse_args()
+
+    batches = make_batches(args.reviews, args.reviews_per_store, args.stores_per_batch)
+    n = sum(len(o[s]["reviews"]) for b in batches for o in b.values() for s in SOURCES)
+    print(f"[BENCH] 합성 코퍼스: 리뷰 {n:,}개 / 배치 {len(batches):,}개")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before_db, after_db = os.path.join(tmp, "before.db"), os.path.join(tmp, "after.db")
+        DB_craw._init_db(before_db)
+        DB_craw._init_db(after_db)
+        t_before = run("before", legacy_upsert_from_results, batches, before_db, n)
+        t_after = run("after", lambda b, p: DB_craw.upsert_from_results(b, db_path=p), batches, after_db, n)
+        DB_craw.close_connections()
+    print(f"[BENCH] speedup x{t_before / t_after:.2f}")
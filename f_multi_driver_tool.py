@@ -0,0 +1,491 @@
+# f_multi_driver_tool.py
+# 카카오/구글/네이버 크롤러 공용 크롬 드라이버 + (옵션) XHR 응답 캡처 + 좀비 브라우저 정리
+import os, re, json, base64, threading, time, glob, shutil, signal, tempfile, fcntl
+from collections import defaultdict
+from contextlib import contextmanager
+import requests
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+
+# 1 이면 performance 로그를 켜고 리뷰 XHR(JSON) 응답에서 바로 리뷰를 읽는다 (없으면 DOM 파싱)
+CAPTURE_XHR = os.getenv("CRAWL_CAPTURE_XHR", "0") == "1"
+DRIVER_LEASE_SEC = int(os.getenv("DRIVER_LEASE_SEC", "300"))   # 이보다 오래 살아 있는 브라우저는 누수로 보고 정리
+REAPER_INTERVAL_SEC = 30
+DRIVER_START_RETRIES = 1                                         # 크롬 기동 실패(크래시) 시 재시도 횟수
+PROFILE_PREFIX = "crawl-chrome-"                                 # 임시 user-data-dir 접두어 (+ 소유 프로세스 pid)
+# 공유 디스크 캐시(JS/CSS 번들 재사용). 쿠키/사용자 데이터는 드라이버별 임시 프로필에 그대로 격리.
+# 크롬 한 프로세스만 캐시 디렉터리를 쓰도록 슬롯(slot0..N-1)을 flock 으로 빌려 쓰고, 빈 슬롯이 없으면 캐시 없이 띄운다.
+CHROME_DISK_CACHE_DIR = os.getenv("CHROME_DISK_CACHE_DIR", "")          # 비우면 사용 안 함
+CHROME_DISK_CACHE_MB = int(os.getenv("CHROME_DISK_CACHE_MB", "256"))     # 슬롯당 상한
+CHROME_DISK_CACHE_SLOTS = int(os.getenv("CHROME_DISK_CACHE_SLOTS", "8"))
+# 드라이버 백엔드: local(컨테이너 내 chromium) / remote(Selenium Grid 호환 노드들 중 가장 한가한 곳)
+CRAWL_DRIVER_BACKEND = os.getenv("CRAWL_DRIVER_BACKEND", "local")
+REMOTE_WEBDRIVER_URLS = [u.strip().rstrip("/") for u in os.getenv("REMOTE_WEBDRIVER_URLS", "").split(",") if u.strip()]
+REMOTE_NODE_SLOTS = int(os.getenv("REMOTE_NODE_SLOTS", "4"))   # 슬롯 정보를 안 주는 노드(chromedriver)의 동시 세션 상한
+REMOTE_STATUS_TTL_SEC = 5        # /status 조회 캐시
+REMOTE_DOWN_SEC = 30             # 세션 생성/상태 조회 실패 노드를 건너뛰는 시간
+REMOTE_FALLBACK_LOCAL = True     # 쓸 수 있는 노드가 없으면 로컬 chromium 으로
+
+class DriverLease:
+    """
+    한 수집 시도가 만든 드라이버 묶음. 다른 스레드에서 cancel() 하면 드라이버를 quit 해서
+    진행 중인 시도를 끝낸다(스레드는 강제로 멈출 수 없으므로).
+    """
+    def __init__(self):
+        self.drivers = []
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def attach(self, driver):
+        with self._lock:
+            if not self.cancelled:
+                self.drivers.append(driver)
+                return
+        driver.quit()
+        raise RuntimeError("취소된 lease 에서 드라이버 생성")
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            drivers, self.drivers = self.drivers, []
+        for d in drivers:
+            try:
+                d.quit()
+            except Exception:
+                pass
+
+_tls = threading.local()
+
+@contextmanager
+def driver_lease(lease=None):
+    """이 블록 안에서 make_driver 로 만든 드라이버는 lease 에 묶인다."""
+    prev = getattr(_tls, "lease", None)
+    _tls.lease = lease or DriverLease()
+    try:
+        yield _tls.lease
+    finally:
+        _tls.lease = prev
+
+# -------------------------
+# 브라우저 프로세스 추적/정리 (/proc 기반, 리눅스 컨테이너 전용)
+# -------------------------
+_drivers = {}          # id(driver) → {"pid": chromedriver pid, "profile": user-data-dir, "node": 원격 노드, "started": ts}
+_reg_lock = threading.Lock()
+_node_inflight = defaultdict(int)                        # 이 프로세스가 노드별로 연 세션 수
+_node_status = {}                                        # url → {"ready", "busy", "slots", "checked"}
+_reaper = None
+BROWSER_STATS = {"started": 0, "quit": 0, "leaked": 0, "crashed": 0, "reaped": 0, "start_failures": 0}
+
+def _bump_stat(key: str, n: int = 1):
+    with _reg_lock:
+        BROWSER_STATS[key] += n
+
+def _pid_alive(pid) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return False
+
+def _proc_table():
+    """[(pid, ppid, cmdline)]"""
+    rows = []
+    for d in glob.glob("/proc/[0-9]*"):
+        try:
+            with open(f"{d}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"{d}/cmdline", "rb") as f:
+                cmd = f.read().replace(b"\0", b" ").decode("utf-8", "ignore")
+            rows.append((int(d.rsplit("/", 1)[1]), ppid, cmd))
+        except (OSError, ValueError, IndexError):
+            continue
+    return rows
+
+def _tree_pids(root_pid=None, profile=None):
+    """root_pid 의 자손 + cmdline 에 profile 이 들어간 프로세스(부모가 죽어 init 으로 넘어간 chromium 포함)"""
+    table = _proc_table()
+    children = {}
+    for pid, ppid, _cmd in table:
+        children.setdefault(ppid, []).append(pid)
+    pids = set()
+    if root_pid and _pid_alive(root_pid):
+        stack = [root_pid]
+        while stack:
+            p = stack.pop()
+            if p not in pids:
+                pids.add(p)
+                stack.extend(children.get(p, []))
+    if profile:
+        pids.update(pid for pid, _ppid, cmd in table if profile in cmd)
+    pids.discard(os.getpid())
+    return pids
+
+def _kill_pids(pids) -> int:
+    killed = 0
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            continue
+        try:
+            os.waitpid(pid, os.WNOHANG)  # 우리 자식(chromedriver)이면 좀비로 남지 않게 회수
+        except ChildProcessError:
+            pass
+    return killed
+
+def _acquire_cache_slot():
+    """빈 캐시 슬롯을 잠그고 (경로, 잠금 파일)을 돌려준다. 다른 프로세스가 쓰는 슬롯도 flock 으로 피한다."""
+    if not CHROME_DISK_CACHE_DIR:
+        return None, None
+    for i in range(CHROME_DISK_CACHE_SLOTS):
+        slot = os.path.join(CHROME_DISK_CACHE_DIR, f"slot{i}")
+        try:
+            os.makedirs(slot, exist_ok=True)
+            f = open(os.path.join(slot, ".lock"), "w")
+        except OSError:
+            continue
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return slot, f
+        except OSError:
+            f.close()
+    return None, None
+
+def _release_cache_slot(lock_file):
+    if lock_file is not None:
+        try:
+            lock_file.close()  # close 하면 flock 도 풀린다
+        except OSError:
+            pass
+
+def _release(key, reason=None):
+    """
+    드라이버 등록 해제: 남은 프로세스 트리를 죽이고 임시 프로필을 지운다. reason: leaked / crashed
+    원격 드라이버는 프로세스가 없으므로 lease 초과 시 세션을 끝내고 노드 부하만 돌려놓는다.
+    """
+    with _reg_lock:
+        entry = _drivers.pop(key, None)
+        if entry is not None and entry["node"]:
+            _node_inflight[entry["node"]] -= 1
+    if entry is None:
+        return
+    _bump_stat(reason or "quit")
+    if entry["node"]:
+        if reason == "leaked":
+            try:
+                entry["quit"]()
+            except Exception:
+                pass
+        return
+    killed = _kill_pids(_tree_pids(entry["pid"], entry["profile"]))
+    if killed:
+        _bump_stat("reaped", killed)
+    shutil.rmtree(entry["profile"], ignore_errors=True)
+    _release_cache_slot(entry["cache_lock"])
+
+def _track(driver, profile_dir=None, cache_lock=None, node=None):
+    try:
+        pid = driver.service.process.pid
+    except Exception:
+        pid = None
+    key = id(driver)
+    orig_quit = driver.quit
+    with _reg_lock:
+        _drivers[key] = {"pid": pid, "profile": profile_dir, "cache_lock": cache_lock, "node": node,
+                         "quit": orig_quit, "started": time.time()}
+        BROWSER_STATS["started"] += 1
+        if node:
+            _node_inflight[node] += 1
+
+    def quit():
+        try:
+            orig_quit()
+        finally:
+            _release(key)
+    driver.quit = quit
+    _ensure_reaper()
+
+def reap_once(now=None):
+    """lease 초과/크래시 드라이버와, 등록되지 않은(이전 프로세스가 남긴) 프로필·chromium 을 정리"""
+    now = now or time.time()
+    with _reg_lock:
+        items = list(_drivers.items())
+    for key, e in items:
+        if e["pid"] and not _pid_alive(e["pid"]):
+            _release(key, "crashed")
+        elif now - e["started"] > DRIVER_LEASE_SEC:
+            where = e["node"] or f"chromedriver pid {e['pid']}"
+            print(f"[REAPER] lease 초과 브라우저 정리 ({where}, {now - e['started']:.0f}s)")
+            _release(key, "leaked")
+
+    with _reg_lock:
+        live_profiles = {e["profile"] for e in _drivers.values()}
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), PROFILE_PREFIX + "*")):
+        owner = os.path.basename(path)[len(PROFILE_PREFIX):].split("-", 1)[0]
+        if owner.isdigit() and int(owner) != os.getpid() and _pid_alive(int(owner)):
+            continue  # 같은 호스트의 다른 살아 있는 프로세스 소유
+        try:
+            if path in live_profiles or now - os.path.getmtime(path) < DRIVER_LEASE_SEC:
+                continue  # 사용 중이거나 막 만들어져 아직 등록 전인 프로필
+        except OSError:
+            continue
+        killed = _kill_pids(_tree_pids(profile=path))
+        if killed:
+            _bump_stat("leaked")
+            _bump_stat("reaped", killed)
+        shutil.rmtree(path, ignore_errors=True)
+
+def _reaper_loop():
+    while True:
+        time.sleep(REAPER_INTERVAL_SEC)
+        try:
+            reap_once()
+        except Exception as e:
+            print(f"[REAPER][ERR] {e}")
+
+def _ensure_reaper():
+    global _reaper
+    with _reg_lock:
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reaper_loop, name="chrome-reaper", daemon=True)
+            _reaper.start()
+
+def browser_stats():
+    with _reg_lock:
+        return {**BROWSER_STATS, "live": len(_drivers)}
+
+# -------------------------
+# 원격 WebDriver (Selenium Grid / chromedriver 원격 모드)
+# -------------------------
+def _probe_node(url: str) -> dict:
+    """
+    /status 를 읽어 준비 여부와 사용 중 슬롯 수를 얻는다 (REMOTE_STATUS_TTL_SEC 캐시).
+    Grid 4 는 value.nodes[].slots[].session 으로, 단독 chromedriver 는 value.ready 만 준다.
+    """
+    now = time.time()
+    with _reg_lock:
+        st = _node_status.get(url)
+    if st and now - st["checked"] < (REMOTE_DOWN_SEC if not st["ready"] else REMOTE_STATUS_TTL_SEC):
+        return st
+    st = {"ready": False, "busy": 0, "slots": None, "checked": now}
+    try:
+        r = requests.get(f"{url}/status", timeout=2)
+        r.raise_for_status()
+        value = r.json().get("value") or {}
+        st["ready"] = bool(value.get("ready"))
+        slots = [s for n in value.get("nodes") or [] if n.get("availability", "UP") == "UP" for s in n.get("slots") or []]
+        if slots:
+            st["slots"] = len(slots)
+            st["busy"] = sum(1 for s in slots if s.get("session"))
+    except Exception as e:
+        print(f"[DRIVER] 원격 노드 상태 조회 실패 {url}: {e}")
+    with _reg_lock:
+        _node_status[url] = st
+    return st
+
+def _mark_node_down(url: str):
+    with _reg_lock:
+        _node_status[url] = {"ready": False, "busy": 0, "slots": None, "checked": time.time()}
+
+def _nodes_by_load():
+    """준비된 노드를 부하(사용 중 슬롯 비율) 낮은 순으로. 꽉 찬 노드는 제외"""
+    ranked = []
+    for url in REMOTE_WEBDRIVER_URLS:
+        st = _probe_node(url)
+        if not st["ready"]:
+            continue
+        with _reg_lock:
+            mine = _node_inflight[url]
+        busy = max(mine, st["busy"])  # Grid 의 busy 에는 우리 세션도 포함됨(조회 시점 차이는 큰 쪽으로)
+        slots = st["slots"] or REMOTE_NODE_SLOTS
+        if busy >= slots:
+            continue
+        ranked.append((busy / slots, busy, url))
+    return [url for _load, _busy, url in sorted(ranked)]
+
+def _start_remote(opts):
+    """가장 한가한 노드부터 세션 생성을 시도. 모두 실패하면 None"""
+    for url in _nodes_by_load():
+        try:
+            driver = webdriver.Remote(command_executor=url, options=opts)
+        except Exception as e:
+            print(f"[DRIVER] 원격 세션 생성 실패 {url}: {e}")
+            _mark_node_down(url)
+            continue
+        _track(driver, node=url)
+        return driver
+    return None
+
+def node_stats():
+    with _reg_lock:
+        return {u: {"inflight": _node_inflight[u], **{k: v for k, v in (_node_status.get(u) or {}).items() if k != "checked"}}
+                for u in REMOTE_WEBDRIVER_URLS}
+
+def _start_chrome(driver_path, opts):
+    """크롬 기동. 실패하면 남은 chromedriver 를 죽이고 DRIVER_START_RETRIES 번까지 다시 시도"""
+    last_err = None
+    for attempt in range(DRIVER_START_RETRIES + 1):
+        service = Service(executable_path=driver_path)
+        try:
+            return webdriver.Chrome(service=service, options=opts)
+        except WebDriverException as e:
+            last_err = e
+            _bump_stat("start_failures")
+            proc = getattr(service, "process", None)
+            _kill_pids(_tree_pids(getattr(proc, "pid", None)))
+            time.sleep(0.5 * (attempt + 1))
+    raise last_err
+
+def make_driver(headless=True, width=1300, height=950, implicit_wait=0, capture_network=False,
+                disk_cache_dir=None):
+    """disk_cache_dir: 캐시 디렉터리를 직접 지정(벤치마크용). 없으면 CHROME_DISK_CACHE_DIR 슬롯을 빌린다."""
+    opts = webdriver.ChromeOptions()
+
+    if headless:
+        opts.add_argument("--headless=new")
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument(f"--window-size={width},{height}")
+    opts.add_argument("--disable-blink-features=AutomationControlled")
+    opts.add_argument("--disable-infobars")
+    opts.add_experimental_option("excludeSwitches", ["enable-automation"])
+    opts.add_experimental_option("useAutomationExtension", False)
+    if capture_network:
+        opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    # 원격 노드는 자기 chromium/프로필/캐시를 쓰므로 로컬 경로 옵션을 붙이지 않는다
+    if CRAWL_DRIVER_BACKEND == "remote" and REMOTE_WEBDRIVER_URLS:
+        driver = _start_remote(opts)
+        if driver is not None:
+            return _finish_driver(driver, implicit_wait)
+        if not REMOTE_FALLBACK_LOCAL:
+            raise WebDriverException("사용 가능한 원격 WebDriver 노드가 없습니다.")
+        print("[DRIVER] 사용 가능한 원격 노드 없음 → 로컬 chromium")
+
+    #도커
+    chrome_bin = os.getenv("CHROME_BIN", "/usr/bin/chromium")
+    driver_path = os.getenv("CHROMEDRIVER", "/usr/bin/chromedriver")
+    opts.binary_location = chrome_bin
+
+    # 드라이버마다 임시 프로필: 정리 대상 프로세스를 cmdline 으로 찾고, 끝나면 지운다
+    profile_dir = tempfile.mkdtemp(prefix=f"{PROFILE_PREFIX}{os.getpid()}-")
+    opts.add_argument(f"--user-data-dir={profile_dir}")
+    cache_lock = None
+    if not disk_cache_dir:
+        disk_cache_dir, cache_lock = _acquire_cache_slot()
+    if disk_cache_dir:
+        opts.add_argument(f"--disk-cache-dir={disk_cache_dir}")
+        opts.add_argument(f"--disk-cache-size={CHROME_DISK_CACHE_MB * 1024 * 1024}")
+    try:
+        driver = _start_chrome(driver_path, opts)
+    except Exception:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        _release_cache_slot(cache_lock)
+        raise
+    _track(driver, profile_dir, cache_lock)
+    return _finish_driver(driver, implicit_wait)
+
+def _finish_driver(driver, implicit_wait):
+    driver.implicitly_wait(implicit_wait)
+    lease = getattr(_tls, "lease", None)
+    if lease is not None:
+        lease.attach(driver)
+    return driver
+
+def captured_json(driver, url_re):
+    """
+    performance 로그에서 url_re 에 맞는 XHR/Fetch 응답을 찾아 본문(JSON)을 모은다.
+    get_log 는 읽은 만큼 비워지므로 같은 응답을 두 번 읽지 않는다.
+    """
+    pattern = re.compile(url_re)
+    payloads = []
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return payloads
+
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except Exception:
+            continue
+        if msg.get("method") != "Network.responseReceived":
+            continue
+        params = msg.get("params") or {}
+        if params.get("type") not in ("XHR", "Fetch"):
+            continue
+        if not pattern.search((params.get("response") or {}).get("url", "")):
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+            text = body.get("body") or ""
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8", "ignore")
+            payloads.append(json.loads(text))
+        except Exception:
+            continue  # 본문이 아직 없거나 JSON 이 아님
+    return payloads
+
+def _walk_texts(obj, keys, skip, out):
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if k in skip:
+                continue
+            if k in keys and isinstance(v, str):
+                out.append(v)
+            else:
+                _walk_texts(v, keys, skip, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _walk_texts(v, keys, skip, out)
+
+def _follow_path(obj, path, out):
+    if isinstance(obj, list):
+        for v in obj:
+            _follow_path(v, path, out)
+    elif not path:
+        if isinstance(obj, str):
+            out.append(obj)
+    elif isinstance(obj, dict) and path[0] in obj:
+        _follow_path(obj[path[0]], path[1:], out)
+
+def _walk_path(obj, path, out):
+    """path[0] 키는 응답 어디서든 찾고, 그 아래는 path 대로만 따라간다 (리스트는 펼침)"""
+    if isinstance(obj, list):
+        for v in obj:
+            _walk_path(v, path, out)
+    elif isinstance(obj, dict):
+        if path[0] in obj:
+            _follow_path(obj[path[0]], path[1:], out)
+        else:
+            for v in obj.values():
+                _walk_path(v, path, out)
+
+def reviews_from_xhr(driver, url_re, keys, max_reviews=None, skip_keys=()):
+    """
+    캡처한 응답에서 keys 에 해당하는 문자열(리뷰 본문)을 순서대로, 중복 없이 꺼낸다.
+    keys 의 문자열은 어디에 있든 그 키, 튜플은 경로(("visitorReviews", "items", "body") → visitorReviews.items[].body).
+    skip_keys 아래(사장님 답글 등)는 보지 않는다 (키 이름으로 찾을 때만).
+    """
+    names = {k for k in keys if isinstance(k, str)}
+    paths = [k for k in keys if isinstance(k, tuple)]
+    texts = []
+    for payload in captured_json(driver, url_re):
+        if names:
+            _walk_texts(payload, names, set(skip_keys), texts)
+        for path in paths:
+            _walk_path(payload, path, texts)
+
+    reviews, seen = [], set()
+    for t in texts:
+        txt = re.sub(r"\s+", " ", t).strip()
+        if not txt or txt in seen:
+            continue
+        seen.add(txt)
+        reviews.append(txt)
+        if max_reviews and len(reviews) >= max_reviews:
+            break
+    return reviews
@@ -1,4 +1,3 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
@@ -6,8 +5,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
     TimeoutException, ElementClickInterceptedException, StaleElementReferenceException
 )
-import re, os
-from selenium.webdriver.chrome.service import Service
+import re
+
+from f_multi_driver_tool import make_driver
 
 XPATH_STORE_NAMES = [
     "//*[@id='QA0Szd']/div/div/div[1]/div[3]/div/div[1]/div/div/div[1]/div/div/div[2]/div/div/span",
@@ -27,30 +27,6 @@ XPATH_FIRST_RESULT_LINK = "//*[@id='QA0Szd']/div/div/div[1]/div[2]/div/div[1]/di
 XPATH_MORE_BUTTONS = "//*[@id='ChdDSUhNMG9nS0VMM3c5cm1CakpfLWtRRRAB']/span[2]/button"
 
 
-def make_driver(headless=True, width=1300, height=950, implicit_wait=0):
-    opts = webdriver.ChromeOptions()
-
-    if headless:
-        opts.add_argument("--headless=new")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    opts.add_argument("--disable-gpu")
-    opts.add_argument(f"--window-size={width},{height}")
-    opts.add_argument("--disable-blink-features=AutomationControlled")
-    opts.add_argument("--disable-infobars")
-    opts.add_experimental_option("excludeSwitches", ["enable-automation"])
-    opts.add_experimental_option("useAutomationExtension", False)
-
-    #도커
-    chrome_bin = os.getenv("CHROME_BIN", "/usr/bin/chromium")
-    driver_path = os.getenv("CHROMEDRIVER", "/usr/bin/chromedriver")
-    opts.binary_location = chrome_bin
-
-    service = Service(executable_path=driver_path)
-    driver = webdriver.Chrome(service=service, options=opts)
-    driver.implicitly_wait(implicit_wait)  # 암시적 대기(권장: 0 or 짧게)
-    return driver
-
 def wwait(driver, timeout=20, poll=0.2):
     return WebDriverWait(driver, timeout, poll_frequency=poll)
 
@@ -67,6 +43,14 @@ def safe_click(driver, locator, timeout=5):
         driver.execute_script("arguments[0].click();", el)
     return True
 
+def current_place_url(driver, timeout=3):
+    """검색 결과에서 매장을 연 뒤 주소창의 /maps/place/ URL (못 얻으면 None)"""
+    try:
+        wwait(driver, timeout).until(lambda d: "/maps/place/" in d.current_url)
+        return driver.current_url
+    except TimeoutException:
+        return None
+
 def click_first_link(driver, timeout=5):
     return safe_click(driver, (By.XPATH, XPATH_FIRST_RESULT_LINK), timeout=timeout)
 
@@ -133,26 +117,42 @@ def parse_reviews(driver, timeout=20, max_reviews=None):
     print(f"[GOOGLE] 리뷰 {len(reviews)}개 추출")
     return reviews
 
-def run(keyword: str, max_reviews=None):
+def run(keyword: str, max_reviews=None, place_url=None):
+    """place_url: 이전에 찾은 매장 상세 URL. 열리면 검색/첫 결과 클릭을 건너뛴다."""
     url = f"https://www.google.co.kr/maps/search/{keyword}"
     driver = make_driver(headless=True)
-    driver.get(url)
 
     try:
+        if place_url:
+            try:
+                driver.get(place_url)
+                click_reviews(driver, timeout=5)
+                click_all_detail_buttons(driver, timeout=5)
+                reviews = parse_reviews(driver, max_reviews=max_reviews)
+                return {"keyword": keyword, "reviews": reviews, "place_url": place_url}
+            except TimeoutException:
+                pass  # 캐시 URL 이 더 이상 안 열림 → 검색 흐름
+
+        driver.get(url)
         click_first_link(driver, timeout=5)
+        resolved = current_place_url(driver)
         click_reviews(driver, timeout=5)
         click_all_detail_buttons(driver, timeout=5)
         reviews = parse_reviews(driver, max_reviews=max_reviews)
-        return {"keyword": keyword, "reviews": reviews}
+        return {"keyword": keyword, "reviews": reviews, "place_url": resolved}
 
     except TimeoutException:
+        # 검색 결과가 하나면 바로 상세 페이지가 열림
+        resolved = current_place_url(driver, timeout=1)
+        if not resolved:
+            return {"keyword": keyword, "reviews": None, "place_url": None}  # 검색 결과에 매장 없음
         try:
             click_reviews(driver, timeout=5)
             click_all_detail_buttons(driver, timeout=5)
             reviews = parse_reviews(driver, max_reviews=max_reviews)
-            return {"keyword": keyword, "reviews": reviews}
+            return {"keyword": keyword, "reviews": reviews, "place_url": resolved}
         except TimeoutException:
-            return {"keyword": keyword, "reviews": None}
+            return {"keyword": keyword, "reviews": [], "place_url": resolved, "timeout": True}
 
     except Exception as e:
         print(f"[ERROR] 알 수 없는 오류: {e}")
@@ -0,0 +1,97 @@
+# f_multi_kakao_http_tool.py
+# 카카오 place id 로 상세/리뷰 JSON 을 직접 받아오는 HTTP 수집기 (브라우저 없이)
+# run_multi 와 같은 {"keyword", "reviews", "store_image"} 형태를 돌려준다. 실패하면 예외 → 호출 측에서 Selenium 으로 대체.
+import os, re, threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# 로컬 픽스처 서버 등으로 바꿔 끼울 수 있게 환경변수로 둔다
+KAKAO_PLACE_API_BASE = os.getenv("KAKAO_PLACE_API_BASE", "https://place.map.kakao.com").rstrip("/")
+PLACE_MAIN_PATH = "/main/v/{place_id}"
+COMMENT_LIST_PATH = "/commentlist/v/{place_id}/{last_id}"
+PLACE_PAGE_URL = "https://place.map.kakao.com/{place_id}#review"
+HTTP_TIMEOUT = 5
+HTTP_POOL_SIZE = 10
+HTTP_MAX_PAGES = 5
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Referer": "https://place.map.kakao.com/",
+    "Accept": "application/json",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session() -> requests.Session:
+    """커넥션 풀을 공유하는 세션 (스레드 간 공유)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update(HEADERS)
+            _session = s
+        return _session
+
+def _get_json(path: str) -> dict:
+    r = _get_session().get(KAKAO_PLACE_API_BASE + path, timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+def _parse_images(data: dict, max_images=3):
+    urls = []
+    main = (data.get("basicInfo") or {}).get("mainphotourl")
+    if main:
+        urls.append(main)
+    for group in (data.get("photo") or {}).get("photoList") or []:
+        for p in group.get("list") or []:
+            u = p.get("orgurl")
+            if u and u not in urls:
+                urls.append(u)
+            if len(urls) >= max_images:
+                return urls
+    return urls[:max_images]
+
+def run(place_id, keyword=None, max_reviews=None):
+    """
+    place_id: 카카오 로컬 API 의 id.
+    응답 형태가 예상과 다르면(basicInfo 없음) ValueError — 엔드포인트가 바뀐 경우 Selenium 으로 넘기기 위함.
+    """
+    data = _get_json(PLACE_MAIN_PATH.format(place_id=place_id))
+    info = data.get("basicInfo")
+    if not isinstance(info, dict):
+        raise ValueError(f"예상과 다른 응답 형태: place {place_id}")
+
+    reviews, seen = [], set()
+    comment = data.get("comment") or {}
+    pages = 0
+    while True:
+        last_id = None
+        for c in comment.get("list") or []:
+            last_id = c.get("commentid") or last_id
+            txt = re.sub(r"\s+", " ", str(c.get("contents") or "")).strip()
+            if not txt or txt in seen:
+                continue
+            seen.add(txt)
+            reviews.append(txt)
+            if max_reviews and len(reviews) >= max_reviews:
+                break
+        pages += 1
+        if (max_reviews and len(reviews) >= max_reviews) or not comment.get("hasNext") \
+                or last_id is None or pages >= HTTP_MAX_PAGES:
+            break
+        comment = _get_json(COMMENT_LIST_PATH.format(place_id=place_id, last_id=last_id)).get("comment") or {}
+
+    print(f"[KAKAO] 리뷰 {len(reviews)}개 추출 (HTTP)")
+    return {
+        "keyword": info.get("placenamefull") or keyword,
+        "reviews": reviews,
+        "store_image": _parse_images(data),
+        "place_url": PLACE_PAGE_URL.format(place_id=place_id),
+    }
+
+if __name__ == "__main__":
+    import sys
+    print(run(sys.argv[1], max_reviews=5))  # python f_multi_kakao_http_tool.py <place id>
@@ -1,11 +1,11 @@
 # f_multi_kakao_tool.py
-import re, time, os
-from selenium import webdriver
+import re, time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.service import Service
+
+from f_multi_driver_tool import make_driver, reviews_from_xhr, CAPTURE_XHR
 
 KAKAO_URL_TEMPLATE = "https://map.kakao.com/?q={}"
 XPATH_STORE_NAME = "//*[@id='mainContent']/div[1]/div[1]/div[1]/h3"
@@ -26,30 +26,10 @@ XPATH_PLACE_REVIEW_BTNS = "//*[@id='info.search.place.list']/li/div[4]/span[1]/a
 CSS_REVIEW_BLOCKS = "ul li div div:nth-child(2) div div:nth-child(1) div:nth-child(2) a p"
 XPATH_REVIEW_LI_ALL = "//*[@id='mainContent']/div[2]/div[2]/div[2]/div[3]/ul/li"
 XPATH_REVIEW_MORE_TPL = "//*[@id='mainContent']/div[2]/div[2]/div[2]/div[3]/ul/li[{num}]/div/div[2]/div/div[1]/div[2]/a/p"
-
-def make_driver(headless=True, width=1300, height=950, implicit_wait=0):
-    opts = webdriver.ChromeOptions()
-
-    if headless:
-        opts.add_argument("--headless=new")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    opts.add_argument("--disable-gpu")
-    opts.add_argument(f"--window-size={width},{height}")
-    opts.add_argument("--disable-blink-features=AutomationControlled")
-    opts.add_argument("--disable-infobars")
-    opts.add_experimental_option("excludeSwitches", ["enable-automation"])
-    opts.add_experimental_option("useAutomationExtension", False)
-
-    #도커
-    chrome_bin = os.getenv("CHROME_BIN", "/usr/bin/chromium")
-    driver_path = os.getenv("CHROMEDRIVER", "/usr/bin/chromedriver")
-    opts.binary_location = chrome_bin
-
-    service = Service(executable_path=driver_path)
-    driver = webdriver.Chrome(service=service, options=opts)
-    driver.implicitly_wait(implicit_wait)
-    return driver
+# 상세 페이지가 리뷰 목록을 받아오는 XHR (캡처 모드)
+XHR_REVIEW_URL_RE = r"place(-api)?\.map\.kakao\.com/.*(commentlist|reviews)"
+XHR_REVIEW_KEYS = ("contents",)
+XHR_SKIP_KEYS = ("owner_reply", "ownerReply")
 
 def wwait(driver, timeout=5, poll=0.2):
     return WebDriverWait(driver, timeout, poll_frequency=poll)
@@ -188,29 +168,44 @@ def parse_reviews(driver, timeout=6, max_reviews=None):
     print(f"[KAKAO] 리뷰 {len(reviews)}개 추출")
     return reviews
 
-def run_multi(keyword: str, max_reviews=None, headless=True):
+def run_multi(keyword: str, max_reviews=None, headless=True, place_url=None, capture_xhr=CAPTURE_XHR):
+    """
+    place_url: 이전에 찾은 리뷰 페이지 URL. 열리면 검색을 건너뛰고, 안 열리면 검색 흐름으로 돌아간다.
+    capture_xhr: 리뷰 XHR 응답에서 전문을 바로 읽음(더보기 클릭 생략). 못 찾으면 DOM 파싱.
+    """
     url = KAKAO_URL_TEMPLATE.format(keyword)
-    driver = make_driver(headless=headless)
-    driver.get(url)
+    driver = make_driver(headless=headless, capture_network=capture_xhr)
 
     try:
-        review_url = get_top_place_review_url(driver, timeout=7)
+        review_url = None
+        if place_url:
+            driver.get(place_url)
+            if parse_store_name(driver, timeout=5):
+                review_url = place_url
+
         if not review_url:
-            return {}
+            driver.get(url)
+            review_url = get_top_place_review_url(driver, timeout=7)
+            if not review_url:
+                return {}
+            driver.get(review_url)
 
-        driver.get(review_url)
         store_image = parse_images(driver, timeout=7)
-        click_expand_all_reviews(driver, timeout=7)
         store_name = parse_store_name(driver) or f"{keyword}"
-        reviews = parse_reviews(driver, max_reviews=max_reviews)
-
-        results = {"keyword": store_name, "reviews" : reviews, "store_image": store_image}
+        reviews = reviews_from_xhr(driver, XHR_REVIEW_URL_RE, XHR_REVIEW_KEYS, max_reviews, XHR_SKIP_KEYS) if capture_xhr else []
+        if reviews:
+            print(f"[KAKAO] 리뷰 {len(reviews)}개 추출 (XHR)")
+        else:
+            click_expand_all_reviews(driver, timeout=7)
+            reviews = parse_reviews(driver, max_reviews=max_reviews)
+
+        results = {"keyword": store_name, "reviews" : reviews, "store_image": store_image, "place_url": review_url}
         time.sleep(0.5)
 
         return results
 
     except TimeoutException:
-        return {}
+        return {"reviews": [], "timeout": True}   # 매장 없음({})과 구분: 재시도 대상
 
     finally:
         driver.quit()
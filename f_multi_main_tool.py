@@ -1,13 +1,31 @@
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os, time, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+import f_multi_driver_tool
 import f_multi_kakao_tool
+import f_multi_kakao_http_tool
 import f_multi_google_tool
 import f_multi_naver_tool
 import kakaoapi
 
 #전역 변수
 MAX_WORKERS = 10
+SOURCES = ("kakao", "google", "naver")
+# http: place id 로 JSON 직접 수집, 실패 시 Selenium / selenium: 항상 브라우저
+KAKAO_FETCH_BACKEND = os.getenv("KAKAO_FETCH_BACKEND", "http")
+
+# 헤지: 시도가 소스별 최근 p90 을 넘기면 같은 작업을 새 브라우저로 한 번 더 띄우고 먼저 끝난 쪽을 쓴다
+HEDGE_SOURCES = ("google",)
+MAX_HEDGES = 2              # collect 호출당 최대 헤지 수
+BROWSER_BUDGET = 16         # 프로세스 전체 동시 수집 시도(≈브라우저) 상한. 헤지는 이 안에서만 띄운다
+HEDGE_MIN_SAMPLES = 5       # p90 을 믿을 최소 표본 수
+LATENCY_WINDOW = 50
+
+_latency = {src: deque(maxlen=LATENCY_WINDOW) for src in SOURCES}
+_hedge_lock = threading.Lock()
+_inflight = 0
+HEDGE_METRICS = {"hedged": 0, "hedge_won": 0, "primary_won": 0, "cancelled": 0, "over_budget": 0}
 
 def _extract_reviews_from_tool_output(obj):
     if obj is None:
@@ -29,38 +47,112 @@ def get_store_list_from_kakao(keyword: str, top_n: int = 5, headless: bool = Tru
         print(f"[SEARCH_STORE][ERR] {e}")
     return []
 
-def fetch_kakao_reviews(store_name: str, max_reviews: int):
+def _crawl_status(out, reviews):
+    """
+    소스별 크롤링 결과 상태: ok / empty(매장은 있으나 리뷰 없음) / not_found(매장 못 찾음) / error
+    도구가 reviews=None 또는 빈 dict 를 주면 매장을 못 찾은 것, message 가 있거나 timeout 이면 오류
+    (시간 초과는 리뷰가 없다는 뜻이 아니므로 empty 로 오래 캐시하지 않고 백오프).
+    """
+    if isinstance(out, dict) and (out.get("message") or out.get("timeout")):
+        return "error"
+    if not out or (isinstance(out, dict) and out.get("reviews") is None):
+        return "not_found"
+    return "ok" if reviews else "empty"
+
+def _fetch_kakao_http(place_id, store_name: str, max_reviews: int):
+    if KAKAO_FETCH_BACKEND != "http" or not place_id:
+        return None
     try:
-        out = f_multi_kakao_tool.run_multi(store_name, max_reviews=max_reviews)
-        if isinstance(out, dict):
+        return f_multi_kakao_http_tool.run(place_id, keyword=store_name, max_reviews=max_reviews)
+    except Exception as e:
+        print(f"[KAKAO][HTTP] {store_name}: {e} → Selenium 으로 대체")
+        return None
+
+def fetch_kakao_reviews(store_name: str, max_reviews: int, place_url=None, place_id=None):
+    try:
+        out = _fetch_kakao_http(place_id, store_name, max_reviews)
+        if not out:
+            out = f_multi_kakao_tool.run_multi(store_name, max_reviews=max_reviews, place_url=place_url)
+        if isinstance(out, dict) and out:
+            reviews = out.get("reviews") or []
             return {
-                "reviews": out.get("reviews", []),
-                "store_image": out.get("store_image")
+                "reviews": reviews,
+                "store_image": out.get("store_image"),
+                "crawled_name": out.get("keyword"),
+                "place_url": out.get("place_url"),
+                "status": _crawl_status(out, reviews)
             }
-        return {"reviews": [], "store_image": None}
+        return {"reviews": [], "store_image": None, "place_url": None, "status": "not_found"}
     except Exception as e:
         print(f"[KAKAO][ERR] {store_name}: {e}")
-        return {"reviews": [], "store_image": None}
+        return {"reviews": [], "store_image": None, "status": "error"}
 
-def fetch_google(store_name: str, max_reviews: int):
+def fetch_google(store_name: str, max_reviews: int, place_url=None):
     try:
-        out = f_multi_google_tool.run(store_name, max_reviews=max_reviews)
-        return _extract_reviews_from_tool_output(out)
+        out = f_multi_google_tool.run(store_name, max_reviews=max_reviews, place_url=place_url)
+        reviews = _extract_reviews_from_tool_output(out)
+        return {"reviews": reviews, "place_url": (out or {}).get("place_url"), "status": _crawl_status(out, reviews)}
     except Exception:
-        return []
+        return {"reviews": [], "status": "error"}
 
-def fetch_naver(store_keyword: str, max_reviews: int):
+def fetch_naver(store_keyword: str, max_reviews: int, place_url=None):
     try:
-        out = f_multi_naver_tool.run(store_keyword, max_reviews=max_reviews)
-        return _extract_reviews_from_tool_output(out)
+        out = f_multi_naver_tool.run(store_keyword, max_reviews=max_reviews, place_url=place_url)
+        reviews = _extract_reviews_from_tool_output(out)
+        return {"reviews": reviews, "place_url": (out or {}).get("place_url"), "status": _crawl_status(out, reviews)}
     except Exception as e:
         print(f"[NAVER][ERR] {store_keyword}: {e}")
-        return []
+        return {"reviews": [], "status": "error"}
+
+# -------------------------
+# 헤지 (tail latency)
+# -------------------------
+def _record_latency(src: str, sec: float):
+    with _hedge_lock:
+        _latency[src].append(sec)
+
+def _p90(src: str):
+    samples = sorted(_latency[src])
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+def hedge_metrics():
+    with _hedge_lock:
+        return {**HEDGE_METRICS, "inflight": _inflight, "p90": {src: _p90(src) for src in SOURCES}}
+
+def _run_attempt(lease, fn, *args):
+    global _inflight
+    with _hedge_lock:
+        _inflight += 1
+    try:
+        with f_multi_driver_tool.driver_lease(lease):
+            return fn(*args)
+    finally:
+        with _hedge_lock:
+            _inflight -= 1
+
+def _bump_hedge(key: str):
+    with _hedge_lock:
+        HEDGE_METRICS[key] += 1
+
+def _store_result(results, src, name, revs):
+    results[name][src] = {"reviews": revs.get("reviews") or [], "status": revs.get("status")}
+    if "place_url" in revs:
+        results[name][src]["place_url"] = revs["place_url"]
+    if src == "kakao":
+        results[name]["store_image"] = revs.get("store_image")  # ✅ 최상위에 저장
+        results[name]["crawled_name"] = revs.get("crawled_name")  # 카카오 상세 페이지에서 읽은 매장명
 
 # -------------------------
 # 메인 파이프라인 (병렬)
 # -------------------------
-def collect_all_reviews_parallel(keyword: str, top_n: int = 5, max_reviews: int = 20, headless: bool = True):
+def collect_all_reviews_parallel(keyword: str, top_n: int = 5, max_reviews: int = 20, headless: bool = True,
+                                 sources=SOURCES, place_urls=None):
+    """
+    sources: 크롤링할 소스만 지정(나머지는 reviews=[] / status 없음으로 둠)
+    place_urls: {카카오 place id: {source: 캐시된 상세 URL}} — 있으면 검색 단계를 건너뛴다.
+    """
 
     print(f"[SEARCH_STORE] 검색: {keyword}")
     store_pairs = get_store_list_from_kakao(keyword, top_n=top_n, headless=headless)
@@ -68,40 +160,107 @@ def collect_all_reviews_parallel(keyword: str, top_n: int = 5, max_reviews: int
         print("[WARN] search_store에서 상위 매장명을 가져오지 못했습니다.")
         return {}
 
+    # kakaoapi 값: (주소, (lat,lng), 카카오 place id)
     results = {
         name: {
-            "address": addr,
+            "address": val[:2] if isinstance(val, tuple) else val,
+            "kakao_id": val[2] if isinstance(val, tuple) and len(val) > 2 else None,
             "store_image": None,
             "kakao": {"reviews": []},
             "google": {"reviews": []},
             "naver": {"reviews": []}
         }
-        for (name, addr) in store_pairs
+        for (name, val) in store_pairs
     }
 
-    futures = {}
+    # (source, 매장명) 별 작업. 시도(attempt)는 원본 1개 + 헤지 최대 1개
+    tasks = {}
+    for store_name, _addr in store_pairs:
+        kid = results[store_name]["kakao_id"]
+        urls = (place_urls or {}).get(kid) or {}
+        if "kakao" in sources:
+            tasks[("kakao", store_name)] = (fetch_kakao_reviews, (store_name, max_reviews, urls.get("kakao"), kid))
+        if "google" in sources:
+            tasks[("google", store_name)] = (fetch_google, (store_name, max_reviews, urls.get("google")))
+        if "naver" in sources:
+            tasks[("naver", store_name)] = (fetch_naver, (store_name.strip(), max_reviews, urls.get("naver")))
+    state = {key: {"attempts": {}, "primary": None, "hedged": False, "done": False} for key in tasks}
+    pending = {}
+
     t0 = time.time()
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-        for store_name, _addr in store_pairs:
-            futures[ex.submit(fetch_kakao_reviews, store_name, max_reviews)] = ("kakao", store_name)
-            futures[ex.submit(fetch_google, store_name, max_reviews)] = ("google", store_name)
-            futures[ex.submit(fetch_naver, store_name.strip(), max_reviews)] = ("naver", store_name)
-
-        for fut in as_completed(futures):
-            src, name = futures[fut]
-            try:
-                revs = fut.result()
-            except Exception as e:
-                print(f"[{src.upper()}][ERR] {name}: {e}")
-                revs = {"reviews": [], "store_image": None} if src == "kakao" else []
-
-            if src == "kakao":
-                results[name]["kakao"]["reviews"] = revs.get("reviews", [])
-                results[name]["store_image"] = revs.get("store_image")  # ✅ 최상위에 저장
-            else:
-                results[name][src]["reviews"] = revs if isinstance(revs, list) else []
-
-    print(f"[INFO] 병렬 수집 완료: {len(store_pairs)}개 매장, 경과 {time.time()-t0:.1f}s")
+    ex = ThreadPoolExecutor(max_workers=MAX_WORKERS + MAX_HEDGES)
+
+    def _submit(key):
+        fn, args = tasks[key]
+        lease = f_multi_driver_tool.DriverLease()
+        fut = ex.submit(_run_attempt, lease, fn, *args)
+        state[key]["attempts"][fut] = (lease, time.time())
+        state[key]["primary"] = state[key]["primary"] or fut
+        pending[fut] = key
+
+    try:
+        for key in tasks:
+            _submit(key)
+
+        hedges = 0
+        while pending:
+            # 헤지 대상의 p90 도달 시각
+            deadlines = []
+            if hedges < MAX_HEDGES:
+                for key, st in state.items():
+                    p90 = _p90(key[0]) if key[0] in HEDGE_SOURCES else None
+                    if p90 is not None and not st["hedged"] and not st["done"]:
+                        deadlines.append((st["attempts"][st["primary"]][1] + p90, key))
+            timeout = max(0.0, min(t for t, _ in deadlines) - time.time()) if deadlines else None
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                key = pending.pop(fut)
+                st = state[key]
+                if st["done"]:
+                    continue
+                src, name = key
+                try:
+                    revs = fut.result()
+                except Exception as e:
+                    print(f"[{src.upper()}][ERR] {name}: {e}")
+                    revs = {"reviews": [], "status": "error"}
+
+                others = [f for f in st["attempts"] if f is not fut and f in pending]
+                if revs.get("status") == "error" and others:
+                    continue  # 다른 시도가 아직 돌고 있으면 그쪽 결과를 기다림
+                st["done"] = True
+                if revs.get("status") != "error":
+                    # 작업 전체 지연(원본 시작부터): 헤지가 이겼을 때 헤지 자신의 짧은 시간을 넣으면 p90 이 계속 내려감
+                    _record_latency(src, time.time() - st["attempts"][st["primary"]][1])
+                if st["hedged"]:
+                    _bump_hedge("primary_won" if fut is st["primary"] else "hedge_won")
+                for f in others:  # 진 쪽은 브라우저를 닫아 끝낸다
+                    st["attempts"][f][0].cancel()
+                    f.cancel()
+                    pending.pop(f, None)
+                    _bump_hedge("cancelled")
+                _store_result(results, src, name, revs)
+
+            now = time.time()
+            for t, key in deadlines:
+                st = state[key]
+                if t > now or st["done"] or st["hedged"] or hedges >= MAX_HEDGES:
+                    continue
+                st["hedged"] = True  # 예산 초과여도 같은 작업을 다시 보지 않음
+                with _hedge_lock:
+                    over = _inflight >= BROWSER_BUDGET
+                if over:
+                    _bump_hedge("over_budget")
+                    continue
+                hedges += 1
+                _bump_hedge("hedged")
+                print(f"[HEDGE] {key[0]} {key[1]}: p90 초과 → 재시도 추가")
+                _submit(key)
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+    print(f"[INFO] 병렬 수집 완료: {len(store_pairs)}개 매장({', '.join(sources)}), 경과 {time.time()-t0:.1f}s")
     return results
 
 if __name__ == "__main__":
@@ -1,13 +1,18 @@
 # naver_tool.py
-import re, os
-from selenium import webdriver
+import re
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.service import Service
+
+from f_multi_driver_tool import make_driver, reviews_from_xhr, CAPTURE_XHR
 
 NAVER_URL_TEMPLATE = "https://map.naver.com/p/search/{}"
+NAVER_PLACE_URL_TEMPLATE = "https://map.naver.com/p/entry/place/{}"
+# entryIframe 이 방문자 리뷰를 받아오는 GraphQL 응답 (캡처 모드): visitorReviews.items[].body 만 읽는다
+# (같은 graphql 엔드포인트로 오는 공지/사장님 답글/다른 쿼리의 body 는 제외)
+XHR_REVIEW_URL_RE = r"pcmap-api\.place\.naver\.com/.*graphql"
+XHR_REVIEW_KEYS = (("visitorReviews", "items", "body"),)
 XPATH_FIRST_PLACE = ["//*[@id='_pcmap_list_scroll_container']/ul/li[1]/div[1]/div[1]/a/span[1]",
                      "//*[@id='_pcmap_list_scroll_container']/ul/li[1]/div[1]/div[1]/a/span[1]"]
 XPATH_REVIEW_TABS = [
@@ -35,30 +40,6 @@ XPATH_REVIEW_BLOCKS = [
     "//*[@id='_review_list']/li[5]/div[5]/a[1]"
 ]
 
-def make_driver(headless=True, width=1300, height=950, implicit_wait=0):
-    opts = webdriver.ChromeOptions()
-
-    if headless:
-        opts.add_argument("--headless=new")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    opts.add_argument("--disable-gpu")
-    opts.add_argument(f"--window-size={width},{height}")
-    opts.add_argument("--disable-blink-features=AutomationControlled")
-    opts.add_argument("--disable-infobars")
-    opts.add_experimental_option("excludeSwitches", ["enable-automation"])
-    opts.add_experimental_option("useAutomationExtension", False)
-
-    #도커
-    chrome_bin = os.getenv("CHROME_BIN", "/usr/bin/chromium")
-    driver_path = os.getenv("CHROMEDRIVER", "/usr/bin/chromedriver")
-    opts.binary_location = chrome_bin
-
-    service = Service(executable_path=driver_path)
-    driver = webdriver.Chrome(service=service, options=opts)
-    driver.implicitly_wait(implicit_wait)
-    return driver
-
 def wwait(drv, timeout=5, poll=0.2):
     return WebDriverWait(drv, timeout, poll_frequency=poll)
 
@@ -85,6 +66,15 @@ def get_first_place(driver, timeout=20):
             last_err = e
             continue
 
+def resolve_place_url(driver, timeout=5):
+    """첫 장소 클릭 후 주소창의 place id 로 상세 진입 URL 을 만든다 (못 얻으면 None)"""
+    driver.switch_to.default_content()
+    try:
+        m = wwait(driver, timeout).until(lambda d: re.search(r"/place/(\d+)", d.current_url))
+    except TimeoutException:
+        return None
+    return NAVER_PLACE_URL_TEMPLATE.format(m.group(1))
+
 def click_review_tab(driver, timeout=20):
     switch_to_iframe(driver, "entryIframe", timeout)
     last_err = None
@@ -153,18 +143,38 @@ def parse_reviews(driver, timeout=5, max_reviews=None):
     print(f"[NAVER] 리뷰 {len(reviews)}개 추출")
     return reviews
 
-def run(keyword: str, max_reviews=None):
+def run(keyword: str, max_reviews=None, place_url=None, capture_xhr=CAPTURE_XHR):
+    """
+    place_url: 이전에 찾은 상세 진입 URL. 열리면 searchIframe 단계를 건너뛴다.
+    capture_xhr: 리뷰 GraphQL 응답에서 본문을 바로 읽음. 못 찾으면 DOM 파싱.
+    """
     url = NAVER_URL_TEMPLATE.format(keyword)
-    driver = make_driver(headless=True)
-    driver.get(url)
+    driver = make_driver(headless=True, capture_network=capture_xhr)
     try:
-        get_first_place(driver, timeout=7)
-        click_review_tab(driver, timeout=7)
+        resolved = None
+        if place_url:
+            driver.get(place_url)
+            try:
+                click_review_tab(driver, timeout=7)
+                resolved = place_url
+            except TimeoutException:
+                pass  # 캐시 URL 이 더 이상 안 열림 → 검색 흐름
+
+        if not resolved:
+            driver.get(url)
+            if not get_first_place(driver, timeout=7):
+                return {"keyword": keyword, "reviews": None, "place_url": None}  # 검색 결과에 매장 없음
+            resolved = resolve_place_url(driver)
+            click_review_tab(driver, timeout=7)
         click_sort_latest(driver, timeout=7)
-        reviews = parse_reviews(driver, max_reviews=max_reviews)
-        return {"keyword": keyword, "reviews": reviews}
+        reviews = reviews_from_xhr(driver, XHR_REVIEW_URL_RE, XHR_REVIEW_KEYS, max_reviews) if capture_xhr else []
+        if reviews:
+            print(f"[NAVER] 리뷰 {len(reviews)}개 추출 (XHR)")
+        else:
+            reviews = parse_reviews(driver, max_reviews=max_reviews)
+        return {"keyword": keyword, "reviews": reviews, "place_url": resolved}
     except TimeoutException:
-        return {"keyword": keyword, "reviews": []}
+        return {"keyword": keyword, "reviews": [], "timeout": True}
     finally:
         driver.quit()
 
@@ -82,7 +82,7 @@ def kakao_keyword_nearby(lat=None, lon=None, query="", TOP_N_STORES=5, radius=50
 
     res, distance = {}, {}
     for r in results[:TOP_N_STORES]:
-        res[r["name"]] = (r["address"], (r["lat"], r['lon']))
+        res[r["name"]] = (r["address"], (r["lat"], r['lon']), r["id"])
         distance[r["name"]] = r.get("distance_m")
     return res, distance
 
@@ -1,4 +1,4 @@
-import os, dotenv, html, folium, sqlite3, ast, re
+import dotenv, html, folium, ast, re
 import pandas as pd
 import streamlit as st
 import streamlit.components.v1 as components
@@ -21,6 +21,8 @@ st.session_state["is_mobile"] = is_mobile
 PRIMARY   = "#FF6B35"
 JEONGJA_LAT, JEONGJA_LON = 37.3670, 127.1080
 map_height = 320 if st.session_state.get("is_mobile") else 600
+HOME_MAP_LIMIT = 300        # 홈 지도 마커 최대 개수
+HOME_MAP_RADIUS_M = 1500    # 뷰포트를 모를 때(첫 진입) 기준 반경
 TAGS = [
     "#삼겹살","#치킨","#족발","#국밥","#파스타","#피자","#햄버거","#초밥",
     "#돈카츠","#라멘","#덮밥","#중식","#마라탕","#쌀국수","#카페","#디저트"
@@ -44,18 +46,87 @@ st.session_state.setdefault("search_token", 0)
 def fetch_results_and_summaries(keyword: str, lat:float, lon:float, query:str):
     if not keyword:
         return {}, {}, {}
-    results, real_distance = DB_craw.run_keyword_flow(keyword, lat, lon, query, stale_days=30, per_source_limit=None)
-    base_url = os.getenv('OLLAMA_REMOTE_HOST', 'http://jappscompany.duckdns.org:11434/')
+    results, real_distance = DB_craw.run_keyword_flow(keyword, lat, lon, query, per_source_limit=None)
+    # Ollama 엔드포인트는 OLLAMA_ENDPOINTS(없으면 OLLAMA_REMOTE_HOST) 에서 ollama_pool 이 읽는다
     summaries = DB_craw.summarize_store_with_rating(
         results=results,
         model_name="llama3.1",
         max_reviews_per_store=60,
         max_workers=6,
-        temperature=0.2,
-        base_url=base_url
+        temperature=0.2
     )
     return results, summaries, real_distance
 
+def _streaming_card_html(name: str, one_liner: str = "", summary=None, no_reviews: bool = False):
+    """요약이 도착하기 전/도착 중인 카드(평점·한 줄 평·아쉬운 점 자리)"""
+    if summary:
+        star_html, rating_str = make_star_html(summary.get("rating"))
+        rating_line = f"AI 추천 평점 {rating_str} <span class='stars'>{star_html}</span>"
+        one_liner = summary.get("one_liner") or "요약이 아직 없어요."
+        complain = summary.get("complain") or []
+        complain_html = ("<ul style='margin:6px 0 0 18px; padding:0;'>"
+                         + "".join(f"<li>{html.escape(str(c))}</li>" for c in complain[:3]) + "</ul>"
+                         if complain else "<div class='meta'>아쉬운 점 없음</div>")
+    elif no_reviews:
+        rating_line, one_liner, complain_html = "평점 정보 없음", "수집된 리뷰가 없어요.", ""
+    else:
+        rating_line = "AI 추천 평점 분석 중…"
+        one_liner = (one_liner + " ▍") if one_liner else "리뷰를 모으고 요약하는 중…"
+        complain_html = "<div class='meta'>분석 중…</div>"
+    return f"""
+    <div class="card"><div class="card-body" style="padding:12px;">
+      <h4>{html.escape(name)}</h4>
+      <div class="rating-info meta" style="margin-bottom:6px;">{rating_line}</div>
+      <div style="font-size:16px; color:#333; background:#f9f9f9; padding:8px; border-radius:6px; margin:6px 0;">
+         “{html.escape(one_liner)}”
+      </div>
+      <div class="meta" style="margin-bottom:4px;">AI 분석 아쉬운 점</div>
+      {complain_html}
+    </div></div>
+    """
+
+def stream_results_and_summaries(keyword: str, lat: float, lon: float, query: str):
+    """
+    top-N 매장 카드 자리를 먼저 그리고, 요약이 끝나는 매장부터(한 줄 평은 생성되는 대로) 채운다.
+    다 받으면 미리보기를 지우고 (results, summaries, real_distance) 반환 → 아래에서 정렬된 최종 카드로 그림.
+    """
+    results, summaries, real_distance = {}, {}, {}
+    if not keyword:
+        return results, summaries, real_distance
+    area = st.empty()
+    slots = {}
+    with area.container():
+        st.markdown('<div class="row-title"><h3>검색 결과</h3></div>', unsafe_allow_html=True)
+        for kind, p in DB_craw.iter_keyword_flow(keyword, lat, lon, query, per_source_limit=None,
+                                                 stream_one_liner=True, model_name="llama3.1",
+                                                 max_reviews_per_store=60, max_workers=6, temperature=0.2):
+            if kind == "top":
+                real_distance = p["distance"]
+                for name in p["stores"]:
+                    slots[name] = st.empty()
+                    slots[name].markdown(_streaming_card_html(name), unsafe_allow_html=True)
+            elif kind == "partial" and p["store"] in slots:
+                slots[p["store"]].markdown(_streaming_card_html(p["store"], one_liner=p["one_liner"]),
+                                           unsafe_allow_html=True)
+            elif kind == "store":
+                name = p["store"]
+                if p["data"] is not None:
+                    results[name], summaries[name] = p["data"], p["summary"]
+                if name in slots:
+                    slots[name].markdown(_streaming_card_html(name, summary=p["summary"], no_reviews=p["data"] is None),
+                                         unsafe_allow_html=True)
+    area.empty()
+    # 결과 순서는 top-N 순서로
+    order = list(slots)
+    results = {k: results[k] for k in sorted(results, key=lambda k: order.index(k) if k in order else len(order))}
+    return results, summaries, real_distance
+
+@st.cache_resource(show_spinner=False)
+def start_llm_warmup():
+    """프로세스당 한 번: 요약 모델 워밍업을 백그라운드로 시작(이후 주기적으로 반복)"""
+    DB_craw.warm_up_summarizer("llama3.1")
+    return True
+
 # 약식카드
 def render_compact_store_card(row: dict):
     name  = str(row.get("name", ""))
@@ -173,6 +244,22 @@ def _center_of_bounds(bounds: dict):
     except Exception:
         return None
 
+# 지도 뷰포트 → (min_lat, min_lng, max_lat, max_lng)
+def _bbox_of_bounds(bounds: dict):
+    try:
+        sw = bounds.get("_southWest") or bounds.get("southWest")
+        ne = bounds.get("_northEast") or bounds.get("northEast")
+        return float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"])
+    except Exception:
+        return None
+
+# 마커용 좌표: 숫자형 변환 + 좌표 없는 행 제거 (lat/lon 컬럼이 없는 빈 프레임도 빈 결과로)
+def _map_points(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for c in ["lat", "lon"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else float("nan")
+    return df.dropna(subset=["lat", "lon"])
+
 # 정확한 위치 설정용 지도
 def render_center_picker_dialog(BASE_LAT: float, BASE_LON: float):
     """모달 안에서만 사용하는 위치 설정 전용 지도(m_loc)"""
@@ -287,19 +374,16 @@ def render_good_shop_carousel(good_shop: list[str]):
     if not good_shop:
         return
 
-    conn = sqlite3.connect("reviews.db")
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    conn = DB_craw.read_connection()
 
     # IN (...) 쿼리로 한 번에 가져오기
     ph = ",".join(["?"] * len(good_shop))
-    cur.execute(f"""
+    cur = conn.execute(f"""
         SELECT store_name, address, lat, lng, img1, img2, img3
         FROM stores
         WHERE store_name IN ({ph})
     """, good_shop)
     rows_info = [dict(r) for r in cur.fetchall()]
-    conn.close()
 
     if not rows_info:
         st.info("선정된 매장을 DB에서 찾지 못했습니다.")
@@ -402,16 +486,14 @@ def _get_row_by_name(name: str, df: pd.DataFrame):
         return df.loc[m].iloc[0].to_dict()
     # DF에 없으면 DB에서 보루 조회
     try:
-        conn = sqlite3.connect("reviews.db"); conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("""
+        cur = DB_craw.read_connection().execute("""
             SELECT store_name AS name, address AS store_address, lat, lng,
                    img1 AS store_image
             FROM stores
             WHERE store_name = ?
             LIMIT 1
         """, (name,))
-        r = cur.fetchone(); conn.close()
+        r = cur.fetchone()
         if r: return dict(r)
     except Exception:
         pass
@@ -895,15 +977,24 @@ st.markdown(f"""
 </style>
 """, unsafe_allow_html=True)
 
+# 첫 검색이 모델 로드를 기다리지 않게 앱 시작 시 워밍업
+start_llm_warmup()
+
 search_kw = st.session_state.get("search_kw", "")
 run_token = st.session_state.get("search_token", 0)
 
 #검색
 if st.session_state.get("do_search") and search_kw:
-    with st.spinner("Searching..."):
-        results, summaries, real_distance = fetch_results_and_summaries(
+    # 같은 검색(토큰)의 재실행(버튼 클릭 등)은 스트리밍 없이 저장해 둔 결과를 쓴다
+    search_key = (run_token, search_kw, BASE_LAT, BASE_LON)
+    cached = st.session_state.get("search_result")
+    if cached and cached[0] == search_key:
+        results, summaries, real_distance = cached[1]
+    else:
+        results, summaries, real_distance = stream_results_and_summaries(
             search_kw, lat=BASE_LAT, lon=BASE_LON, query=search_kw
         )
+        st.session_state["search_result"] = (search_key, (results, summaries, real_distance))
 
     if run_token != st.session_state.get("search_token", 0) or not st.session_state.get("do_search", False):
         results, summaries, real_distance = {}, {}, {}
@@ -937,6 +1028,7 @@ for store_name, info in results.items():
 
     rows.append({
         "name": store_name,
+        "kakao_id": info.get("kakao_id"),
         "lat": lat,
         "lon": lng,
         "store_address": addr,
@@ -950,7 +1042,7 @@ for store_name, info in results.items():
     })
 
 columns = [
-    "name", "lat", "lon", "store_address",
+    "name", "kakao_id", "lat", "lon", "store_address",
     "store_image", "review_count", "oneliner", "rating", "complain", "distance_m", "walk_min"
 ]
 data = pd.DataFrame(rows, columns=columns)
@@ -1097,17 +1189,14 @@ if st.session_state.get("do_search", False):
                 # 리뷰 출력
                 if st.session_state.get(f"show_reviews_{name}", False):
                     st.markdown(f"#### 📝 {name} 리뷰 ({rcnt}개)")
-                    conn = sqlite3.connect("reviews.db")
-                    cur = conn.cursor()
-                    cur.execute("""
+                    cur = DB_craw.read_connection().execute("""
                             SELECT r.review
                             FROM reviews r
                             JOIN stores s ON r.store_id = s.id
-                            WHERE s.store_name = ?
+                            WHERE s.kakao_id = ?
                             ORDER BY r.last_seen DESC
-                        """, (name,))
+                        """, (r.get("kakao_id"),))
                     rows = cur.fetchall()
-                    conn.close()
 
                     if rows:
                         # 1. 각 리뷰를 <li> 태그로 만듭니다.
@@ -1156,19 +1245,13 @@ current_area = search_area or dong
 GOOD_SHOPS = gsdf[gsdf["소재지주소"].str.contains(current_area, na=False)]["업소명"].tolist()
 render_good_shop_carousel(GOOD_SHOPS)
 
-# 홈페이지 지도
+# 홈페이지 지도 (현재 뷰포트 안의 매장만 R*Tree로 조회)
 if not st.session_state.get("do_search", False):
-    m_store = folium.Map(location=[BASE_LAT, BASE_LON], zoom_start=15)
-
-    conn = sqlite3.connect("reviews.db")
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT store_name, address, lat, lng, img1
-        FROM stores
-    """)
-    rows_info = cur.fetchall()
-    conn.close()
+    home_bbox = _bbox_of_bounds(st.session_state.get("home_map_bounds") or {})
+    if home_bbox:
+        rows_info = DB_craw.stores_in_bbox(*home_bbox, limit=HOME_MAP_LIMIT)
+    else:
+        rows_info = DB_craw.stores_within_radius(BASE_LAT, BASE_LON, HOME_MAP_RADIUS_M, limit=HOME_MAP_LIMIT)
 
     marker_info = []
     for row in rows_info:
@@ -1179,12 +1262,9 @@ if not st.session_state.get("do_search", False):
             "lon": row["lng"],
             "store_image": row["img1"]
         })
-    df = pd.DataFrame(marker_info)
-
-    for c in ["lat", "lon"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    pts = df.dropna(subset=["lat", "lon"])
+    # 화면 안에 저장된 매장이 없어도 컬럼은 있어야 아래 dropna/iterrows 가 동작
+    df = pd.DataFrame(marker_info, columns=["name", "store_address", "lat", "lon", "store_image"])
+    pts = _map_points(df)
 
     m_store = folium.Map(location=[BASE_LAT, BASE_LON], zoom_start=15)
 
@@ -1195,10 +1275,7 @@ else:
     df = data if not data.empty else data
 
 # 숫자형 변환 + 좌표 없는 행 제거
-    for c in ["lat", "lon"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    pts = df.dropna(subset=["lat", "lon"])
+    pts = _map_points(df)
 
 
 # 지도 중심 재설정
@@ -1269,7 +1346,28 @@ if st.session_state.get("do_search", False) and not pts.empty:
 map_col, card_col = st.columns([7, 5], gap="large")
 
 with map_col:
-    map_state = st_folium(m_store, key="map_store_view", height=map_height, use_container_width=True)
+    if st.session_state.get("do_search", False):
+        map_state = st_folium(m_store, key="map_store_view", height=map_height, use_container_width=True)
+    else:
+        # 뷰포트 유지: 이전 중심/줌을 넘겨 마커만 갱신
+        map_state = st_folium(
+            m_store, key="map_store_view", height=map_height, use_container_width=True,
+            center=st.session_state.get("home_map_center"), zoom=st.session_state.get("home_map_zoom"),
+        )
+
+# === 홈 지도 이동 → 새 뷰포트로 마커 다시 조회 ===
+if not st.session_state.get("do_search", False) and isinstance(map_state, dict):
+    new_bbox = _bbox_of_bounds(map_state.get("bounds") or {})
+    if new_bbox:
+        c = map_state.get("center")
+        if isinstance(c, dict) and "lat" in c and "lng" in c:
+            st.session_state["home_map_center"] = (float(c["lat"]), float(c["lng"]))
+        if map_state.get("zoom"):
+            st.session_state["home_map_zoom"] = map_state["zoom"]
+        old_bbox = home_bbox
+        st.session_state["home_map_bounds"] = map_state["bounds"]
+        if old_bbox is None or any(abs(a - b) > 1e-5 for a, b in zip(old_bbox, new_bbox)):
+            st.rerun()
 
 # === 마커 클릭 → 매장명 추출 ===
 clicked_name = None
@@ -0,0 +1,297 @@
+# ollama_pool.py
+# 여러 Ollama 엔드포인트에 요약 요청을 나눠 보내는 클라이언트
+# 상태 확인(/api/tags) → 처리 중 요청이 가장 적은(엔드포인트별 max_concurrency 대비) 곳으로 보내고, 실패하면 다른 곳에서 재시도
+# 설정: OLLAMA_ENDPOINTS="http://a:11434|4,http://b:11434|2"  (|N 은 동시 요청 상한, 생략 시 OLLAMA_MAX_CONCURRENCY)
+# 요청은 /api/generate 로 직접 보낸다: format 에 JSON 스키마(dict)를 그대로 넘길 수 있어야 해서
+# (langchain-ollama 버전에 따라 format 이 "" / "json" 만 허용됨)
+import os, json, time, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_OLLAMA_HOST = "http://jappscompany.duckdns.org:11434/"
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+HEALTH_TTL_SEC = 10         # /api/tags 조회 캐시
+DOWN_SEC = 30               # 상태 조회/요청 실패 엔드포인트를 건너뛰는 시간
+OLLAMA_RETRIES = 2          # 실패 시 다른 엔드포인트로 재시도 횟수
+QUEUE_TIMEOUT_SEC = 120     # 모든 엔드포인트가 꽉 찼을 때 빈자리를 기다리는 최대 시간
+# 모델을 메모리에 붙잡아 두는 시간(서버 기본 5분). 예약 워밍업은 이보다 짧은 주기로
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+WARMUP_INTERVAL_SEC = int(os.getenv("OLLAMA_WARMUP_INTERVAL_SEC", "1200"))
+WARMUP_TIMEOUT_SEC = 300    # 콜드 로드는 오래 걸릴 수 있음
+CONNECT_TIMEOUT_SEC = 5
+GENERATE_TIMEOUT_SEC = int(os.getenv("OLLAMA_GENERATE_TIMEOUT_SEC", "300"))   # 응답(스트리밍은 청크 사이) 대기
+
+def parse_endpoints(spec: str) -> List[Tuple[str, int]]:
+    """"url|N,url" → [(url, N), (url, OLLAMA_MAX_CONCURRENCY)]"""
+    out = []
+    for part in (spec or "").split(","):
+        url, _, n = part.strip().partition("|")
+        if url:
+            out.append((url.strip().rstrip("/"), int(n) if n.strip() else OLLAMA_MAX_CONCURRENCY))
+    return out
+
+OLLAMA_ENDPOINTS = parse_endpoints(os.getenv("OLLAMA_ENDPOINTS") or os.getenv("OLLAMA_REMOTE_HOST") or DEFAULT_OLLAMA_HOST)
+
+_cond = threading.Condition()
+_inflight: Dict[str, int] = {}
+_status: Dict[str, dict] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+_session = None
+_warmup_threads: Dict[str, threading.Thread] = {}
+
+def _probe(url: str) -> dict:
+    """/api/tags 로 살아 있는지와 올라와 있는 모델 목록을 얻는다 (HEALTH_TTL_SEC 캐시)"""
+    now = time.time()
+    with _cond:
+        st = _status.get(url)
+    if st and now - st["checked"] < (DOWN_SEC if not st["ready"] else HEALTH_TTL_SEC):
+        return st
+    st = {"ready": False, "models": set(), "checked": now}
+    try:
+        r = requests.get(f"{url}/api/tags", timeout=2)
+        r.raise_for_status()
+        st["ready"] = True
+        st["models"] = {m.get("name") for m in r.json().get("models") or []}
+    except Exception as e:
+        print(f"[OLLAMA] 상태 조회 실패 {url}: {e}")
+    with _cond:
+        _status[url] = st
+    return st
+
+def _is_node_failure(e: Exception) -> bool:
+    """엔드포인트 자체 문제(연결 실패/타임아웃/5xx)인지. 4xx(없는 모델, 잘못된 옵션)는 어디로 보내도 같으므로 False"""
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    if isinstance(status, int) and status > 0:
+        return status >= 500
+    return isinstance(e, (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout))
+
+def _mark_down(url: str):
+    with _cond:
+        _status[url] = {"ready": False, "models": set(), "checked": time.time()}
+
+def _has_model(models: set, model: str) -> bool:
+    return model in models or (":" not in model and f"{model}:latest" in models)
+
+def model_available(model: str, endpoints: Optional[List[Tuple[str, int]]] = None) -> bool:
+    """살아 있는 엔드포인트 중 model 을 올려 둔(pull 된) 곳이 있는지"""
+    if not model:
+        return False
+    for url, _cap in endpoints or OLLAMA_ENDPOINTS:
+        st = _probe(url)
+        if st["ready"] and _has_model(st["models"], model):
+            return True
+    return False
+
+def _acquire(endpoints: List[Tuple[str, int]], model: str, exclude=()) -> str:
+    """
+    살아 있는 엔드포인트 중 (처리 중 / 상한) 비율이 가장 낮은 곳의 자리를 잡는다.
+    모델을 가진 엔드포인트가 있으면 그쪽만 쓴다. 모두 꽉 찼으면 자리가 날 때까지 기다림.
+    """
+    deadline = time.time() + QUEUE_TIMEOUT_SEC
+    while True:
+        ready = [(url, cap, _probe(url)) for url, cap in endpoints if url not in exclude]
+        ready = [(url, cap, st) for url, cap, st in ready if st["ready"]]
+        if not ready:
+            raise RuntimeError("사용 가능한 Ollama 엔드포인트 없음")
+        with_model = [(url, cap) for url, cap, st in ready if _has_model(st["models"], model)]
+        candidates = with_model or [(url, cap) for url, cap, _st in ready]
+        with _cond:
+            free = [(_inflight.get(url, 0) / cap, _inflight.get(url, 0), url)
+                    for url, cap in candidates if _inflight.get(url, 0) < cap]
+            if free:
+                url = min(free)[2]
+                _inflight[url] = _inflight.get(url, 0) + 1
+                return url
+            left = deadline - time.time()
+            if left <= 0:
+                raise TimeoutError("Ollama 엔드포인트 대기 시간 초과")
+            _cond.wait(min(left, HEALTH_TTL_SEC))
+
+def _release(url: str, ok: bool):
+    with _cond:
+        _inflight[url] -= 1
+        st = _stats.setdefault(url, {"ok": 0, "failed": 0})
+        st["ok" if ok else "failed"] += 1
+        _cond.notify_all()
+
+def _get_session() -> requests.Session:
+    """엔드포인트들과의 커넥션 풀을 공유하는 세션"""
+    global _session
+    with _cond:
+        if _session is None:
+            s = requests.Session()
+            n = max(10, sum(cap for _url, cap in OLLAMA_ENDPOINTS))
+            s.mount("http://", HTTPAdapter(pool_connections=n, pool_maxsize=n))
+            s.mount("https://", HTTPAdapter(pool_connections=n, pool_maxsize=n))
+            _session = s
+        return _session
+
+def _payload(model: str, prompt: str, temperature: float, stream: bool, llm_kwargs: dict) -> dict:
+    """/api/generate 본문. format(문자열 "json" 또는 JSON 스키마)/keep_alive 외 키는 options 로"""
+    kw = dict(llm_kwargs)
+    body = {"model": model, "prompt": prompt, "stream": stream, "keep_alive": kw.pop("keep_alive", OLLAMA_KEEP_ALIVE)}
+    fmt = kw.pop("format", None)
+    if fmt:
+        body["format"] = fmt
+    body["options"] = {"temperature": temperature, **kw}
+    return body
+
+def _post_generate(url: str, body: dict) -> requests.Response:
+    r = _get_session().post(f"{url}/api/generate", json=body, stream=body["stream"],
+                            timeout=(CONNECT_TIMEOUT_SEC, GENERATE_TIMEOUT_SEC))
+    r.raise_for_status()
+    return r
+
+def _chunks(r: requests.Response):
+    """
+    스트리밍 응답(NDJSON)의 response 조각. 서버가 중간에 error 를 보내면 RuntimeError,
+    done 없이 연결이 끝나면 ConnectionError(엔드포인트 문제로 본다).
+    """
+    with r:
+        for line in r.iter_lines():
+            if not line:
+                continue
+            d = json.loads(line)
+            if d.get("error"):
+                raise RuntimeError(f"Ollama 오류: {d['error']}")
+            if d.get("response"):
+                yield d["response"]
+            if d.get("done"):
+                return
+    raise ConnectionError("스트리밍 응답이 done 없이 끊김")
+
+def invoke(prompt: str, model: str, temperature: float = 0.0,
+           endpoints: Optional[List[Tuple[str, int]]] = None, **llm_kwargs) -> str:
+    """
+    프롬프트 하나를 가장 한가한 엔드포인트로. 연결 실패/타임아웃/5xx 면 그 엔드포인트를 잠시 빼고 다른 곳에서 재시도,
+    4xx 등 요청 자체 오류는 엔드포인트를 건드리지 않고 그대로 예외.
+    """
+    endpoints = endpoints or OLLAMA_ENDPOINTS
+    tried, last_err = [], None
+    for _ in range(OLLAMA_RETRIES + 1):
+        try:
+            url = _acquire(endpoints, model, exclude=tried)
+        except RuntimeError as e:
+            last_err = last_err or e
+            break
+        ok = False
+        try:
+            out = _post_generate(url, _payload(model, prompt, temperature, False, llm_kwargs)).json().get("response", "")
+            ok = True
+            return out
+        except Exception as e:
+            print(f"[OLLAMA] 요청 실패 {url}: {e}")
+            if not _is_node_failure(e):
+                raise
+            last_err = e
+            tried.append(url)
+            _mark_down(url)
+        finally:
+            _release(url, ok)
+    raise last_err
+
+def stream(prompt: str, model: str, temperature: float = 0.0,
+           endpoints: Optional[List[Tuple[str, int]]] = None, **llm_kwargs):
+    """
+    토큰 스트리밍 버전 invoke. 첫 청크가 오기 전 실패만 다른 엔드포인트로 재시도한다
+    (이미 내보낸 청크는 되돌릴 수 없으므로 중간 실패는 그대로 예외). 엔드포인트를 빼는 기준은 invoke 와 같다.
+    """
+    endpoints = endpoints or OLLAMA_ENDPOINTS
+    tried, last_err = [], None
+    for _ in range(OLLAMA_RETRIES + 1):
+        try:
+            url = _acquire(endpoints, model, exclude=tried)
+        except RuntimeError as e:
+            last_err = last_err or e
+            break
+        ok, started = False, False
+        try:
+            for chunk in _chunks(_post_generate(url, _payload(model, prompt, temperature, True, llm_kwargs))):
+                started = True
+                yield chunk
+            ok = True
+            return
+        except Exception as e:
+            print(f"[OLLAMA] 스트리밍 실패 {url}: {e}")
+            if not _is_node_failure(e):
+                raise
+            last_err = e
+            tried.append(url)
+            _mark_down(url)
+            if started:
+                raise
+        finally:
+            _release(url, ok)
+    raise last_err
+
+def batch(prompts: List[str], model: str, temperature: float = 0.0,
+          endpoints: Optional[List[Tuple[str, int]]] = None, max_workers: Optional[int] = None,
+          **llm_kwargs) -> List[str]:
+    """여러 프롬프트를 나눠 보내고 입력 순서대로 돌려준다. 끝내 실패한 항목은 "" (호출 측에서 파싱 실패로 처리)"""
+    if not prompts:
+        return []
+    endpoints = endpoints or OLLAMA_ENDPOINTS
+    workers = min(len(prompts), max_workers or sum(cap for _url, cap in endpoints))
+
+    def _one(p):
+        try:
+            return invoke(p, model, temperature, endpoints, **llm_kwargs)
+        except Exception as e:
+            print(f"[OLLAMA] 요청 포기: {e}")
+            return ""
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ollama") as ex:
+        return list(ex.map(_one, prompts))
+
+def warm_up(model: str, prompt: str = "", endpoints: Optional[List[Tuple[str, int]]] = None) -> Dict[str, Optional[float]]:
+    """
+    살아 있는 엔드포인트마다 모델을 올려 두고(keep_alive 연장), prompt 를 주면 1토큰만 생성시켜
+    그 앞부분을 서버 프롬프트 캐시에 채운다. 반환: {url: 걸린 시간(s) 또는 None(실패)}
+    """
+    out = {}
+    for url, _cap in endpoints or OLLAMA_ENDPOINTS:
+        if not _probe(url)["ready"]:
+            out[url] = None
+            continue
+        t0 = time.perf_counter()
+        try:
+            r = requests.post(f"{url}/api/generate", timeout=WARMUP_TIMEOUT_SEC,
+                              json={"model": model, "prompt": prompt, "stream": False,
+                                    "keep_alive": OLLAMA_KEEP_ALIVE, "options": {"num_predict": 1}})
+            r.raise_for_status()
+            out[url] = time.perf_counter() - t0
+            print(f"[OLLAMA] 워밍업 {url} {model} {out[url]:.2f}s")
+        except Exception as e:
+            print(f"[OLLAMA] 워밍업 실패 {url}: {e}")
+            out[url] = None
+    return out
+
+def start_warmup(model: str, prompt: str = "", interval_sec: int = WARMUP_INTERVAL_SEC,
+                 endpoints: Optional[List[Tuple[str, int]]] = None):
+    """바로 한 번 + interval_sec 마다 warm_up 하는 데몬 스레드 (모델별 1개)"""
+    with _cond:
+        t = _warmup_threads.get(model)
+        if t and t.is_alive():
+            return
+
+        def _loop():
+            while True:
+                try:
+                    warm_up(model, prompt, endpoints)
+                except Exception as e:
+                    print(f"[OLLAMA] 워밍업 오류: {e}")
+                time.sleep(interval_sec)
+
+        t = _warmup_threads[model] = threading.Thread(target=_loop, name=f"ollama-warmup-{model}", daemon=True)
+        t.start()
+
+def pool_stats(endpoints: Optional[List[Tuple[str, int]]] = None) -> Dict[str, dict]:
+    with _cond:
+        return {url: {"max_concurrency": cap, "inflight": _inflight.get(url, 0),
+                      "ready": (_status.get(url) or {}).get("ready"), **_stats.get(url, {"ok": 0, "failed": 0})}
+                for url, cap in (endpoints or OLLAMA_ENDPOINTS)}
@@ -0,0 +1,86 @@
+# review_filter.py
+# LLM 에 보내기 전 광고/협찬/일회성 악플 리뷰를 거르는 로컬 규칙 기반 필터 (DB 무관, 순수 함수)
+# score_review → 0~1 점수 + 사유. 다른 매장에도 똑같이 달린 리뷰(복붙 광고)는 with_cross_store 로 가산
+# (짧은 흔한 리뷰 "맛있어요" 는 어디에나 있으므로, 광고 신호가 있거나 긴 글일 때만).
+import re, hashlib
+from typing import List, Tuple
+
+FILTER_VERSION = 2          # 규칙이 바뀌면 올려서 저장된 점수를 다시 매기게 함
+SPAM_THRESHOLD = 0.6        # 이 점수 이상이면 요약 입력에서 제외
+
+MIN_CHARS = 4               # 공백 제외 글자 수
+SHORT_CHARS = 8
+MIN_UNIQUE_RATIO = 0.3      # 글자 종류 / 글자 수 (같은 말 반복)
+MAX_HASHTAGS = 5
+CROSS_STORE_DUP_MIN = 2     # 서로 다른 매장 N곳 이상에 같은 리뷰
+CROSS_STORE_MIN_CHARS = 40  # 광고 신호 없이도 복붙으로 볼 길이(공백 제외 글자 수)
+AD_REASONS = {"sponsor", "promo", "link", "phone", "hashtags"}
+
+# 협찬/체험단 고지문: 이것만으로 광고로 본다
+SPONSOR_RE = re.compile(r"(업체|가게|매장)[^.\n]{0,20}(제공|지원)\s*받|소정의\s*(원고료|수수료)|원고료|체험단|협찬|내돈내산\s*아님|무상\s*제공")
+PROMO_WORDS = ("광고", "이벤트", "쿠폰", "할인코드", "프로모션", "오픈채팅", "카톡", "문의", "예약문의", "링크", "팔로우", "구독")
+LINK_RE = re.compile(r"https?://|www\.|\.com\b|\.kr\b|블로그\s*(방문|놀러)")
+PHONE_RE = re.compile(r"0\d{1,2}[-. ]?\d{3,4}[-. ]?\d{4}")
+ABUSE_RE = re.compile(r"시발|씨발|ㅅㅂ|ㅆㅂ|개새|병신|ㅂㅅ|존나|좆|꺼져|망해라")
+
+WEIGHTS = {
+    "sponsor": 0.7,
+    "promo": 0.25,          # 키워드 하나당, 최대 2개까지
+    "link": 0.35,
+    "phone": 0.35,
+    "hashtags": 0.3,
+    "too_short": 0.6,
+    "short": 0.15,
+    "repetitive": 0.45,
+    "abuse": 0.3,
+    "abuse_short": 0.35,    # 내용 없이 욕만 있는 일회성 악플
+    "cross_store_dup": 0.6,
+}
+
+def normalize(text: str) -> str:
+    """공백/문장부호/이모지 제거 + 소문자 (복붙 리뷰 비교용)"""
+    return re.sub(r"[^0-9a-z가-힣ㄱ-ㅎㅏ-ㅣ]", "", (text or "").lower())
+
+def norm_hash(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()[:16]
+
+def score_review(text: str) -> Tuple[float, List[str]]:
+    """리뷰 한 개의 로컬 점수(0~1)와 사유"""
+    t = (text or "").strip()
+    core = normalize(t)
+    reasons = []
+
+    if SPONSOR_RE.search(t):
+        reasons.append("sponsor")
+    promo = [w for w in PROMO_WORDS if w in t]
+    reasons += ["promo"] * min(len(promo), 2)
+    if LINK_RE.search(t):
+        reasons.append("link")
+    if PHONE_RE.search(t):
+        reasons.append("phone")
+    if t.count("#") >= MAX_HASHTAGS:
+        reasons.append("hashtags")
+
+    if len(core) < MIN_CHARS:
+        reasons.append("too_short")
+    elif len(core) < SHORT_CHARS:
+        reasons.append("short")
+    if len(core) > 10 and len(set(core)) / len(core) < MIN_UNIQUE_RATIO:
+        reasons.append("repetitive")
+    if ABUSE_RE.search(t):
+        reasons.append("abuse_short" if len(core) < 20 else "abuse")
+
+    score = min(1.0, sum(WEIGHTS[r] for r in reasons))
+    return round(score, 3), sorted(set(reasons))
+
+def with_cross_store(score: float, reasons: List[str], store_count: int, text: str = "") -> Tuple[float, List[str]]:
+    """같은 리뷰가 다른 매장 store_count 곳에 달려 있고, 광고 신호가 있거나 CROSS_STORE_MIN_CHARS 이상이면 가산"""
+    if store_count >= CROSS_STORE_DUP_MIN and (AD_REASONS & set(reasons) or len(normalize(text)) >= CROSS_STORE_MIN_CHARS):
+        return round(min(1.0, score + WEIGHTS["cross_store_dup"]), 3), sorted(set(reasons) | {"cross_store_dup"})
+    return score, reasons
+
+if __name__ == "__main__":
+    for s in ["국물이 진하고 면발이 쫄깃해요. 점심시간엔 웨이팅 10분 정도.",
+              "업체로부터 음식을 제공받아 작성한 솔직 후기입니다 #맛집 #데이트 #강남 #점심 #추천",
+              "ㅅㅂ 별로", "맛있어요", "최고최고최고최고최고최고최고"]:
+        print(score_review(s), s)
@@ -0,0 +1,86 @@
+# tests/ollama_stub.py
+# 테스트용 가짜 Ollama 서버: /api/tags(모델 목록), /api/generate(일반/스트리밍 NDJSON)
+# 응답 내용/지연/상태 코드/중간 끊김을 테스트마다 바꿔 끼우고, 받은 요청과 최대 동시 처리 수를 기록한다
+import json, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class OllamaStub:
+    def __init__(self, models=("llama3.1:latest",), reply="ok", delay=0.0, status=200,
+                 chunk_size=4, cut_after_chunks=None, drop=False):
+        self.models = list(models)
+        self.reply = reply                  # 문자열 또는 body(dict) → 문자열
+        self.delay = delay
+        self.status = status                # 200 이 아니면 {"error": ...} 와 함께 그 코드로 응답
+        self.chunk_size = chunk_size
+        self.cut_after_chunks = cut_after_chunks   # 스트리밍에서 N 조각 보낸 뒤 done 없이 연결 종료
+        self.drop = drop                    # 응답 없이 연결 종료(연결 오류)
+        self.requests = []                  # 받은 /api/generate 본문
+        self.inflight = self.max_inflight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _text(self, body) -> str:
+        return self.reply(body) if callable(self.reply) else self.reply
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, code, obj):
+                data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.startswith("/api/tags"):
+                    return self._send_json(200, {"models": [{"name": m} for m in stub.models]})
+                self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                with stub._lock:
+                    stub.requests.append(body)
+                    stub.inflight += 1
+                    stub.max_inflight = max(stub.max_inflight, stub.inflight)
+                try:
+                    time.sleep(stub.delay)
+                    if stub.drop:
+                        self.close_connection = True
+                        return
+                    if stub.status != 200:
+                        return self._send_json(stub.status, {"error": f"stub status {stub.status}"})
+                    text = stub._text(body)
+                    if not body.get("stream"):
+                        return self._send_json(200, {"model": body.get("model"), "response": text, "done": True})
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.end_headers()
+                    pieces = [text[i:i + stub.chunk_size] for i in range(0, len(text), stub.chunk_size)]
+                    for n, piece in enumerate(pieces):
+                        if stub.cut_after_chunks is not None and n >= stub.cut_after_chunks:
+                            self.close_connection = True
+                            return
+                        self.wfile.write(json.dumps({"response": piece, "done": False}, ensure_ascii=False).encode() + b"\n")
+                        self.wfile.flush()
+                    self.wfile.write(json.dumps({"response": "", "done": True}).encode() + b"\n")
+                finally:
+                    with stub._lock:
+                        stub.inflight -= 1
+
+        return Handler
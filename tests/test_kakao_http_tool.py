@@ -0,0 +1,106 @@
+# tests/test_kakao_http_tool.py
+# 녹화해 둔 카카오 main/commentlist JSON 을 로컬 http.server 로 띄워 KAKAO_PLACE_API_BASE 로 물려 보는 오프라인 테스트
+# 실행(저장소 루트): python -m pytest -q tests
+import os, sys, threading, unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import f_multi_kakao_http_tool as kakao_http
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "kakao")
+BLOCKED_PLACE_ID = "9999"       # 403 으로 막힌 응답
+HTML_PLACE_ID = "5678"          # JSON 대신 HTML 안내 페이지
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """/main/v/<id> → main_<id>.json|html, /commentlist/v/<id>/<last> → commentlist_<id>_<last>.json"""
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) >= 3 and parts[2] == BLOCKED_PLACE_ID:
+            return self._send(403, "text/html", b"<html>Forbidden</html>")
+        name = "_".join([parts[0]] + parts[2:])
+        for ext, ctype in ((".json", "application/json"), (".html", "text/html; charset=utf-8")):
+            path = os.path.join(FIXTURES, name + ext)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return self._send(200, ctype, f.read())
+        self._send(404, "text/plain", b"not found")
+
+    def _send(self, code, ctype, body):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class KakaoHttpToolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_patch = mock.patch.object(kakao_http, "KAKAO_PLACE_API_BASE",
+                                           f"http://127.0.0.1:{cls.server.server_port}")
+        cls.base_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.base_patch.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_parses_reviews_across_pages(self):
+        out = kakao_http.run("1234", keyword="미방")
+        self.assertEqual(out["keyword"], "미방 정자점")
+        # 공백 정리, 빈 리뷰/중복 제거, 다음 페이지(commentlist) 이어 받기
+        self.assertEqual(out["reviews"], ["짬뽕 국물이 진하고 면이 쫄깃해요. 점심엔 웨이팅 10분",
+                                          "탕수육 양이 많아요",
+                                          "사장님 친절하고 주차 2시간 지원"])
+        self.assertEqual(len(out["store_image"]), 3)
+        self.assertTrue(out["store_image"][0].endswith("fname=main.jpg"))
+        self.assertEqual(len(set(out["store_image"])), 3)
+        self.assertEqual(out["place_url"], "https://place.map.kakao.com/1234#review")
+
+    def test_max_reviews_stops_before_next_page(self):
+        out = kakao_http.run("1234", max_reviews=2)
+        self.assertEqual(len(out["reviews"]), 2)
+
+    def test_non_json_response_raises(self):
+        with self.assertRaises(ValueError):
+            kakao_http.run(HTML_PLACE_ID)
+
+    def test_blocked_response_raises(self):
+        with self.assertRaises(Exception):
+            kakao_http.run(BLOCKED_PLACE_ID)
+
+    def test_falls_back_to_selenium(self):
+        pytest.importorskip("selenium")      # f_multi_main_tool 이 브라우저 도구까지 import
+        import f_multi_main_tool
+        selenium_out = {"keyword": "셀레니움 매장", "reviews": ["브라우저로 읽은 리뷰"], "store_image": ["img"],
+                        "place_url": "https://place.map.kakao.com/x#review"}
+        for place_id in (HTML_PLACE_ID, BLOCKED_PLACE_ID):
+            with self.subTest(place_id=place_id), \
+                    mock.patch.object(f_multi_main_tool, "KAKAO_FETCH_BACKEND", "http"), \
+                    mock.patch.object(f_multi_main_tool.f_multi_kakao_tool, "run_multi",
+                                      return_value=selenium_out) as run_multi:
+                out = f_multi_main_tool.fetch_kakao_reviews("셀레니움 매장", 10, place_id=place_id)
+                run_multi.assert_called_once()
+                self.assertEqual(out["reviews"], ["브라우저로 읽은 리뷰"])
+                self.assertEqual(out["status"], "ok")
+
+    def test_http_success_skips_selenium(self):
+        pytest.importorskip("selenium")      # f_multi_main_tool 이 브라우저 도구까지 import
+        import f_multi_main_tool
+        with mock.patch.object(f_multi_main_tool, "KAKAO_FETCH_BACKEND", "http"), \
+                mock.patch.object(f_multi_main_tool.f_multi_kakao_tool, "run_multi") as run_multi:
+            out = f_multi_main_tool.fetch_kakao_reviews("미방", 10, place_id="1234")
+        run_multi.assert_not_called()
+        self.assertEqual(out["crawled_name"], "미방 정자점")
+        self.assertEqual(len(out["reviews"]), 3)
+
+if __name__ == "__main__":
+    unittest.main()
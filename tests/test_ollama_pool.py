@@ -0,0 +1,123 @@
+# tests/test_ollama_pool.py
+# ollama_pool 을 가짜 Ollama 서버(ollama_stub) 여러 개에 물려 보는 테스트:
+# 동시 요청 상한 안에서의 분산, 실패 엔드포인트 제외(_mark_down), 4xx/5xx 구분, 스트리밍 재시도 범위
+# 실행(저장소 루트): python -m pytest -q tests
+import os, sys, unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ollama_pool
+from ollama_stub import OllamaStub
+
+MODEL = "llama3.1"
+
+class OllamaPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.stubs = []
+
+    def tearDown(self):
+        for s in self.stubs:
+            s.close()
+
+    def _stub(self, **kw):
+        s = OllamaStub(**kw)
+        self.stubs.append(s)
+        return s
+
+    def test_least_outstanding_within_max_concurrency(self):
+        a = self._stub(reply="A", delay=0.2)
+        b = self._stub(reply="B", delay=0.2)
+        eps = ollama_pool.parse_endpoints(f"{a.url}|2,{b.url}|4")
+        out = ollama_pool.batch([f"p{i}" for i in range(12)], MODEL, 0.0, eps)
+        self.assertEqual(len(out), 12)
+        self.assertEqual(out.count("A") + out.count("B"), 12)
+        self.assertLessEqual(a.max_inflight, 2)
+        self.assertLessEqual(b.max_inflight, 4)
+        self.assertEqual(b.max_inflight, 4)
+        self.assertGreater(out.count("B"), out.count("A"))      # 상한 대비 비율로 나누므로 큰 쪽이 더 받음
+        stats = ollama_pool.pool_stats(eps)
+        self.assertEqual(stats[a.url]["inflight"] + stats[b.url]["inflight"], 0)
+
+    def test_prefers_endpoint_that_has_the_model(self):
+        has = self._stub(reply="has")
+        other = self._stub(reply="other", models=("qwen2:7b",))
+        eps = ollama_pool.parse_endpoints(f"{other.url}|8,{has.url}|1")
+        self.assertEqual(ollama_pool.batch(["x"] * 3, MODEL, 0.0, eps), ["has"] * 3)
+        self.assertEqual(other.requests, [])
+
+    def test_5xx_fails_over_and_marks_down(self):
+        bad = self._stub(status=500)
+        good = self._stub(reply="good", models=("qwen2:7b",))     # 모델 목록상 bad 가 먼저 골리게
+        eps = ollama_pool.parse_endpoints(f"{bad.url},{good.url}")
+        self.assertEqual(ollama_pool.invoke("x", MODEL, 0.0, eps), "good")
+        self.assertEqual(len(bad.requests), 1)
+        self.assertFalse(ollama_pool._status[bad.url]["ready"])
+        # DOWN_SEC 동안은 다시 보내지 않음
+        self.assertEqual(ollama_pool.invoke("y", MODEL, 0.0, eps), "good")
+        self.assertEqual(len(bad.requests), 1)
+        self.assertEqual(ollama_pool.pool_stats(eps)[bad.url]["failed"], 1)
+
+    def test_connection_error_fails_over(self):
+        dropped = self._stub(drop=True)
+        good = self._stub(reply="good", models=("qwen2:7b",))
+        eps = ollama_pool.parse_endpoints(f"{dropped.url},{good.url}")
+        self.assertEqual(ollama_pool.invoke("x", MODEL, 0.0, eps), "good")
+        self.assertFalse(ollama_pool._status[dropped.url]["ready"])
+
+    def test_4xx_raises_without_marking_down_or_retrying(self):
+        missing = self._stub(status=404)
+        other = self._stub(reply="other", models=("qwen2:7b",))
+        eps = ollama_pool.parse_endpoints(f"{missing.url},{other.url}")
+        with self.assertRaises(requests.HTTPError):
+            ollama_pool.invoke("x", MODEL, 0.0, eps)
+        self.assertEqual(len(missing.requests), 1)
+        self.assertEqual(other.requests, [])
+        self.assertTrue(ollama_pool._status[missing.url]["ready"])
+        self.assertEqual(ollama_pool.batch(["x"], MODEL, 0.0, eps), [""])     # batch 는 "" 로 포기
+
+    def test_is_node_failure(self):
+        def http_error(code):
+            r = requests.Response()
+            r.status_code = code
+            return requests.HTTPError(response=r)
+        self.assertTrue(ollama_pool._is_node_failure(http_error(500)))
+        self.assertTrue(ollama_pool._is_node_failure(http_error(503)))
+        self.assertTrue(ollama_pool._is_node_failure(requests.ConnectionError()))
+        self.assertTrue(ollama_pool._is_node_failure(requests.Timeout()))
+        self.assertTrue(ollama_pool._is_node_failure(ConnectionError()))
+        self.assertFalse(ollama_pool._is_node_failure(http_error(404)))
+        self.assertFalse(ollama_pool._is_node_failure(http_error(400)))
+        self.assertFalse(ollama_pool._is_node_failure(ValueError("bad option")))
+
+    def test_stream_retries_before_first_chunk(self):
+        bad = self._stub(status=500)
+        good = self._stub(reply="안녕하세요 반갑습니다", models=("qwen2:7b",))
+        eps = ollama_pool.parse_endpoints(f"{bad.url},{good.url}")
+        chunks = list(ollama_pool.stream("x", MODEL, 0.0, eps))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), "안녕하세요 반갑습니다")
+
+    def test_stream_does_not_retry_after_first_chunk(self):
+        cut = self._stub(reply="abcdefghijkl", chunk_size=4, cut_after_chunks=2)
+        spare = self._stub(reply="spare", models=("qwen2:7b",))
+        eps = ollama_pool.parse_endpoints(f"{cut.url},{spare.url}")
+        got = []
+        with self.assertRaises(ConnectionError):
+            for chunk in ollama_pool.stream("x", MODEL, 0.0, eps):
+                got.append(chunk)
+        self.assertEqual(got, ["abcd", "efgh"])
+        self.assertEqual(spare.requests, [])
+        self.assertFalse(ollama_pool._status[cut.url]["ready"])
+
+    def test_payload_passes_schema_format_and_options(self):
+        s = self._stub(reply="{}")
+        schema = {"type": "object", "properties": {"a": {"type": "string"}}}
+        ollama_pool.invoke("x", MODEL, 0.3, ollama_pool.parse_endpoints(s.url), format=schema, num_predict=50)
+        body = s.requests[0]
+        self.assertEqual(body["format"], schema)
+        self.assertEqual(body["options"], {"temperature": 0.3, "num_predict": 50})
+        self.assertEqual(body["keep_alive"], ollama_pool.OLLAMA_KEEP_ALIVE)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+# tests/test_remote_driver.py
+# 원격 WebDriver 노드 선택을 가짜 /status 서버로 돌려 보는 테스트:
+# 부하 순 정렬(Grid 4 슬롯 / 단독 chromedriver 는 REMOTE_NODE_SLOTS), 꽉 찬 노드 제외, REMOTE_DOWN_SEC 제외, 로컬 대체
+# 실행(저장소 루트): python -m pytest -q tests
+import json, os, sys, threading, unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("selenium")
+import f_multi_driver_tool as drv
+
+def grid_status(sessions, slots, availability="UP"):
+    """Grid 4 /status: 노드 하나, 슬롯 slots 개 중 sessions 개 사용 중"""
+    return {"value": {"ready": True, "message": "Selenium Grid ready.", "nodes": [{
+        "availability": availability,
+        "slots": [{"id": {"id": f"s{i}"}, "session": {"sessionId": f"x{i}"} if i < sessions else None}
+                  for i in range(slots)],
+    }]}}
+
+CHROMEDRIVER_READY = {"value": {"ready": True, "message": "ChromeDriver ready for new sessions."}}
+
+class StatusStub:
+    """GET /status 에 payload 를 돌려주는 노드. status 가 200 이 아니면 그 코드로 실패"""
+    def __init__(self, payload, status=200):
+        self.payload, self.status, self.hits = payload, status, 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.hits += 1
+                data = json.dumps(stub.payload).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class FakeDriver:
+    def __init__(self, node=None):
+        self.node = node
+
+    def implicitly_wait(self, sec):
+        pass
+
+    def quit(self):
+        pass
+
+class RemoteDriverTest(unittest.TestCase):
+    def setUp(self):
+        self.stubs = []
+        self.patches = [mock.patch.object(drv, "REMOTE_NODE_SLOTS", 4),
+                        mock.patch.object(drv, "CRAWL_DRIVER_BACKEND", "remote"),
+                        mock.patch.object(drv, "_node_status", {}),
+                        mock.patch.object(drv, "_node_inflight", drv.defaultdict(int))]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        for s in self.stubs:
+            s.close()
+
+    def _nodes(self, *stubs):
+        self.stubs.extend(stubs)
+        p = mock.patch.object(drv, "REMOTE_WEBDRIVER_URLS", [s.url for s in stubs])
+        p.start()
+        self.patches.append(p)
+        return [s.url for s in stubs]
+
+    def test_ranks_by_load_and_skips_full_nodes(self):
+        busy, idle_cd, half, full = self._nodes(
+            StatusStub(grid_status(3, 4)),             # 0.75
+            StatusStub(CHROMEDRIVER_READY),           # 슬롯 정보 없음 → 0 / REMOTE_NODE_SLOTS
+            StatusStub(grid_status(1, 2)),             # 0.5
+            StatusStub(grid_status(2, 2)))             # 꽉 참 → 제외
+        self.assertEqual(drv._nodes_by_load(), [idle_cd, half, busy])
+
+    def test_grid_counts_only_up_slots(self):
+        (grid,) = self._nodes(StatusStub({"value": {"ready": True, "nodes": [
+            grid_status(1, 1)["value"]["nodes"][0],
+            grid_status(0, 3, availability="DOWN")["value"]["nodes"][0]]}}))
+        self.assertEqual(drv._nodes_by_load(), [])     # UP 슬롯 1개가 사용 중 → 꽉 참
+
+    def test_chromedriver_node_uses_remote_node_slots(self):
+        (cd,) = self._nodes(StatusStub(CHROMEDRIVER_READY))
+        drv._node_inflight[cd] = 3
+        self.assertEqual(drv._nodes_by_load(), [cd])
+        drv._node_inflight[cd] = 4                   # 이 프로세스 세션만으로 REMOTE_NODE_SLOTS 가 참
+        self.assertEqual(drv._nodes_by_load(), [])
+
+    def test_not_ready_or_unreachable_nodes_are_skipped(self):
+        not_ready, failing, ok = self._nodes(StatusStub({"value": {"ready": False}}),
+                                             StatusStub({}, status=500),
+                                             StatusStub(CHROMEDRIVER_READY))
+        self.assertEqual(drv._nodes_by_load(), [ok])
+
+    def test_session_failure_marks_node_down_and_tries_next(self):
+        first, second = self._nodes(StatusStub(grid_status(0, 4)), StatusStub(grid_status(2, 4)))
+
+        def remote(command_executor, options):
+            if command_executor == first:
+                raise drv.WebDriverException("session not created")
+            return FakeDriver(command_executor)
+
+        with mock.patch.object(drv.webdriver, "Remote", side_effect=remote):
+            d = drv._start_remote(None)
+        self.assertEqual(d.node, second)
+        self.assertFalse(drv._node_status[first]["ready"])
+        self.assertEqual(drv._node_inflight[second], 1)
+        # REMOTE_DOWN_SEC 동안은 /status 도 다시 묻지 않고 건너뜀
+        hits = self.stubs[0].hits
+        self.assertEqual(drv._nodes_by_load(), [second])
+        self.assertEqual(self.stubs[0].hits, hits)
+        d.quit()
+        self.assertEqual(drv._node_inflight[second], 0)
+
+    def test_falls_back_to_local_when_no_node_is_usable(self):
+        self._nodes(StatusStub({}, status=503))
+        local = FakeDriver("local")
+        tmp = drv.tempfile.TemporaryDirectory()     # 로컬 경로가 만드는 임시 프로필 자리
+        self.addCleanup(tmp.cleanup)
+        profile = tmp.name
+        with mock.patch.object(drv, "REMOTE_FALLBACK_LOCAL", True), \
+                mock.patch.object(drv.tempfile, "mkdtemp", return_value=profile), \
+                mock.patch.object(drv, "_start_chrome", return_value=local) as start_chrome, \
+                mock.patch.object(drv, "_track"):
+            self.assertIs(drv.make_driver(), local)
+        start_chrome.assert_called_once()
+
+    def test_no_fallback_raises(self):
+        self._nodes(StatusStub({}, status=503))
+        with mock.patch.object(drv, "REMOTE_FALLBACK_LOCAL", False), \
+                mock.patch.object(drv, "_start_chrome") as start_chrome:
+            with self.assertRaises(drv.WebDriverException):
+                drv.make_driver()
+        start_chrome.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
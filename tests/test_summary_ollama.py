@@ -0,0 +1,82 @@
+# tests/test_summary_ollama.py
+# 요약 경로 전체(DB_craw.summarize_store_with_rating → ollama_pool → /api/generate)를 가짜 Ollama 서버로 돌려 보는 테스트
+# 실행(저장소 루트): python -m pytest -q tests
+import json, os, sys, tempfile, unittest
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for mod in ("langchain_core", "dotenv", "selenium"):     # DB_craw → f_multi_main_tool 이 브라우저 도구까지 import
+    pytest.importorskip(mod)
+import DB_craw
+from ollama_stub import OllamaStub
+
+SUMMARY = {"one_liner": "짬뽕 국물이 진한 집", "rating": 4.5, "complain": ["점심 웨이팅"], "digest": "국물 진함, 웨이팅"}
+REVIEWS = ["짬뽕 국물이 진하고 면이 쫄깃해요", "탕수육 양이 많아요", "점심엔 웨이팅 10분 정도 있어요",
+           "사장님이 친절하고 주차 지원돼요"]
+
+class SummaryOllamaTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)         # DB_PATH 는 상대 경로(reviews.db)
+        DB_craw._init_db()
+
+    def tearDown(self):
+        DB_craw.close_connections()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def _summarize(self, stub, store="미방"):
+        results = {store: {"kakao_id": "1234", "kakao": {"reviews": REVIEWS}}}
+        return DB_craw.summarize_store_with_rating(results, model_name="llama3.1", base_url=stub.url,
+                                                   incremental=False, route=False)[store]
+
+    def test_schema_format_returns_parsed_summary(self):
+        stub = OllamaStub(reply=json.dumps(SUMMARY, ensure_ascii=False))
+        try:
+            out = self._summarize(stub)
+        finally:
+            stub.close()
+        self.assertEqual(out["one_liner"], SUMMARY["one_liner"])
+        self.assertEqual(float(out["rating"]), SUMMARY["rating"])
+        self.assertEqual(out["complain"], SUMMARY["complain"])
+        # JSON 스키마가 format 으로 그대로, 출력 상한은 options 로 전달돼야 함
+        body = stub.requests[0]
+        self.assertEqual(body["format"], DB_craw.SUMMARY_SCHEMA)
+        self.assertEqual(body["options"]["num_predict"], DB_craw.SUMMARY_NUM_PREDICT)
+        self.assertFalse(body["stream"])
+
+    def _metrics_delta(self, before):
+        after = DB_craw.summary_metrics()
+        return {k: after[k] - before[k] for k in after}
+
+    def test_parse_retry_counted_per_call(self):
+        # 첫 출력은 깨진 JSON, 재시도(직전 출력 첨부)에서 정상
+        reply = lambda body: (json.dumps(SUMMARY, ensure_ascii=False) if "[직전 출력" in body["prompt"]
+                              else '{"one_liner": "짬뽕')
+        stub = OllamaStub(reply=reply)
+        before = DB_craw.summary_metrics()
+        try:
+            out = self._summarize(stub, store="재시도")
+        finally:
+            stub.close()
+        d = self._metrics_delta(before)
+        self.assertEqual(out["one_liner"], SUMMARY["one_liner"])
+        self.assertEqual(len(stub.requests), 2)
+        self.assertEqual((d["calls"], d["parse_failures"], d["retried"], d["recovered"], d["empty"]), (2, 1, 1, 1, 0))
+
+    def test_empty_output_not_counted_or_retried(self):
+        stub = OllamaStub(status=500)       # 엔드포인트 실패 → batch 가 "" 를 돌려줌
+        before = DB_craw.summary_metrics()
+        try:
+            out = self._summarize(stub, store="빈출력")
+        finally:
+            stub.close()
+        d = self._metrics_delta(before)
+        self.assertEqual(out["rating"], 3.0)
+        self.assertFalse(any("[직전 출력" in b["prompt"] for b in stub.requests))
+        self.assertEqual((d["calls"], d["parse_failures"], d["retried"], d["empty"]), (1, 0, 0, 1))
+
+if __name__ == "__main__":
+    unittest.main()